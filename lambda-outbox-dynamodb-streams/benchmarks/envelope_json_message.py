@@ -0,0 +1,78 @@
+"""Time to build the message envelope - with a JSON round-trip of the payload, and with the payload spliced in.
+
+`envelope_json_message` parses the serialized outbox payload and `JsonBase` serializes it again;
+`envelope_serialized_json_message` splices the serialized payload into the envelope as is.
+The JSON backends are compared on parsing the payload, as the claim check rehydration does.
+
+Usage:
+    poetry run python benchmarks/envelope_json_message.py [--iterations 200]
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import Awaitable, Callable
+
+from transactional_messaging.outbox import PublishedMessage
+
+from lambda_outbox_dynamodb_streams.app.dispatch import envelope_json_message, envelope_serialized_json_message
+from lambda_outbox_dynamodb_streams.app.serialization import get_json_backend
+from lambda_outbox_dynamodb_streams.app.time import utcnow
+
+PAYLOAD_SIZES = [1024, 10 * 1024, 50 * 1024, 100 * 1024, 200 * 1024]
+
+
+def create_message(payload_size: int) -> PublishedMessage:
+    item = {"order_id": str(uuid.uuid4()), "quantity": 1, "price": 9.99, "tags": ["a", "b"], "note": "x" * 32}
+    items = [item] * max(1, payload_size // len(json.dumps(item)))
+    return PublishedMessage(
+        message_id=uuid.uuid4(),
+        aggregate_id=uuid.uuid4(),
+        correlation_id=uuid.uuid4(),
+        topic="benchmark",
+        message=json.dumps({"items": items}),
+        created_at=utcnow(),
+    )
+
+
+async def measure(operation: Callable[[], Awaitable[object]], iterations: int) -> float:
+    started_at = time.perf_counter()
+    for _ in range(iterations):
+        await operation()
+    return (time.perf_counter() - started_at) / iterations * 1_000_000
+
+
+async def main(iterations: int) -> None:
+    backends = {name: get_json_backend(name) for name in ("json", "auto")}
+    print(f"{'payload bytes':>14}{'round-trip μs':>15}{'splice μs':>11}{'speedup':>9}", end="")
+    print("".join(f"{f'parse {type(backend).__name__} μs':>32}" for backend in backends.values()))
+    for payload_size in PAYLOAD_SIZES:
+        message = create_message(payload_size)
+
+        async def _round_trip(message: PublishedMessage = message) -> str:
+            return await envelope_json_message(message)
+
+        async def _splice(message: PublishedMessage = message) -> str:
+            return await envelope_serialized_json_message(message)
+
+        round_trip_us = await measure(_round_trip, iterations)
+        splice_us = await measure(_splice, iterations)
+        parse_us = []
+        for backend in backends.values():
+
+            async def _parse(message: PublishedMessage = message, loads: Callable = backend.loads) -> object:
+                return loads(message.message)
+
+            parse_us.append(await measure(_parse, iterations))
+        print(
+            f"{len(message.message):>14}{round_trip_us:>15.1f}{splice_us:>11.1f}{round_trip_us / splice_us:>8.1f}x",
+            end="",
+        )
+        print("".join(f"{us:>32.1f}" for us in parse_us))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    asyncio.run(main(parser.parse_args().iterations))
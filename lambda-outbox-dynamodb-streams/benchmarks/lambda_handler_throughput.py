@@ -0,0 +1,129 @@
+"""Throughput of the Lambda handler by memory size, with a fake SNS client.
+
+Lambda allocates CPU in proportion to memory - a full vCPU at 1769 MB, and a single-threaded handler
+doesn't get faster with more. The handler is invoked locally with synthetic stream events and a fake SNS client
+that answers after `--sns-latency-ms`; the CPU time of each invocation is then stretched by the CPU share
+of every memory size, while the time spent waiting on SNS stays the same.
+The local CPU is usually faster than a Lambda vCPU, so compare the configurations with each other.
+
+Usage:
+    poetry run python benchmarks/lambda_handler_throughput.py [--batch-size 100] [--payload-size 1024]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import statistics
+import time
+import uuid
+from typing import Any, AsyncIterator
+
+MEMORY_SIZES = [128, 256, 512, 1024, 1769, 3008]
+FULL_VCPU_MEMORY_SIZE = 1769
+
+
+class FakeSNSClient:
+    def __init__(self, latency: float) -> None:
+        self._latency = latency
+
+    async def create_topic(self, Name: str, **kwargs: Any) -> dict[str, Any]:  # pylint: disable=invalid-name
+        return {"TopicArn": f"arn:aws:sns:us-east-1:123456789012:{Name}"}
+
+    async def publish(self, **kwargs: Any) -> dict[str, Any]:
+        await asyncio.sleep(self._latency)
+        return {"MessageId": str(uuid.uuid4())}
+
+    async def publish_batch(self, **kwargs: Any) -> dict[str, Any]:
+        await asyncio.sleep(self._latency)
+        entries = kwargs["PublishBatchRequestEntries"]
+        return {"Successful": [{"Id": entry["Id"], "MessageId": str(uuid.uuid4())} for entry in entries], "Failed": []}
+
+
+def create_stream_event(batch_size: int, payload_size: int, aggregates_count: int) -> dict[str, Any]:
+    aggregate_ids = [str(uuid.uuid4()) for _ in range(aggregates_count)]
+    records = []
+    for sequence_number in range(batch_size):
+        message_id = str(uuid.uuid4())
+        payload = {"message_id": message_id, "items": [{"sku": "x" * 16, "quantity": 1}] * (payload_size // 32)}
+        records.append(
+            {
+                "eventName": "INSERT",
+                "eventSource": "aws:dynamodb",
+                "dynamodb": {
+                    "SequenceNumber": str(sequence_number),
+                    "NewImage": {
+                        "PK": {"S": f"MESSAGE#{message_id}"},
+                        "MessageId": {"S": message_id},
+                        "AggregateId": {"S": aggregate_ids[sequence_number % aggregates_count]},
+                        "CorrelationId": {"S": str(uuid.uuid4())},
+                        "Topic": {"S": "benchmark"},
+                        "Message": {"S": json.dumps(payload)},
+                        "CreatedAt": {"S": "2023-08-15T08:24:05.961363+00:00"},
+                        "NotDispatched": {"S": "x"},
+                    },
+                },
+            }
+        )
+    return {"Records": records}
+
+
+def main(arguments: argparse.Namespace) -> None:
+    # The handler reads its settings on import
+    os.environ.setdefault("DYNAMODB_OUTBOX_TABLE_NAME", "outbox")
+    os.environ.setdefault("AWS_SNS_TOPIC_ARN_PREFIX", "arn:aws:sns:us-east-1:123456789012:")
+    os.environ["OUTBOX_SKIP_MARK_MESSAGES_AS_DISPATCHED"] = "1"
+    os.environ["OUTBOX_DISPATCH_MODE"] = arguments.dispatch_mode
+    os.environ["POWERTOOLS_LOG_LEVEL"] = arguments.log_level
+
+    # pylint: disable=import-outside-toplevel
+    from lambda_outbox_dynamodb_streams.app import clients, lambda_function
+
+    fake_sns_client = FakeSNSClient(latency=arguments.sns_latency_ms / 1000)
+
+    @contextlib.asynccontextmanager
+    async def _get_fake_sns_client() -> AsyncIterator[FakeSNSClient]:
+        yield fake_sns_client
+
+    clients.client_pool.get_sns_client = _get_fake_sns_client  # type: ignore[assignment,method-assign]
+
+    cpu_times, wait_times = [], []
+    for invocation in range(arguments.warmup + arguments.invocations):
+        event = create_stream_event(arguments.batch_size, arguments.payload_size, arguments.aggregates)
+        cpu_started_at, wall_started_at = time.process_time(), time.perf_counter()
+        response = lambda_function.lambda_handler(event, None)
+        cpu_time, wall_time = time.process_time() - cpu_started_at, time.perf_counter() - wall_started_at
+        if response["batchItemFailures"]:
+            raise RuntimeError(f"Records failed: {response['batchItemFailures']}")
+        if invocation >= arguments.warmup:
+            cpu_times.append(cpu_time)
+            wait_times.append(max(0.0, wall_time - cpu_time))
+
+    cpu_time, wait_time = statistics.median(cpu_times), statistics.median(wait_times)
+    print(
+        f"batch size {arguments.batch_size}, payload {arguments.payload_size} bytes, "
+        f"{arguments.dispatch_mode} dispatch mode, SNS latency {arguments.sns_latency_ms} ms; "
+        f"local median CPU {cpu_time * 1000:.1f} ms, waiting {wait_time * 1000:.1f} ms per invocation"
+    )
+    print(f"{'memory MB':>10}{'vCPU':>7}{'ms per invocation':>19}{'records/s':>11}{'GB-s per 1M records':>21}")
+    for memory_size in MEMORY_SIZES:
+        cpu_share = min(1.0, memory_size / FULL_VCPU_MEMORY_SIZE)
+        duration = cpu_time / cpu_share + wait_time
+        records_per_second = arguments.batch_size / duration
+        gb_seconds = memory_size / 1024 * duration * 1_000_000 / arguments.batch_size
+        print(
+            f"{memory_size:>10}{cpu_share:>7.2f}{duration * 1000:>19.1f}{records_per_second:>11.0f}{gb_seconds:>21.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--payload-size", type=int, default=1024)
+    parser.add_argument("--aggregates", type=int, default=20)
+    parser.add_argument("--sns-latency-ms", type=float, default=20.0)
+    parser.add_argument("--dispatch-mode", choices=["batch", "ordered"], default="batch")
+    parser.add_argument("--invocations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--log-level", default="WARNING")
+    main(parser.parse_args())
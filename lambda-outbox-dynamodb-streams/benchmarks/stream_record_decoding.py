@@ -0,0 +1,90 @@
+"""Time to decode the published messages of a synthetic DynamoDB stream event.
+
+The powertools path reads every attribute through `DynamoDBRecord.dynamodb.new_image`, which deserializes
+the whole image on each access, and parses the IDs and the creation time up front - as the decoder used to.
+`create_published_message_from_dynamodb_stream_record` reads the raw `NewImage` and decodes the attributes
+on first access; the dispatcher reads the topic, the message, the message ID and the aggregate ID.
+
+Usage:
+    poetry run python benchmarks/stream_record_decoding.py [--records 1000] [--iterations 20]
+"""
+import argparse
+import json
+import time
+import uuid
+from typing import Any, Callable
+
+from aws_lambda_powertools.utilities.data_classes.dynamo_db_stream_event import DynamoDBRecord, DynamoDBStreamEvent
+from transactional_messaging.outbox import PublishedMessage
+
+from lambda_outbox_dynamodb_streams.app.message import (
+    DispatchableMessage,
+    create_published_message_from_dynamodb_stream_record,
+)
+from lambda_outbox_dynamodb_streams.app.time import str_to_datetime, utcnow
+
+
+def create_stream_event(records_count: int) -> dict[str, Any]:
+    records = []
+    for sequence_number in range(records_count):
+        message_id = str(uuid.uuid4())
+        image = {
+            "PK": {"S": f"MESSAGE#{message_id}"},
+            "MessageId": {"S": message_id},
+            "AggregateId": {"S": str(uuid.uuid4())},
+            "CorrelationId": {"S": str(uuid.uuid4())},
+            "Topic": {"S": "benchmark"},
+            "Message": {"S": json.dumps({"message_id": message_id, "payload": "x" * 512})},
+            "CreatedAt": {"S": utcnow().isoformat()},
+            "NotDispatched": {"S": "1"},
+            "ApproximateDispatchCount": {"N": "0"},
+        }
+        records.append(
+            {
+                "eventName": "INSERT",
+                "eventSource": "aws:dynamodb",
+                "dynamodb": {"SequenceNumber": str(sequence_number), "NewImage": image},
+            }
+        )
+    return {"Records": records}
+
+
+def decode_with_powertools(record: DynamoDBRecord) -> PublishedMessage:
+    if not record.dynamodb or not record.dynamodb.new_image:
+        raise ValueError("PublishedMessage not created from stream record")
+    return PublishedMessage(
+        message_id=uuid.UUID(record.dynamodb.new_image["MessageId"]),
+        aggregate_id=uuid.UUID(record.dynamodb.new_image["AggregateId"]),
+        correlation_id=uuid.UUID(record.dynamodb.new_image["CorrelationId"]),
+        topic=record.dynamodb.new_image["Topic"],
+        message=record.dynamodb.new_image["Message"],
+        created_at=str_to_datetime(record.dynamodb.new_image["CreatedAt"]),
+    )
+
+
+def measure(event: dict[str, Any], decode: Callable[[DynamoDBRecord], DispatchableMessage], iterations: int) -> float:
+    started_at = time.perf_counter()
+    for _ in range(iterations):
+        for record in DynamoDBStreamEvent(event).records:
+            message = decode(record)
+            # Attributes the dispatcher reads
+            _ = (message.topic, message.message, message.message_id, message.aggregate_id)
+    return (time.perf_counter() - started_at) / iterations * 1000
+
+
+def main(records_count: int, iterations: int) -> None:
+    event = create_stream_event(records_count)
+    powertools_ms = measure(event, decode_with_powertools, iterations)
+    raw_ms = measure(event, create_published_message_from_dynamodb_stream_record, iterations)
+    print(f"{'decoder':<16}{f'ms per {records_count} records':>24}")
+    print(f"{'powertools':<16}{powertools_ms:>24.2f}")
+    print(f"{'raw, lazy':<16}{raw_ms:>24.2f}")
+    print(f"speedup: {powertools_ms / raw_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=20)
+    arguments = parser.parse_args()
+    main(arguments.records, arguments.iterations)
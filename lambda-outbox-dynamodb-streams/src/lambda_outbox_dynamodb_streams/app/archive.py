@@ -0,0 +1,86 @@
+import asyncio
+import base64
+import gzip
+import json
+from decimal import Decimal
+from typing import Any, Iterable, Protocol
+
+from aws_lambda_powertools.logging import Logger
+from aws_lambda_powertools.utilities.data_classes.dynamo_db_stream_event import DynamoDBRecord, DynamoDBRecordEventName
+
+from . import clients
+from .batch import SequenceNumber, get_sequence_number
+from .filters import TTL_USER_IDENTITY
+
+logger = Logger()
+
+
+class ArchiveTarget(Protocol):
+    async def put(self, key: str, body: bytes) -> None:
+        ...
+
+
+class S3ArchiveTarget(ArchiveTarget):
+    def __init__(self, bucket: str) -> None:
+        self._bucket = bucket
+
+    async def put(self, key: str, body: bytes) -> None:
+        async with clients.client_pool.get_s3_client() as s3_client:
+            await s3_client.put_object(
+                Bucket=self._bucket,
+                Key=key,
+                Body=body,
+                ContentType="application/x-ndjson",
+                ContentEncoding="gzip",
+            )
+
+
+def is_expired_message_record(record: DynamoDBRecord) -> bool:
+    return record.event_name == DynamoDBRecordEventName.REMOVE and record.user_identity == TTL_USER_IDENTITY
+
+
+class ArchiveBatch:
+    """Archives messages expired by the Outbox table TTL in a single Lambda invocation to one NDJSON file.
+
+    Every expired message is written as a JSON line of its old image, and the file is gzip-compressed.
+    The file key is derived from the first and the last sequence number of the archived records,
+    so a retried batch overwrites the same file instead of duplicating it. A bisected batch is archived again
+    to the files of its halves, so its records may be written to more than one file.
+    """
+
+    def __init__(self, records: Iterable[DynamoDBRecord], target: ArchiveTarget, key_prefix: str = "") -> None:
+        self._target = target
+        self._key_prefix = key_prefix
+        self._records: dict[SequenceNumber, DynamoDBRecord] = {
+            get_sequence_number(record): record for record in records if is_expired_message_record(record)
+        }
+        self._task: asyncio.Task[str] | None = None
+
+    async def wait_archived(self, record: DynamoDBRecord) -> None:
+        if get_sequence_number(record) not in self._records:
+            return
+        if self._task is None:
+            self._task = asyncio.create_task(self._archive())
+        await asyncio.shield(self._task)
+
+    async def _archive(self) -> str:
+        sequence_numbers = list(self._records)
+        key = f"{self._key_prefix}{sequence_numbers[0]}-{sequence_numbers[-1]}.ndjson.gz"
+        lines = [
+            json.dumps(record.dynamodb.old_image if record.dynamodb else {}, default=_json_default)
+            for record in self._records.values()
+        ]
+        body = gzip.compress("\n".join(lines).encode())
+        await self._target.put(key, body)
+        logger.info("outbox_expired_messages_archived", key=key, archived_messages_count=len(lines))
+        return key
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(value).decode()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
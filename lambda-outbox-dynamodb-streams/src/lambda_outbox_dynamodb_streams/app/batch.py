@@ -0,0 +1,76 @@
+import asyncio
+import uuid
+from typing import Iterable
+
+from aws_lambda_powertools.utilities.data_classes.dynamo_db_stream_event import DynamoDBRecord, DynamoDBRecordEventName
+from transactional_messaging.outbox import OutboxRepository
+
+from . import clients
+from .dispatch import EnvelopeHandler, TopicsCache, dispatch_messages_batch
+from .message import DispatchableMessage, create_published_message_from_dynamodb_stream_record
+
+SequenceNumber = str
+
+
+class DispatchBatch:
+    """Dispatches INSERT records of a single Lambda invocation with one SNS PublishBatch call per 10 messages.
+
+    The batch is published once, when the first record handler awaits it, and the published messages
+    are marked as dispatched in bulk when `outbox_repository` is given;
+    every record handler then receives the outcome of its own record, so partial batch failures stay exact.
+    """
+
+    def __init__(
+        self,
+        records: Iterable[DynamoDBRecord],
+        envelope_handler: EnvelopeHandler,
+        topics_cache: TopicsCache,
+        outbox_repository: OutboxRepository | None = None,
+    ) -> None:
+        self._envelope_handler = envelope_handler
+        self._topics_cache = topics_cache
+        self._outbox_repository = outbox_repository
+        self._messages: dict[SequenceNumber, DispatchableMessage] = {}
+        self._errors: dict[SequenceNumber, Exception] = {}
+        self._task: asyncio.Task[dict[uuid.UUID, Exception]] | None = None
+        for record in records:
+            if record.event_name != DynamoDBRecordEventName.INSERT:
+                continue
+            sequence_number = get_sequence_number(record)
+            try:
+                self._messages[sequence_number] = create_published_message_from_dynamodb_stream_record(record)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                self._errors[sequence_number] = e
+
+    async def wait_dispatched(self, record: DynamoDBRecord) -> DispatchableMessage:
+        sequence_number = get_sequence_number(record)
+        if error := self._errors.get(sequence_number):
+            raise error
+        if self._task is None:
+            self._task = asyncio.create_task(self._dispatch())
+        failures = await asyncio.shield(self._task)
+        message = self._messages[sequence_number]
+        if error := failures.get(message.message_id):
+            raise error
+        return message
+
+    async def _dispatch(self) -> dict[uuid.UUID, Exception]:
+        async with clients.client_pool.get_sns_client() as sns_client:
+            failures: dict[uuid.UUID, Exception] = dict(
+                await dispatch_messages_batch(
+                    sns_client, list(self._messages.values()), self._envelope_handler, self._topics_cache
+                )
+            )
+        if self._outbox_repository is None:
+            return failures
+        dispatched_message_ids = [m.message_id for m in self._messages.values() if m.message_id not in failures]
+        if dispatched_message_ids:
+            results = await self._outbox_repository.mark_as_dispatched_many(dispatched_message_ids)
+            failures.update({result.message_id: result.error for result in results if result.error is not None})
+        return failures
+
+
+def get_sequence_number(record: DynamoDBRecord) -> SequenceNumber:
+    if record.dynamodb is None or record.dynamodb.sequence_number is None:
+        raise ValueError("DynamoDB stream record has no sequence number")
+    return record.dynamodb.sequence_number
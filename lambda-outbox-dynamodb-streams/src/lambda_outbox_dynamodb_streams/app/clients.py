@@ -1,10 +1,22 @@
+import asyncio
+import contextlib
+import dataclasses
+from typing import Any, AsyncContextManager, AsyncGenerator, AsyncIterator
+
+from aiobotocore.config import AioConfig
 from aiobotocore.session import AioSession, get_session
+from aws_lambda_powertools.logging import Logger
+from botocore.exceptions import ConnectionError as BotocoreConnectionError
+from botocore.exceptions import HTTPClientError
 from pydantic import BaseModel
 from types_aiobotocore_dynamodb import DynamoDBClient
+from types_aiobotocore_s3 import S3Client
 from types_aiobotocore_sns import SNSClient
 
 from .settings import get_settings
 
+logger = Logger()
+
 session: AioSession = get_session()
 
 
@@ -23,3 +35,114 @@ def get_dynamodb_client() -> DynamoDBClient:
 
 def get_sns_client() -> SNSClient:
     return session.create_client("sns", **AWSClientConfig.create().model_dump())
+
+
+@dataclasses.dataclass(eq=False)
+class PooledClient:
+    loop: asyncio.AbstractEventLoop
+    lifespan: AsyncGenerator[Any, None]
+    client_task: "asyncio.Task[Any]"
+    leases: int = 0
+
+
+class ClientPool:
+    """Long-lived AWS clients that are reused across records and warm Lambda invocations.
+
+    The client is bound to the event loop it was created in, so it's recreated when the loop changes;
+    the client of the previous loop is closed when that loop shuts down.
+    A client that failed to be created, or whose request failed on a broken connection after botocore's retries,
+    is unhealthy - the next caller gets a new client, and the unhealthy one is closed
+    when the requests in flight on it complete.
+    """
+
+    def __init__(self) -> None:
+        self._clients: dict[str, PooledClient] = {}
+        self._unhealthy_clients: set[PooledClient] = set()
+
+    def get_dynamodb_client(self) -> AsyncContextManager[DynamoDBClient]:
+        return self._use_client("dynamodb")
+
+    def get_sns_client(self) -> AsyncContextManager[SNSClient]:
+        return self._use_client("sns")
+
+    def get_s3_client(self) -> AsyncContextManager[S3Client]:
+        return self._use_client("s3")
+
+    async def close(self) -> None:
+        pooled_clients = [*self._clients.values(), *self._unhealthy_clients]
+        self._clients.clear()
+        self._unhealthy_clients.clear()
+        for pooled_client in pooled_clients:
+            await _close_client(pooled_client)
+
+    @contextlib.asynccontextmanager
+    async def _use_client(self, service_name: str) -> AsyncIterator[Any]:
+        pooled_client = self._get_pooled_client(service_name)
+        pooled_client.leases += 1
+        try:
+            try:
+                client = await asyncio.shield(pooled_client.client_task)
+            except Exception:
+                self._mark_unhealthy(service_name, pooled_client)
+                raise
+            try:
+                yield client
+            except (BotocoreConnectionError, HTTPClientError):
+                logger.warning("aws_client_connection_failed", service_name=service_name)
+                self._mark_unhealthy(service_name, pooled_client)
+                raise
+        finally:
+            pooled_client.leases -= 1
+            if pooled_client in self._unhealthy_clients and not pooled_client.leases:
+                self._unhealthy_clients.discard(pooled_client)
+                await _close_client(pooled_client)
+
+    def _get_pooled_client(self, service_name: str) -> PooledClient:
+        loop = asyncio.get_running_loop()
+        pooled_client = self._clients.get(service_name)
+        if pooled_client is None or pooled_client.loop is not loop:
+            lifespan = _client_lifespan(service_name)
+            pooled_client = PooledClient(loop, lifespan, loop.create_task(_enter_client_lifespan(lifespan)))
+            self._clients[service_name] = pooled_client
+        return pooled_client
+
+    def _mark_unhealthy(self, service_name: str, pooled_client: PooledClient) -> None:
+        if self._clients.get(service_name) is pooled_client:
+            del self._clients[service_name]
+            self._unhealthy_clients.add(pooled_client)
+
+
+async def _client_lifespan(service_name: str) -> AsyncGenerator[Any, None]:
+    """Yield an open client, and close it when the generator is closed.
+
+    The event loop closes its suspended async generators when it shuts down, e.g. at the end of `asyncio.run`,
+    so a client isn't leaked when the loop changes.
+    """
+    settings = get_settings()
+    async with contextlib.AsyncExitStack() as exit_stack:
+        client = await exit_stack.enter_async_context(
+            session.create_client(
+                service_name,  # type: ignore
+                config=AioConfig(max_pool_connections=settings.aws_max_pool_connections),
+                **AWSClientConfig.create().model_dump(),
+            )
+        )
+        logger.info("aws_client_created", service_name=service_name)
+        yield client
+        logger.info("aws_client_closed", service_name=service_name)
+
+
+async def _enter_client_lifespan(lifespan: AsyncGenerator[Any, None]) -> Any:
+    return await anext(lifespan)
+
+
+async def _close_client(pooled_client: PooledClient) -> None:
+    if pooled_client.loop is not asyncio.get_running_loop():
+        return
+    with contextlib.suppress(Exception):
+        await pooled_client.client_task
+    with contextlib.suppress(Exception):
+        await pooled_client.lifespan.aclose()
+
+
+client_pool = ClientPool()
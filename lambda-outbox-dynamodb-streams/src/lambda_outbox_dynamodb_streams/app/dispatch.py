@@ -1,44 +1,393 @@
+import asyncio
+import base64
+import dataclasses
 import json
-from typing import Awaitable, Callable
+import time
+import uuid
+import zlib
+from collections import defaultdict
+from typing import Awaitable, Callable, TypedDict, TypeVar
 
 from aws_lambda_powertools.logging import Logger
-from tomodachi.envelope.json_base import JsonBase
-from transactional_messaging.outbox import PublishedMessage
+from botocore.exceptions import BotoCoreError, ClientError
+from tomodachi.envelope.json_base import PROTOCOL_VERSION, JsonBase
+from transactional_messaging.claim_check import CLAIM_CHECK_KEY, PayloadStore, is_claim_check_reference
 from types_aiobotocore_sns import SNSClient
+from types_aiobotocore_sns.type_defs import PublishBatchRequestEntryTypeDef
+
+from .message import DispatchableMessage, to_published_message
+from .serialization import JsonBackend, get_json_backend
+from .settings import Settings
 
 logger = Logger()
 
 TopicName = str
 TopicArn = str
 
-EnvelopeHandler = Callable[[PublishedMessage], Awaitable[str]]
+EnvelopeHandler = Callable[[DispatchableMessage], Awaitable[str]]
+
+T = TypeVar("T")
+
+PUBLISH_BATCH_MAX_ENTRIES = 10
+FIFO_TOPIC_SUFFIX = ".fifo"
+# Leaves room for the envelope in the 256 KB SNS message
+REHYDRATE_MAX_PAYLOAD_BYTES = 200 * 1024
+# JsonBase compresses the data of larger messages
+JSON_BASE_COMPRESSION_THRESHOLD = 60000
+TOPIC_NOT_FOUND_ERROR_CODES = ("NotFound", "NotFoundException")
+# Claim check references are serialized with `json.dumps` and the claim check key first
+CLAIM_CHECK_REFERENCE_PREFIX = f'{{"{CLAIM_CHECK_KEY}":'
+
+
+class FifoAttributes(TypedDict, total=False):
+    MessageGroupId: str
+    MessageDeduplicationId: str
+
+
+class MessageDispatchError(Exception):
+    pass
+
+
+class PreviousGroupMessageNotDispatchedError(MessageDispatchError):
+    pass
+
+
+class TopicNotFoundError(MessageDispatchError):
+    pass
 
 
 class TopicsCache:
-    def __init__(self, topic_name_prefix: str) -> None:
+    """Topic ARNs by topic name, resolved without SNS control-plane calls where possible.
+
+    With `topic_arn_prefix` - `arn:<partition>:sns:<region>:<account>:` - a topic ARN is built from the prefixed
+    topic name; `topics` preloads ARNs from configuration, and `list_topics` loads the prefixed topics
+    with a single ListTopics scan on first use. Otherwise, a topic is created with CreateTopic on first use.
+    A topic that's not found when publishing is created with CreateTopic; when that fails,
+    the topic is cached as not found for `not_found_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        topic_name_prefix: str,
+        topic_arn_prefix: str | None = None,
+        topics: dict[TopicName, TopicArn] | None = None,
+        list_topics: bool = False,
+        not_found_ttl: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
         self._topic_name_prefix = topic_name_prefix
-        self._topics: dict[TopicName, TopicArn] = {}
+        self._topic_arn_prefix = topic_arn_prefix
+        self._topics: dict[TopicName, TopicArn] = dict(topics or {})
+        self._list_topics = list_topics
+        self._not_found_ttl = not_found_ttl
+        self._clock = clock
+        self._not_found_until: dict[TopicName, float] = {}
+        self._topics_listed = False
+
+    @staticmethod
+    def create(settings: Settings) -> "TopicsCache":
+        return TopicsCache(
+            topic_name_prefix=settings.aws_sns_topic_prefix,
+            topic_arn_prefix=settings.aws_sns_topic_arn_prefix,
+            topics=settings.aws_sns_topic_arns,
+            list_topics=settings.aws_sns_list_topics,
+            not_found_ttl=settings.aws_sns_topic_not_found_ttl,
+        )
 
     async def get_or_create_topic(self, topic: str, client: SNSClient) -> str:
         topic_arn = self._topics.get(topic)
-        if topic_arn is None:
-            create_topic_response = await client.create_topic(Name=self._prefix_topic(topic))
-            topic_arn = create_topic_response["TopicArn"]
+        if topic_arn is not None:
+            return topic_arn
+        self._raise_if_not_found(topic)
+        if self._list_topics and not self._topics_listed:
+            await self.load_topics(client)
+            if topic_arn := self._topics.get(topic):
+                return topic_arn
+        if self._topic_arn_prefix is not None:
+            topic_arn = f"{self._topic_arn_prefix}{self._prefix_topic(topic)}"
             self._topics[topic] = topic_arn
+            return topic_arn
+        return await self.create_topic(topic, client)
+
+    async def create_topic(self, topic: str, client: SNSClient) -> str:
+        self._raise_if_not_found(topic)
+        try:
+            if is_fifo_topic(topic):
+                create_topic_response = await client.create_topic(
+                    Name=self._prefix_topic(topic), Attributes={"FifoTopic": "true"}
+                )
+            else:
+                create_topic_response = await client.create_topic(Name=self._prefix_topic(topic))
+        except ClientError as e:
+            self._not_found_until[topic] = self._clock() + self._not_found_ttl
+            raise TopicNotFoundError(topic, str(e)) from e
+        topic_arn = create_topic_response["TopicArn"]
+        self._topics[topic] = topic_arn
+        self._not_found_until.pop(topic, None)
         return topic_arn
 
+    async def load_topics(self, client: SNSClient) -> None:
+        """Load ARNs of the topics with the topic name prefix with ListTopics."""
+        async for page in client.get_paginator("list_topics").paginate():
+            for listed_topic in page.get("Topics", []):
+                topic_arn = listed_topic["TopicArn"]
+                topic_name = topic_arn.rsplit(":", 1)[-1]
+                if topic_name.startswith(self._topic_name_prefix):
+                    self._topics.setdefault(topic_name[len(self._topic_name_prefix) :], topic_arn)
+        self._topics_listed = True
+        logger.info("topics_loaded", topics_count=len(self._topics))
+
+    def invalidate(self, topic: str) -> None:
+        self._topics.pop(topic, None)
+
+    def _raise_if_not_found(self, topic: str) -> None:
+        not_found_until = self._not_found_until.get(topic)
+        if not_found_until is None:
+            return
+        if self._clock() < not_found_until:
+            raise TopicNotFoundError(topic, "topic not found")
+        del self._not_found_until[topic]
+
     def _prefix_topic(self, topic: str) -> str:
         return f"{self._topic_name_prefix}{topic}"
 
 
-async def envelope_json_message(message: PublishedMessage) -> str:
+def is_fifo_topic(topic: str) -> bool:
+    return topic.endswith(FIFO_TOPIC_SUFFIX)
+
+
+def is_topic_not_found_error(error: Exception) -> bool:
+    return isinstance(error, ClientError) and error.response.get("Error", {}).get("Code") in TOPIC_NOT_FOUND_ERROR_CODES
+
+
+def get_fifo_attributes(message: DispatchableMessage) -> FifoAttributes:
+    """Messages of an aggregate are delivered in order; a retried message is deduplicated by its ID."""
+    if not is_fifo_topic(message.topic):
+        return {}
+    return {"MessageGroupId": str(message.aggregate_id), "MessageDeduplicationId": str(message.message_id)}
+
+
+async def envelope_json_message(message: DispatchableMessage) -> str:
     return await JsonBase.build_message(service={}, topic=message.topic, data=json.loads(message.message))
 
 
+async def envelope_serialized_json_message(message: DispatchableMessage) -> str:
+    """The `JsonBase` envelope of `envelope_json_message`, with the serialized payload spliced in as is.
+
+    The payload isn't parsed and serialized again, and the output is the same
+    for payloads serialized with `json.dumps`, as outbox messages are.
+    """
+    data, data_encoding = message.message, "raw"
+    if len(data) >= JSON_BASE_COMPRESSION_THRESHOLD:
+        data = json.dumps(base64.b64encode(zlib.compress(data.encode())).decode())
+        data_encoding = "base64_gzip_json"
+    envelope = json.dumps(
+        {
+            "service": {"name": None, "uuid": None},
+            "metadata": {
+                "message_uuid": f".{uuid.uuid4()}",
+                "protocol_version": PROTOCOL_VERSION,
+                "compatible_protocol_versions": ["json_base-wip"],
+                "timestamp": time.time(),
+                "topic": message.topic,
+                "data_encoding": data_encoding,
+            },
+        }
+    )
+    return f'{envelope[:-1]}, "data": {data}}}'
+
+
+def create_rehydrating_envelope_handler(
+    envelope_handler: EnvelopeHandler,
+    store: PayloadStore,
+    max_payload_bytes: int = REHYDRATE_MAX_PAYLOAD_BYTES,
+    json_backend: JsonBackend | None = None,
+) -> EnvelopeHandler:
+    """Envelope the payload of a claim-checked message instead of the reference to it.
+
+    A payload larger than `max_payload_bytes` doesn't fit in the SNS message,
+    so its reference is forwarded, and the consumer resolves it.
+    Only payloads that start like a claim check reference are parsed.
+    """
+
+    loads = (json_backend or get_json_backend()).loads
+
+    async def _envelope_rehydrated_message(message: DispatchableMessage) -> str:
+        if not message.message.startswith(CLAIM_CHECK_REFERENCE_PREFIX):
+            return await envelope_handler(message)
+        data = loads(message.message)
+        if not is_claim_check_reference(data) or data[CLAIM_CHECK_KEY].get("size", 0) > max_payload_bytes:
+            return await envelope_handler(message)
+        payload = await store.get(data[CLAIM_CHECK_KEY]["uri"])
+        logger.info("message_payload_rehydrated", message_id=message.message_id, payload_size=len(payload))
+        rehydrated_message = dataclasses.replace(to_published_message(message), message=payload.decode())
+        return await envelope_handler(rehydrated_message)
+
+    return _envelope_rehydrated_message
+
+
 async def dispatch_message(
-    client: SNSClient, message: PublishedMessage, envelope_handler: EnvelopeHandler, topics_cache: TopicsCache
+    client: SNSClient, message: DispatchableMessage, envelope_handler: EnvelopeHandler, topics_cache: TopicsCache
 ) -> None:
-    topic_arn = await topics_cache.get_or_create_topic(topic=message.topic, client=client)
     envelope = await envelope_handler(message)
-    await client.publish(Message=envelope, TopicArn=topic_arn)
+    topic_arn, _ = await _publish_to_topic(
+        client,
+        message.topic,
+        topics_cache,
+        lambda topic_arn: client.publish(Message=envelope, TopicArn=topic_arn, **get_fifo_attributes(message)),
+    )
     logger.info("message_dispatched", message_id=message.message_id, topic_name=message.topic, topic_arn=topic_arn)
+
+
+async def dispatch_messages_batch(
+    client: SNSClient, messages: list[DispatchableMessage], envelope_handler: EnvelopeHandler, topics_cache: TopicsCache
+) -> dict[uuid.UUID, MessageDispatchError]:
+    """Publish messages with SNS PublishBatch, grouped by topic in chunks of 10 entries.
+
+    Messages to a FIFO topic are split into lanes of whole message groups - lanes are published concurrently,
+    chunks of a lane one after another, so the messages of an aggregate are published in the given order.
+    When a message fails, the following messages of its group aren't published.
+    Returns failed messages' IDs mapped to the error; messages not present in the result are dispatched.
+    """
+    messages_by_topic: dict[TopicName, list[DispatchableMessage]] = defaultdict(list)
+    for message in messages:
+        messages_by_topic[message.topic].append(message)
+
+    publishers: list[Awaitable[dict[uuid.UUID, MessageDispatchError]]] = []
+    for topic, topic_messages in messages_by_topic.items():
+        if is_fifo_topic(topic):
+            publishers += [
+                _publish_lane(client, topic, _chunk(lane), envelope_handler, topics_cache)
+                for lane in _split_into_group_lanes(topic_messages)
+            ]
+        else:
+            publishers += [
+                _publish_batch(client, topic, chunk, envelope_handler, topics_cache) for chunk in _chunk(topic_messages)
+            ]
+    results = await asyncio.gather(*publishers)
+    return {message_id: error for result in results for message_id, error in result.items()}
+
+
+async def _publish_to_topic(
+    client: SNSClient, topic: str, topics_cache: TopicsCache, publish: Callable[[TopicArn], Awaitable[T]]
+) -> tuple[TopicArn, T]:
+    """Publish to the cached topic ARN; when the topic isn't found, create it and publish again."""
+    topic_arn = await topics_cache.get_or_create_topic(topic=topic, client=client)
+    try:
+        return topic_arn, await publish(topic_arn)
+    except ClientError as e:
+        if not is_topic_not_found_error(e):
+            raise
+    logger.warning("topic_not_found", topic_name=topic, topic_arn=topic_arn)
+    topics_cache.invalidate(topic)
+    topic_arn = await topics_cache.create_topic(topic=topic, client=client)
+    return topic_arn, await publish(topic_arn)
+
+
+def _chunk(messages: list[DispatchableMessage]) -> list[list[DispatchableMessage]]:
+    return [messages[i : i + PUBLISH_BATCH_MAX_ENTRIES] for i in range(0, len(messages), PUBLISH_BATCH_MAX_ENTRIES)]
+
+
+def _split_into_group_lanes(messages: list[DispatchableMessage]) -> list[list[DispatchableMessage]]:
+    messages_by_group: dict[uuid.UUID, list[DispatchableMessage]] = defaultdict(list)
+    for message in messages:
+        messages_by_group[message.aggregate_id].append(message)
+    lanes_count = -(-len(messages) // PUBLISH_BATCH_MAX_ENTRIES)
+    lanes: list[list[DispatchableMessage]] = [[] for _ in range(lanes_count)]
+    # Larger groups first, each to the shortest lane, so the lanes are about the same length
+    for group_messages in sorted(messages_by_group.values(), key=len, reverse=True):
+        min(lanes, key=len).extend(group_messages)
+    return [lane for lane in lanes if lane]
+
+
+async def _publish_lane(
+    client: SNSClient,
+    topic: str,
+    chunks: list[list[DispatchableMessage]],
+    envelope_handler: EnvelopeHandler,
+    topics_cache: TopicsCache,
+) -> dict[uuid.UUID, MessageDispatchError]:
+    failures: dict[uuid.UUID, MessageDispatchError] = {}
+    failed_groups: set[uuid.UUID] = set()
+    for chunk in chunks:
+        publish_messages: list[DispatchableMessage] = []
+        for message in chunk:
+            if message.aggregate_id in failed_groups:
+                failures[message.message_id] = PreviousGroupMessageNotDispatchedError(message.message_id)
+            else:
+                publish_messages.append(message)
+        if not publish_messages:
+            continue
+        chunk_failures = await _publish_batch(client, topic, publish_messages, envelope_handler, topics_cache)
+        failures.update(chunk_failures)
+        failed_groups.update(message.aggregate_id for message in publish_messages if message.message_id in failures)
+    return failures
+
+
+async def _publish_batch(
+    client: SNSClient,
+    topic: str,
+    messages: list[DispatchableMessage],
+    envelope_handler: EnvelopeHandler,
+    topics_cache: TopicsCache,
+) -> dict[uuid.UUID, MessageDispatchError]:
+    entries, failures = await _create_batch_entries(messages, envelope_handler)
+    if not entries:
+        return failures
+    try:
+        topic_arn, response = await _publish_to_topic(
+            client,
+            topic,
+            topics_cache,
+            lambda topic_arn: client.publish_batch(TopicArn=topic_arn, PublishBatchRequestEntries=entries),
+        )
+    except (BotoCoreError, ClientError, MessageDispatchError) as e:
+        logger.exception("message_batch_dispatch_failed", topic_name=topic, message_count=len(entries))
+        for entry in entries:
+            message = messages[int(entry["Id"])]
+            failures[message.message_id] = MessageDispatchError(message.message_id, str(e))
+        return failures
+
+    for successful_entry in response.get("Successful", []):
+        message = messages[int(successful_entry["Id"])]
+        logger.info("message_dispatched", message_id=message.message_id, topic_name=topic, topic_arn=topic_arn)
+
+    for failed_entry in response.get("Failed", []):
+        message = messages[int(failed_entry["Id"])]
+        logger.error(
+            "message_dispatch_failed",
+            message_id=message.message_id,
+            topic_name=topic,
+            topic_arn=topic_arn,
+            code=failed_entry["Code"],
+            sender_fault=failed_entry["SenderFault"],
+        )
+        failures[message.message_id] = MessageDispatchError(
+            message.message_id, failed_entry["Code"], failed_entry.get("Message")
+        )
+    return failures
+
+
+async def _create_batch_entries(
+    messages: list[DispatchableMessage], envelope_handler: EnvelopeHandler
+) -> tuple[list[PublishBatchRequestEntryTypeDef], dict[uuid.UUID, MessageDispatchError]]:
+    """Envelope messages one by one, so a message that can't be enveloped doesn't fail the rest of the chunk.
+
+    Following messages of a FIFO message's group aren't published, to keep the group in order.
+    """
+    entries: list[PublishBatchRequestEntryTypeDef] = []
+    failures: dict[uuid.UUID, MessageDispatchError] = {}
+    failed_groups: set[uuid.UUID] = set()
+    for index, message in enumerate(messages):
+        if is_fifo_topic(message.topic) and message.aggregate_id in failed_groups:
+            failures[message.message_id] = PreviousGroupMessageNotDispatchedError(message.message_id)
+            continue
+        try:
+            envelope = await envelope_handler(message)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logger.exception("message_envelope_failed", message_id=message.message_id, topic_name=message.topic)
+            failures[message.message_id] = MessageDispatchError(message.message_id, str(e))
+            failed_groups.add(message.aggregate_id)
+            continue
+        entries.append({"Id": str(index), "Message": envelope, **get_fifo_attributes(message)})
+    return entries, failures
@@ -0,0 +1,20 @@
+from transactional_messaging.s3 import S3PayloadStore
+
+from . import clients
+from .dispatch import EnvelopeHandler, create_rehydrating_envelope_handler, envelope_serialized_json_message
+from .serialization import get_json_backend
+from .settings import get_settings
+
+
+def create_envelope_handler() -> EnvelopeHandler:
+    """JSON envelope; with a claim check bucket, claim-checked payloads are rehydrated into the envelope."""
+    settings = get_settings()
+    if not settings.outbox_claim_check_s3_bucket:
+        return envelope_serialized_json_message
+    store = S3PayloadStore(settings.outbox_claim_check_s3_bucket, clients.client_pool.get_s3_client)
+    return create_rehydrating_envelope_handler(
+        envelope_serialized_json_message,
+        store,
+        max_payload_bytes=settings.outbox_claim_check_rehydrate_max_bytes,
+        json_backend=get_json_backend(settings.outbox_json_backend),
+    )
@@ -0,0 +1,46 @@
+from typing import Any
+
+# DynamoDB TTL deletes items on behalf of this service principal
+TTL_USER_IDENTITY = {"type": "Service", "principalId": "dynamodb.amazonaws.com"}
+
+# Event source mapping filter patterns; records that match none of the patterns don't invoke the Lambda.
+# Marking a message as dispatched modifies the item, so without the filter every message invokes the Lambda twice.
+NOT_DISPATCHED_MESSAGE_INSERT_FILTER_PATTERN: dict[str, Any] = {
+    "eventName": ["INSERT"],
+    "dynamodb": {"NewImage": {"NotDispatched": {"S": [{"exists": True}]}}},
+}
+EXPIRED_MESSAGE_REMOVE_FILTER_PATTERN: dict[str, Any] = {
+    "eventName": ["REMOVE"],
+    "userIdentity": {"type": [TTL_USER_IDENTITY["type"]], "principalId": [TTL_USER_IDENTITY["principalId"]]},
+}
+
+
+def get_filter_patterns(archive_expired_messages: bool) -> list[dict[str, Any]]:
+    if archive_expired_messages:
+        return [NOT_DISPATCHED_MESSAGE_INSERT_FILTER_PATTERN, EXPIRED_MESSAGE_REMOVE_FILTER_PATTERN]
+    return [NOT_DISPATCHED_MESSAGE_INSERT_FILTER_PATTERN]
+
+
+def is_not_dispatched_message_insert_record(raw_record: dict[str, Any]) -> bool:
+    if raw_record.get("eventName") != "INSERT":
+        return False
+    new_image = raw_record.get("dynamodb", {}).get("NewImage") or {}
+    return "S" in new_image.get("NotDispatched", {})
+
+
+def is_expired_message_remove_record(raw_record: dict[str, Any]) -> bool:
+    return raw_record.get("eventName") == "REMOVE" and raw_record.get("userIdentity") == TTL_USER_IDENTITY
+
+
+def filter_stream_event(event: dict[str, Any], archive_expired_messages: bool) -> dict[str, Any]:
+    """Drop the records that the event source mapping filter patterns drop.
+
+    Stand-ins of the event source mapping, like Moto, ignore the filter criteria.
+    """
+    records = [
+        record
+        for record in event.get("Records", [])
+        if is_not_dispatched_message_insert_record(record)
+        or (archive_expired_messages and is_expired_message_remove_record(record))
+    ]
+    return {**event, "Records": records}
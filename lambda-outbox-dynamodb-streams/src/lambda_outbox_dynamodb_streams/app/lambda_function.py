@@ -1,3 +1,4 @@
+import functools
 import os
 
 from aws_lambda_powertools.utilities.batch import AsyncBatchProcessor, EventType, async_process_partial_response
@@ -11,36 +12,74 @@ from aws_lambda_powertools.utilities.data_classes.dynamo_db_stream_event import
 from aws_lambda_powertools.utilities.typing import LambdaContext
 
 from . import clients
-from .dispatch import TopicsCache, dispatch_message, envelope_json_message
+from .archive import ArchiveBatch, S3ArchiveTarget
+from .batch import DispatchBatch
+from .dispatch import TopicsCache, dispatch_message
+from .envelope import create_envelope_handler
+from .filters import filter_stream_event
 from .message import create_published_message_from_dynamodb_stream_record
 from .outbox_repository import create_outbox_repository
+from .scheduler import DispatchScheduler
 from .settings import get_settings
 
 settings = get_settings()
 processor = AsyncBatchProcessor(event_type=EventType.DynamoDBStreams)
-topics_cache = TopicsCache(topic_name_prefix=settings.aws_sns_topic_prefix)
+topics_cache = TopicsCache.create(settings)
+envelope_handler = create_envelope_handler()
 
 
 # Moto doesn't work well when the item from the same table is updated -
 # Lambda functions end up in an infinite loop; DynamoDB put_item operation gets stuck
 
 
-async def async_record_handler(record: DynamoDBRecord) -> None:
-    if record.event_name == DynamoDBRecordEventName.INSERT:
+async def async_record_handler(record: DynamoDBRecord, archive_batch: ArchiveBatch | None = None) -> None:
+    if record.event_name == DynamoDBRecordEventName.REMOVE and archive_batch:
+        await archive_batch.wait_archived(record)
+    elif record.event_name == DynamoDBRecordEventName.INSERT:
         published_message = create_published_message_from_dynamodb_stream_record(record)
 
-        async with clients.get_sns_client() as sns_client:
-            await dispatch_message(sns_client, published_message, envelope_json_message, topics_cache)
+        async with clients.client_pool.get_sns_client() as sns_client:
+            await dispatch_message(sns_client, published_message, envelope_handler, topics_cache)
 
         if not os.getenv("OUTBOX_SKIP_MARK_MESSAGES_AS_DISPATCHED"):
             await create_outbox_repository().mark_as_dispatched(message_id=published_message.message_id)
 
 
+async def async_batch_record_handler(
+    record: DynamoDBRecord, dispatch_batch: DispatchBatch, archive_batch: ArchiveBatch | None = None
+) -> None:
+    if record.event_name == DynamoDBRecordEventName.REMOVE and archive_batch:
+        await archive_batch.wait_archived(record)
+    elif record.event_name == DynamoDBRecordEventName.INSERT:
+        await dispatch_batch.wait_dispatched(record)
+
+
 @event_source(data_class=DynamoDBStreamEvent)  # pylint: disable=no-value-for-parameter
 def lambda_handler(event: DynamoDBStreamEvent, context: LambdaContext) -> PartialItemFailureResponse:
+    archive_expired_messages = bool(settings.outbox_archive_s3_bucket)
+    event = DynamoDBStreamEvent(filter_stream_event(event.raw_event, archive_expired_messages))
+    archive_batch = (
+        ArchiveBatch(
+            event.records,
+            S3ArchiveTarget(settings.outbox_archive_s3_bucket),
+            key_prefix=settings.outbox_archive_s3_key_prefix,
+        )
+        if settings.outbox_archive_s3_bucket
+        else None
+    )
+    if settings.outbox_dispatch_mode == "ordered":
+        dispatch_scheduler = DispatchScheduler(event.records, max_concurrency=settings.outbox_dispatch_max_concurrency)
+        handler = functools.partial(async_record_handler, archive_batch=archive_batch)
+        record_handler = functools.partial(dispatch_scheduler.run, handler=handler)
+    else:
+        outbox_repository = None if os.getenv("OUTBOX_SKIP_MARK_MESSAGES_AS_DISPATCHED") else create_outbox_repository()
+        dispatch_batch = DispatchBatch(event.records, envelope_handler, topics_cache, outbox_repository)
+        record_handler = functools.partial(
+            async_batch_record_handler, dispatch_batch=dispatch_batch, archive_batch=archive_batch
+        )
     return async_process_partial_response(
         event=event,  # type: ignore
-        record_handler=async_record_handler,
+        record_handler=record_handler,
         processor=processor,
         context=context,
     )
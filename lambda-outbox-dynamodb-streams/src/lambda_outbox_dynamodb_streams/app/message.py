@@ -1,19 +1,117 @@
+import base64
+import datetime
 import uuid
+from functools import cached_property
+from typing import Any, Protocol
 
 from aws_lambda_powertools.utilities.data_classes.dynamo_db_stream_event import DynamoDBRecord
+from transactional_messaging.dynamodb.compression import MESSAGE_CODEC_ATTRIBUTE_NAME, decompress_message
 from transactional_messaging.outbox import PublishedMessage
 
 from .time import str_to_datetime
 
+AttributeValue = dict[str, Any]
 
-def create_published_message_from_dynamodb_stream_record(record: DynamoDBRecord) -> PublishedMessage:
-    if record.dynamodb and record.dynamodb.new_image:
-        return PublishedMessage(
-            message_id=uuid.UUID(record.dynamodb.new_image["MessageId"]),
-            aggregate_id=uuid.UUID(record.dynamodb.new_image["AggregateId"]),
-            correlation_id=uuid.UUID(record.dynamodb.new_image["CorrelationId"]),
-            topic=record.dynamodb.new_image["Topic"],
-            message=record.dynamodb.new_image["Message"],
-            created_at=str_to_datetime(record.dynamodb.new_image["CreatedAt"]),
-        )
+PUBLISHED_MESSAGE_ATTRIBUTE_NAMES = ("MessageId", "AggregateId", "CorrelationId", "Topic", "Message", "CreatedAt")
+
+
+class DispatchableMessage(Protocol):
+    """Outbox message read by the dispatcher - a `PublishedMessage` or a lazily decoded `StreamRecordMessage`."""
+
+    @property
+    def message_id(self) -> uuid.UUID:
+        ...
+
+    @property
+    def aggregate_id(self) -> uuid.UUID:
+        ...
+
+    @property
+    def correlation_id(self) -> uuid.UUID:
+        ...
+
+    @property
+    def topic(self) -> str:
+        ...
+
+    @property
+    def message(self) -> str:
+        ...
+
+    @property
+    def created_at(self) -> datetime.datetime:
+        ...
+
+
+class StreamRecordMessage(DispatchableMessage):
+    """Published message read from the raw `NewImage` of a DynamoDB stream record.
+
+    Attributes are decoded from the image on first access, so the IDs and the creation time
+    aren't parsed unless they're read, and the image isn't deserialized as a whole.
+    """
+
+    def __init__(self, image: dict[str, AttributeValue]) -> None:
+        self._image = image
+
+    @cached_property
+    def message_id(self) -> uuid.UUID:
+        return uuid.UUID(self._image["MessageId"]["S"])
+
+    @cached_property
+    def aggregate_id(self) -> uuid.UUID:
+        return uuid.UUID(self._image["AggregateId"]["S"])
+
+    @cached_property
+    def correlation_id(self) -> uuid.UUID:
+        return uuid.UUID(self._image["CorrelationId"]["S"])
+
+    @cached_property
+    def topic(self) -> str:
+        return self._image["Topic"]["S"]
+
+    @cached_property
+    def message(self) -> str:
+        return _image_to_message(self._image)
+
+    @cached_property
+    def created_at(self) -> datetime.datetime:
+        return str_to_datetime(self._image["CreatedAt"]["S"])
+
+
+def to_published_message(message: DispatchableMessage) -> PublishedMessage:
+    """`PublishedMessage` of the dispatchable message; a stream record message is decoded as a whole."""
+    if isinstance(message, PublishedMessage):
+        return message
+    return PublishedMessage(
+        message_id=message.message_id,
+        aggregate_id=message.aggregate_id,
+        correlation_id=message.correlation_id,
+        topic=message.topic,
+        message=message.message,
+        created_at=message.created_at,
+    )
+
+
+def create_published_message_from_dynamodb_stream_record(record: DynamoDBRecord) -> StreamRecordMessage:
+    return create_published_message_from_raw_stream_record(record.raw_event)
+
+
+def create_published_message_from_raw_stream_record(raw_record: dict[str, Any]) -> StreamRecordMessage:
+    image: dict[str, AttributeValue] | None = raw_record.get("dynamodb", {}).get("NewImage")
+    if image and all(attribute_name in image for attribute_name in PUBLISHED_MESSAGE_ATTRIBUTE_NAMES):
+        return StreamRecordMessage(image)
     raise ValueError("PublishedMessage not created from stream record")
+
+
+def get_raw_image_attribute(record: DynamoDBRecord, attribute_name: str) -> str | None:
+    """String attribute of the record's `NewImage`, read without deserializing the image."""
+    image = record.raw_event.get("dynamodb", {}).get("NewImage") or {}
+    return image.get(attribute_name, {}).get("S")
+
+
+def _image_to_message(image: dict[str, AttributeValue]) -> str:
+    codec = image.get(MESSAGE_CODEC_ATTRIBUTE_NAME)
+    if not codec:
+        return image["Message"]["S"]
+    # Binary attributes of a stream record are base64-encoded
+    return decompress_message(base64.b64decode(image["Message"]["B"]), codec["S"])
@@ -1,3 +1,6 @@
+import datetime
+from functools import lru_cache
+
 from transactional_messaging.dynamodb import DynamoDBOutboxRepository
 from unit_of_work.dynamodb import DynamoDBSession
 
@@ -5,7 +8,18 @@ from . import clients
 from .settings import get_settings
 
 
+@lru_cache
 def create_outbox_repository() -> DynamoDBOutboxRepository:
     settings = get_settings()
-    session = DynamoDBSession(clients.get_dynamodb_client)
-    return DynamoDBOutboxRepository(table_name=settings.dynamodb_outbox_table_name, session=session, topic_map={})
+    session = DynamoDBSession(clients.client_pool.get_dynamodb_client)
+    dispatched_retention = (
+        datetime.timedelta(days=settings.outbox_dispatched_retention_days)
+        if settings.outbox_dispatched_retention_days is not None
+        else None
+    )
+    return DynamoDBOutboxRepository(
+        table_name=settings.dynamodb_outbox_table_name,
+        session=session,
+        topic_map={},
+        dispatched_retention=dispatched_retention,
+    )
@@ -0,0 +1,172 @@
+import argparse
+import asyncio
+import json
+import uuid
+from pathlib import Path
+
+from aws_lambda_powertools.logging import Logger
+from transactional_messaging.dynamodb import DynamoDBOutboxRepository
+from transactional_messaging.dynamodb.outbox import SCAN_PAGE_SIZE
+from transactional_messaging.outbox import PublishedMessage
+
+from . import clients
+from .dispatch import EnvelopeHandler, TopicsCache
+from .envelope import create_envelope_handler
+from .outbox_repository import create_outbox_repository
+from .relay import dispatch_and_mark_as_dispatched
+from .settings import get_settings
+
+logger = Logger()
+
+TOTAL_SEGMENTS = 8
+DISPATCH_CONCURRENCY = 50
+
+
+class ScanCheckpoint:
+    """Progress of every scan segment, persisted to a JSON file after every page when the path is given.
+
+    An interrupted scan resumes every segment from the last checkpointed page and skips the completed segments.
+    """
+
+    def __init__(self, total_segments: int, path: Path | None = None) -> None:
+        self.total_segments = total_segments
+        self._path = path
+        self._cursors: dict[int, str | None] = {}
+        self._completed_segments: set[int] = set()
+        if path and path.exists():
+            self._load(path)
+
+    def get_cursor(self, segment: int) -> str | None:
+        return self._cursors.get(segment)
+
+    def is_completed(self, segment: int) -> bool:
+        return segment in self._completed_segments
+
+    def update(self, segment: int, cursor: str | None) -> None:
+        if cursor is None:
+            self._completed_segments.add(segment)
+            self._cursors.pop(segment, None)
+        else:
+            self._cursors[segment] = cursor
+        if self._path:
+            self._save(self._path)
+
+    def _load(self, path: Path) -> None:
+        checkpoint = json.loads(path.read_text(encoding="utf-8"))
+        if checkpoint["total_segments"] != self.total_segments:
+            raise ValueError(
+                f"Checkpoint {path} was created with {checkpoint['total_segments']} total segments, "
+                f"not {self.total_segments}"
+            )
+        self._cursors = {int(segment): cursor for segment, cursor in checkpoint["cursors"].items()}
+        self._completed_segments = set(checkpoint["completed_segments"])
+
+    def _save(self, path: Path) -> None:
+        checkpoint = {
+            "total_segments": self.total_segments,
+            "cursors": self._cursors,
+            "completed_segments": sorted(self._completed_segments),
+        }
+        tmp_path = path.with_suffix(f"{path.suffix}.tmp")
+        tmp_path.write_text(json.dumps(checkpoint), encoding="utf-8")
+        tmp_path.replace(path)
+
+
+class OutboxRecoveryScan:
+    """Finds every message with `IsDispatched = false` with a parallel Scan of the Outbox table and dispatches it.
+
+    A disaster recovery tool for messages that neither the DynamoDB Streams nor the `NotDispatchedMessagesIndex`
+    relay can see anymore. Every segment is scanned by its own worker, and messages are dispatched page by page.
+    """
+
+    def __init__(
+        self,
+        outbox_repository: DynamoDBOutboxRepository,
+        envelope_handler: EnvelopeHandler,
+        topics_cache: TopicsCache,
+        checkpoint: ScanCheckpoint,
+        page_size: int = SCAN_PAGE_SIZE,
+        dispatch_concurrency: int = DISPATCH_CONCURRENCY,
+    ) -> None:
+        self._outbox_repository = outbox_repository
+        self._envelope_handler = envelope_handler
+        self._topics_cache = topics_cache
+        self._checkpoint = checkpoint
+        self._page_size = page_size
+        self._dispatch_concurrency = dispatch_concurrency
+
+    async def run(self) -> int:
+        total_segments = self._checkpoint.total_segments
+        segments = [segment for segment in range(total_segments) if not self._checkpoint.is_completed(segment)]
+        logger.info("outbox_recovery_scan_started", total_segments=total_segments, segments=segments)
+        dispatched_messages_counts = await asyncio.gather(*[self._scan_segment(segment) for segment in segments])
+        dispatched_messages_count = sum(dispatched_messages_counts)
+        logger.info("outbox_recovery_scan_finished", dispatched_messages_count=dispatched_messages_count)
+        return dispatched_messages_count
+
+    async def _scan_segment(self, segment: int) -> int:
+        dispatched_messages_count = 0
+        pages = self._outbox_repository.scan_not_dispatched_message_ids(
+            segment=segment,
+            total_segments=self._checkpoint.total_segments,
+            page_size=self._page_size,
+            cursor=self._checkpoint.get_cursor(segment),
+        )
+        async for page in pages:
+            if page.message_ids:
+                messages = await self._get_not_dispatched_messages(page.message_ids)
+                dispatched_message_ids = await dispatch_and_mark_as_dispatched(
+                    messages,
+                    self._outbox_repository,
+                    self._envelope_handler,
+                    self._topics_cache,
+                    concurrency=self._dispatch_concurrency,
+                )
+                dispatched_messages_count += len(dispatched_message_ids)
+                logger.info(
+                    "outbox_recovery_scan_page_dispatched",
+                    segment=segment,
+                    found_messages_count=len(page.message_ids),
+                    dispatched_messages_count=len(dispatched_message_ids),
+                )
+            self._checkpoint.update(segment, page.cursor)
+        return dispatched_messages_count
+
+    async def _get_not_dispatched_messages(self, message_ids: list[uuid.UUID]) -> list[PublishedMessage]:
+        messages = await self._outbox_repository.get_many(message_ids)
+        # The message could have been dispatched by the Lambda function since it was scanned
+        return [message for message in messages if not message.is_dispatched]
+
+
+async def run_outbox_recovery_scan(
+    total_segments: int, checkpoint_path: Path | None, page_size: int, dispatch_concurrency: int
+) -> int:
+    settings = get_settings()
+    recovery_scan = OutboxRecoveryScan(
+        outbox_repository=create_outbox_repository(),
+        envelope_handler=create_envelope_handler(),
+        topics_cache=TopicsCache.create(settings),
+        checkpoint=ScanCheckpoint(total_segments, checkpoint_path),
+        page_size=page_size,
+        dispatch_concurrency=dispatch_concurrency,
+    )
+    try:
+        return await recovery_scan.run()
+    finally:
+        await clients.client_pool.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Dispatch every not dispatched message found with a parallel Scan")
+    parser.add_argument("--total-segments", type=int, default=TOTAL_SEGMENTS)
+    parser.add_argument("--checkpoint-path", type=Path, default=None)
+    parser.add_argument("--page-size", type=int, default=SCAN_PAGE_SIZE)
+    parser.add_argument("--dispatch-concurrency", type=int, default=DISPATCH_CONCURRENCY)
+    args = parser.parse_args()
+    asyncio.run(
+        run_outbox_recovery_scan(args.total_segments, args.checkpoint_path, args.page_size, args.dispatch_concurrency)
+    )
+
+
+if __name__ == "__main__":
+    main()
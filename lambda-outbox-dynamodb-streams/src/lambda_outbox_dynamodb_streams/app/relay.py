@@ -0,0 +1,215 @@
+import asyncio
+import contextlib
+import signal
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+
+from aws_lambda_powertools.logging import Logger
+from transactional_messaging.outbox import OutboxRepository, PublishedMessage
+from types_aiobotocore_sns import SNSClient
+
+from . import clients
+from .dispatch import EnvelopeHandler, TopicsCache, dispatch_message, is_fifo_topic
+from .envelope import create_envelope_handler
+from .outbox_repository import create_outbox_repository
+from .settings import Settings, get_settings
+
+logger = Logger()
+
+MessageGroupKey = tuple[str, uuid.UUID]
+
+
+@dataclass
+class AdaptivePolling:
+    """Poll interval, batch size and concurrency of the relay that adapt to the outbox backlog.
+
+    A full batch means there's a backlog - the next poll starts immediately with a twice as large batch;
+    a partial batch shrinks the batch size back, and empty polls back off the poll interval exponentially.
+    """
+
+    min_poll_interval: float
+    max_poll_interval: float
+    min_batch_size: int
+    max_batch_size: int
+    max_concurrency: int
+
+    def __post_init__(self) -> None:
+        self.poll_interval = self.min_poll_interval
+        self.batch_size = self.min_batch_size
+
+    @staticmethod
+    def create(settings: Settings) -> "AdaptivePolling":
+        return AdaptivePolling(
+            min_poll_interval=settings.outbox_relay_min_poll_interval,
+            max_poll_interval=settings.outbox_relay_max_poll_interval,
+            min_batch_size=settings.outbox_relay_min_batch_size,
+            max_batch_size=settings.outbox_relay_max_batch_size,
+            max_concurrency=settings.outbox_relay_max_concurrency,
+        )
+
+    @property
+    def concurrency(self) -> int:
+        return min(self.batch_size, self.max_concurrency)
+
+    def update(self, fetched_messages_count: int) -> None:
+        if fetched_messages_count >= self.batch_size:
+            self.poll_interval = 0
+            self.batch_size = min(self.batch_size * 2, self.max_batch_size)
+        elif fetched_messages_count > 0:
+            self.poll_interval = self.min_poll_interval
+            self.batch_size = max(self.batch_size // 2, self.min_batch_size)
+        else:
+            self.poll_interval = min(max(self.poll_interval * 2, self.min_poll_interval), self.max_poll_interval)
+            self.batch_size = self.min_batch_size
+
+
+class OutboxRelay:
+    """Polls not dispatched messages from the Outbox table, publishes them to SNS and marks them as dispatched.
+
+    An alternative to the DynamoDB Streams + Lambda relay, e.g. to drain a backlog after a stream or Lambda outage.
+    The cursor moves past messages that failed to dispatch, so the rest of the messages of a FIFO topic aggregate
+    with a failed message are skipped until the index is read from the start again and the failed message is retried.
+    """
+
+    def __init__(
+        self,
+        outbox_repository: OutboxRepository,
+        envelope_handler: EnvelopeHandler,
+        topics_cache: TopicsCache,
+        polling: AdaptivePolling,
+    ) -> None:
+        self._outbox_repository = outbox_repository
+        self._envelope_handler = envelope_handler
+        self._topics_cache = topics_cache
+        self._polling = polling
+        self._cursor: str | None = None
+        self._failed_fifo_groups: set[MessageGroupKey] = set()
+
+    async def run(self, stop_event: asyncio.Event) -> None:
+        logger.info("outbox_relay_started")
+        while not stop_event.is_set():
+            try:
+                fetched_messages_count = await self.relay_once()
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("outbox_relay_poll_failed")
+                fetched_messages_count = 0
+            self._polling.update(fetched_messages_count)
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(stop_event.wait(), timeout=self._polling.poll_interval)
+        logger.info("outbox_relay_stopped")
+
+    async def relay_once(self) -> int:
+        pages = self._outbox_repository.get_not_dispatched_messages_pages(
+            page_size=self._polling.batch_size, cursor=self._cursor
+        )
+        async with contextlib.aclosing(pages):
+            page = await anext(pages)
+        # Continue after messages that failed to dispatch, and start over when the end of the index is reached
+        self._cursor = page.cursor
+        if not page.messages:
+            self._failed_fifo_groups.clear()
+            return 0
+        messages = [m for m in page.messages if get_message_group_key(m) not in self._failed_fifo_groups]
+
+        dispatched_message_ids = await dispatch_and_mark_as_dispatched(
+            messages,
+            self._outbox_repository,
+            self._envelope_handler,
+            self._topics_cache,
+            concurrency=self._polling.concurrency,
+        )
+        dispatched_message_ids_set = set(dispatched_message_ids)
+        self._failed_fifo_groups.update(
+            get_message_group_key(m)
+            for m in messages
+            if is_fifo_topic(m.topic) and m.message_id not in dispatched_message_ids_set
+        )
+        if page.cursor is None:
+            # Failed messages are the oldest messages of their groups, so they're retried first on the next pass
+            self._failed_fifo_groups.clear()
+        logger.info(
+            "outbox_relay_batch_dispatched",
+            fetched_messages_count=len(page.messages),
+            dispatched_messages_count=len(dispatched_message_ids),
+            batch_size=self._polling.batch_size,
+            concurrency=self._polling.concurrency,
+        )
+        return len(page.messages)
+
+
+def get_message_group_key(message: PublishedMessage) -> MessageGroupKey:
+    """Messages of an aggregate to a FIFO topic are one group; any other message is a group of its own."""
+    return message.topic, message.aggregate_id if is_fifo_topic(message.topic) else message.message_id
+
+
+async def dispatch_and_mark_as_dispatched(
+    messages: list[PublishedMessage],
+    outbox_repository: OutboxRepository,
+    envelope_handler: EnvelopeHandler,
+    topics_cache: TopicsCache,
+    concurrency: int,
+) -> list[uuid.UUID]:
+    """Publish messages concurrently and mark the published ones as dispatched in bulk.
+
+    Messages of an aggregate to a FIFO topic are published one by one, oldest first,
+    and the rest of them aren't published after one fails.
+    Returns IDs of the messages that were published and marked as dispatched.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _dispatch_message(sns_client: SNSClient, message: PublishedMessage) -> uuid.UUID | None:
+        async with semaphore:
+            try:
+                await dispatch_message(sns_client, message, envelope_handler, topics_cache)
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("message_dispatch_failed", message_id=message.message_id, topic_name=message.topic)
+                return None
+            return message.message_id
+
+    async def _dispatch_group(sns_client: SNSClient, group: list[PublishedMessage]) -> list[uuid.UUID]:
+        dispatched_message_ids: list[uuid.UUID] = []
+        for message in group:
+            if (message_id := await _dispatch_message(sns_client, message)) is None:
+                break
+            dispatched_message_ids.append(message_id)
+        return dispatched_message_ids
+
+    groups: dict[MessageGroupKey, list[PublishedMessage]] = defaultdict(list)
+    for message in messages:
+        groups[get_message_group_key(message)].append(message)
+    async with clients.client_pool.get_sns_client() as sns_client:
+        results = await asyncio.gather(
+            *[_dispatch_group(sns_client, sorted(group, key=lambda m: m.created_at)) for group in groups.values()]
+        )
+    dispatched_message_ids = [message_id for result in results for message_id in result]
+    if not dispatched_message_ids:
+        return []
+    mark_as_dispatched_results = await outbox_repository.mark_as_dispatched_many(dispatched_message_ids)
+    return [result.message_id for result in mark_as_dispatched_results if result.is_success]
+
+
+async def run_outbox_relay() -> None:
+    settings = get_settings()
+    relay = OutboxRelay(
+        outbox_repository=create_outbox_repository(),
+        envelope_handler=create_envelope_handler(),
+        topics_cache=TopicsCache.create(settings),
+        polling=AdaptivePolling.create(settings),
+    )
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop_event.set)
+    try:
+        await relay.run(stop_event)
+    finally:
+        await clients.client_pool.close()
+
+
+def main() -> None:
+    asyncio.run(run_outbox_relay())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import asyncio
+from typing import Awaitable, Callable, Iterable
+
+from aws_lambda_powertools.utilities.data_classes.dynamo_db_stream_event import DynamoDBRecord, DynamoDBRecordEventName
+
+from .batch import SequenceNumber
+from .message import get_raw_image_attribute
+
+RecordHandler = Callable[[DynamoDBRecord], Awaitable[None]]
+
+
+class PreviousMessageNotDispatchedError(Exception):
+    pass
+
+
+class DispatchScheduler:
+    """Runs record handlers of a single stream batch concurrently across aggregates and in order within an aggregate.
+
+    INSERT records with the same AggregateId form a partition that is processed sequentially in stream order.
+    When a record fails, the rest of its partition fails without being dispatched,
+    so the messages are retried in the original order and are not reordered.
+    """
+
+    def __init__(self, records: Iterable[DynamoDBRecord], max_concurrency: int) -> None:
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._previous: dict[SequenceNumber, SequenceNumber] = {}
+        self._done: dict[SequenceNumber, asyncio.Event] = {}
+        self._failed: set[SequenceNumber] = set()
+
+        partition_tails: dict[str, SequenceNumber] = {}
+        for record in records:
+            if record.event_name != DynamoDBRecordEventName.INSERT or not record.dynamodb:
+                continue
+            sequence_number = record.dynamodb.sequence_number
+            aggregate_id = get_raw_image_attribute(record, "AggregateId")
+            if sequence_number is None or aggregate_id is None:
+                continue
+            if previous_sequence_number := partition_tails.get(aggregate_id):
+                self._previous[sequence_number] = previous_sequence_number
+            partition_tails[aggregate_id] = sequence_number
+            self._done[sequence_number] = asyncio.Event()
+
+    async def run(self, record: DynamoDBRecord, handler: RecordHandler) -> None:
+        sequence_number = record.dynamodb.sequence_number if record.dynamodb else None
+        if sequence_number is None or sequence_number not in self._done:
+            await handler(record)
+            return
+        try:
+            if previous_sequence_number := self._previous.get(sequence_number):
+                await self._done[previous_sequence_number].wait()
+                if previous_sequence_number in self._failed:
+                    raise PreviousMessageNotDispatchedError(previous_sequence_number)
+            async with self._semaphore:
+                await handler(record)
+        except Exception:
+            self._failed.add(sequence_number)
+            raise
+        finally:
+            self._done[sequence_number].set()
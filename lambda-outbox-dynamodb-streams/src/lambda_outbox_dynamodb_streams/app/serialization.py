@@ -0,0 +1,40 @@
+import json
+from functools import lru_cache
+from typing import Any, Literal, Protocol
+
+JsonBackendName = Literal["auto", "json", "orjson"]
+
+
+class JsonBackend(Protocol):
+    def loads(self, data: str | bytes) -> Any:
+        ...
+
+
+class StdlibJsonBackend(JsonBackend):
+    def loads(self, data: str | bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonJsonBackend(JsonBackend):
+    """Parses several times faster than the standard library; used only where the `orjson` package is installed."""
+
+    def __init__(self) -> None:
+        import orjson  # pylint: disable=import-outside-toplevel
+
+        self._orjson = orjson
+
+    def loads(self, data: str | bytes) -> Any:
+        return self._orjson.loads(data)
+
+
+@lru_cache
+def get_json_backend(name: JsonBackendName = "auto") -> JsonBackend:
+    """JSON backend by name; `auto` is `orjson` when the package is installed, otherwise the standard library."""
+    if name == "json":
+        return StdlibJsonBackend()
+    try:
+        return OrjsonJsonBackend()
+    except ImportError:
+        if name == "orjson":
+            raise
+        return StdlibJsonBackend()
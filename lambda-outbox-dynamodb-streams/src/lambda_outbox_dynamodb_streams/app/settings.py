@@ -1,12 +1,33 @@
 from functools import lru_cache
+from typing import Literal
 
 from pydantic_settings import BaseSettings
 
+from .serialization import JsonBackendName
+
 
 class Settings(BaseSettings):
     dynamodb_outbox_table_name: str
     aws_endpoint_url: str | None = None
     aws_sns_topic_prefix: str = ""
+    aws_sns_topic_arn_prefix: str | None = None
+    aws_sns_topic_arns: dict[str, str] = {}
+    aws_sns_list_topics: bool = False
+    aws_sns_topic_not_found_ttl: float = 60.0
+    aws_max_pool_connections: int = 50
+    outbox_dispatch_mode: Literal["batch", "ordered"] = "batch"
+    outbox_dispatch_max_concurrency: int = 10
+    outbox_relay_min_poll_interval: float = 0.5
+    outbox_relay_max_poll_interval: float = 10.0
+    outbox_relay_min_batch_size: int = 10
+    outbox_relay_max_batch_size: int = 500
+    outbox_relay_max_concurrency: int = 50
+    outbox_dispatched_retention_days: int | None = None
+    outbox_archive_s3_bucket: str | None = None
+    outbox_archive_s3_key_prefix: str = ""
+    outbox_claim_check_s3_bucket: str | None = None
+    outbox_claim_check_rehydrate_max_bytes: int = 200 * 1024
+    outbox_json_backend: JsonBackendName = "auto"
 
 
 @lru_cache
@@ -1,28 +1,78 @@
+import base64
+import hashlib
 import json
 from pathlib import Path
+from typing import Any, TypedDict
 
 from types_aiobotocore_dynamodb import DynamoDBClient
 from types_aiobotocore_iam import IAMClient
 from types_aiobotocore_iam.type_defs import CreateRoleResponseTypeDef
 from types_aiobotocore_lambda import LambdaClient
-from types_aiobotocore_lambda.literals import ArchitectureType
-from types_aiobotocore_lambda.type_defs import FunctionConfigurationResponseTypeDef
+from types_aiobotocore_lambda.literals import ArchitectureType, FunctionResponseTypeType, RuntimeType
+from types_aiobotocore_lambda.type_defs import (
+    DestinationConfigTypeDef,
+    EventSourceMappingConfigurationTypeDef,
+    FilterCriteriaTypeDef,
+    FunctionConfigurationResponseTypeDef,
+    FunctionConfigurationTypeDef,
+    GetFunctionResponseTypeDef,
+)
 from types_aiobotocore_s3 import S3Client
 
+from lambda_outbox_dynamodb_streams.app.filters import get_filter_patterns
 
-async def upload_lambda_to_s3(s3_client: S3Client, s3_bucket_name: str, lambda_zip_path: Path) -> str:
+LAMBDA_CODE_SHA256_METADATA_KEY = "code-sha256"
+EVENT_SOURCE_MAPPING_BATCH_SIZE = 100
+EVENT_SOURCE_MAPPING_MAXIMUM_RETRY_ATTEMPTS = -1  # Retried until the record expires from the stream
+# A record that fails the whole invocation, e.g. with a timeout, isn't reported as a partial batch failure;
+# bisecting the batch isolates it, so that the records before it are dispatched instead of retried with it
+EVENT_SOURCE_MAPPING_BISECT_BATCH_ON_FUNCTION_ERROR = True
+
+
+def get_lambda_zip_code_sha256(lambda_zip_path: Path) -> str:
+    """Base64-encoded SHA-256 hash of the zip, in the format of the Lambda function's `CodeSha256`."""
+    return base64.b64encode(hashlib.sha256(lambda_zip_path.read_bytes()).digest()).decode()
+
+
+async def upload_lambda_to_s3(
+    s3_client: S3Client, s3_bucket_name: str, lambda_zip_path: Path, code_sha256: str | None = None
+) -> str:
+    """Upload the zip to S3; with `code_sha256`, the upload is skipped when the object has the same hash."""
     try:
         await s3_client.head_bucket(Bucket=s3_bucket_name)
     except s3_client.exceptions.ClientError:
         await s3_client.create_bucket(Bucket=s3_bucket_name)
 
     s3_object_key = lambda_zip_path.name
+    if code_sha256 is None:
+        with open(lambda_zip_path, "rb") as f:
+            await s3_client.put_object(Bucket=s3_bucket_name, Key=s3_object_key, Body=f)
+        return s3_object_key
+
+    try:
+        head_object_response = await s3_client.head_object(Bucket=s3_bucket_name, Key=s3_object_key)
+        if head_object_response["Metadata"].get(LAMBDA_CODE_SHA256_METADATA_KEY) == code_sha256:
+            return s3_object_key
+    except s3_client.exceptions.ClientError:
+        pass
     with open(lambda_zip_path, "rb") as f:
-        await s3_client.put_object(Bucket=s3_bucket_name, Key=s3_object_key, Body=f)
+        await s3_client.put_object(
+            Bucket=s3_bucket_name,
+            Key=s3_object_key,
+            Body=f,
+            Metadata={LAMBDA_CODE_SHA256_METADATA_KEY: code_sha256},
+        )
     return s3_object_key
 
 
-async def create_lambda_function(
+async def get_lambda_function(lambda_client: LambdaClient, function_name: str) -> GetFunctionResponseTypeDef | None:
+    try:
+        return await lambda_client.get_function(FunctionName=function_name)
+    except lambda_client.exceptions.ResourceNotFoundException:
+        return None
+
+
+async def create_lambda_function(  # pylint: disable=too-many-arguments
     lambda_client: LambdaClient,
     function_name: str,
     environment_variables: dict[str, str],
@@ -31,28 +81,122 @@ async def create_lambda_function(
     s3_bucket_name: str,
     s3_lambda_key: str,
     architecture: ArchitectureType,
+    runtime: RuntimeType = "python3.10",
+    memory_size: int = 256,
+    timeout: int = 30,
+    ephemeral_storage_size: int = 512,
 ) -> FunctionConfigurationResponseTypeDef:
     return await lambda_client.create_function(
         FunctionName=function_name,
-        Runtime="python3.10",
+        Runtime=runtime,
         Role=lambda_role_arn,
         Handler=handler,
         Code={"S3Bucket": s3_bucket_name, "S3Key": s3_lambda_key},
         Publish=True,
-        Timeout=30,
-        MemorySize=256,
+        Timeout=timeout,
+        MemorySize=memory_size,
+        EphemeralStorage={"Size": ephemeral_storage_size},
         Environment={"Variables": environment_variables},
         Architectures=[architecture],
     )
 
 
+async def update_lambda_function_code(
+    lambda_client: LambdaClient,
+    function_name: str,
+    s3_bucket_name: str,
+    s3_lambda_key: str,
+    architecture: ArchitectureType,
+) -> None:
+    await lambda_client.update_function_code(
+        FunctionName=function_name,
+        S3Bucket=s3_bucket_name,
+        S3Key=s3_lambda_key,
+        Architectures=[architecture],
+        Publish=True,
+    )
+    await lambda_client.get_waiter("function_updated_v2").wait(FunctionName=function_name)
+
+
+async def update_lambda_function_configuration(  # pylint: disable=too-many-arguments
+    lambda_client: LambdaClient,
+    configuration: FunctionConfigurationTypeDef,
+    environment_variables: dict[str, str],
+    lambda_role_arn: str,
+    handler: str,
+    runtime: RuntimeType = "python3.10",
+    memory_size: int = 256,
+    timeout: int = 30,
+    ephemeral_storage_size: int = 512,
+) -> bool:
+    """Update the function configuration when it differs from the given one; returns whether it was updated."""
+    current_configuration = (
+        configuration.get("Role"),
+        configuration.get("Handler"),
+        configuration.get("Runtime"),
+        configuration.get("MemorySize"),
+        configuration.get("Timeout"),
+        configuration.get("EphemeralStorage", {}).get("Size", 512),
+        configuration.get("Environment", {}).get("Variables", {}),
+    )
+    if current_configuration == (
+        lambda_role_arn,
+        handler,
+        runtime,
+        memory_size,
+        timeout,
+        ephemeral_storage_size,
+        environment_variables,
+    ):
+        return False
+    function_name = configuration["FunctionName"]
+    await lambda_client.update_function_configuration(
+        FunctionName=function_name,
+        Role=lambda_role_arn,
+        Handler=handler,
+        Runtime=runtime,
+        MemorySize=memory_size,
+        Timeout=timeout,
+        EphemeralStorage={"Size": ephemeral_storage_size},
+        Environment={"Variables": environment_variables},
+    )
+    await lambda_client.get_waiter("function_updated_v2").wait(FunctionName=function_name)
+    return True
+
+
+async def put_lambda_reserved_concurrency(
+    lambda_client: LambdaClient, function_name: str, reserved_concurrent_executions: int | None
+) -> None:
+    """Reserve concurrency for the function; `None` removes the reservation."""
+    if reserved_concurrent_executions is None:
+        await lambda_client.delete_function_concurrency(FunctionName=function_name)
+        return
+    await lambda_client.put_function_concurrency(
+        FunctionName=function_name, ReservedConcurrentExecutions=reserved_concurrent_executions
+    )
+
+
+def get_lambda_dynamodb_streams_role_name(dynamodb_table_name: str) -> str:
+    return f"lambda-outbox-dynamodb-streams--{dynamodb_table_name}"
+
+
+async def get_lambda_dynamodb_streams_role_arn(iam_client: IAMClient, dynamodb_table_name: str) -> str | None:
+    try:
+        get_role_response = await iam_client.get_role(
+            RoleName=get_lambda_dynamodb_streams_role_name(dynamodb_table_name)
+        )
+    except iam_client.exceptions.NoSuchEntityException:
+        return None
+    return get_role_response["Role"]["Arn"]
+
+
 async def create_lambda_dynamodb_streams_role(
     iam_client: IAMClient, dynamodb_client: DynamoDBClient, dynamodb_table_name: str
 ) -> CreateRoleResponseTypeDef:
     describe_table_response = await dynamodb_client.describe_table(TableName=dynamodb_table_name)
     table_arn = describe_table_response["Table"]["TableArn"]
     return await iam_client.create_role(
-        RoleName=f"lambda-outbox-dynamodb-streams--{dynamodb_table_name}",
+        RoleName=get_lambda_dynamodb_streams_role_name(dynamodb_table_name),
         AssumeRolePolicyDocument=json.dumps(
             {
                 "Version": "2012-10-17",
@@ -78,18 +222,116 @@ async def create_lambda_dynamodb_streams_role(
     )
 
 
-async def add_dynamodb_stream_on_lambda(
-    lambda_client: LambdaClient, dynamodb_client: DynamoDBClient, dynamodb_table_name: str, function_name: str
+class EventSourceMappingConfig(TypedDict):
+    FilterCriteria: FilterCriteriaTypeDef
+    FunctionResponseTypes: list[FunctionResponseTypeType]
+    BatchSize: int
+    MaximumBatchingWindowInSeconds: int
+    ParallelizationFactor: int
+    MaximumRetryAttempts: int
+    BisectBatchOnFunctionError: bool
+    DestinationConfig: DestinationConfigTypeDef
+
+
+async def add_dynamodb_stream_on_lambda(  # pylint: disable=too-many-arguments
+    lambda_client: LambdaClient,
+    dynamodb_client: DynamoDBClient,
+    dynamodb_table_name: str,
+    function_name: str,
+    filter_patterns: list[dict[str, Any]] | None = None,
+    batch_size: int = EVENT_SOURCE_MAPPING_BATCH_SIZE,
+    maximum_batching_window_in_seconds: int = 0,
+    parallelization_factor: int = 1,
+    maximum_retry_attempts: int = EVENT_SOURCE_MAPPING_MAXIMUM_RETRY_ATTEMPTS,
+    bisect_batch_on_function_error: bool = EVENT_SOURCE_MAPPING_BISECT_BATCH_ON_FUNCTION_ERROR,
+    on_failure_destination_arn: str | None = None,
 ) -> None:
-    get_function_response = await lambda_client.get_function(FunctionName=function_name)
-    function_arn = get_function_response["Configuration"]["FunctionArn"]
+    """Invoke the Lambda with the table stream records that match the filter patterns.
 
-    describe_table_response = await dynamodb_client.describe_table(TableName=dynamodb_table_name)
-    event_source_arn = describe_table_response["Table"]["LatestStreamArn"]
+    By default, only INSERT records of not dispatched messages invoke the Lambda.
+    Failed records are reported with partial batch responses, so only the failed records are retried;
+    records that still fail after `maximum_retry_attempts` are sent to the on-failure destination,
+    so bounded retries require one - otherwise the failed records would be discarded.
+    An existing event source mapping of the table stream and the function is updated when its settings differ.
+    """
+    if maximum_retry_attempts != EVENT_SOURCE_MAPPING_MAXIMUM_RETRY_ATTEMPTS and not on_failure_destination_arn:
+        raise ValueError("on_failure_destination_arn is required when maximum_retry_attempts is bounded")
+    config = get_event_source_mapping_config(
+        filter_patterns=filter_patterns or get_filter_patterns(archive_expired_messages=False),
+        batch_size=batch_size,
+        maximum_batching_window_in_seconds=maximum_batching_window_in_seconds,
+        parallelization_factor=parallelization_factor,
+        maximum_retry_attempts=maximum_retry_attempts,
+        bisect_batch_on_function_error=bisect_batch_on_function_error,
+        on_failure_destination_arn=on_failure_destination_arn,
+    )
 
-    await lambda_client.create_event_source_mapping(
-        FunctionName=function_arn,
-        EventSourceArn=event_source_arn,
-        Enabled=True,
-        StartingPosition="LATEST",
+    function_arn = (await lambda_client.get_function(FunctionName=function_name))["Configuration"]["FunctionArn"]
+    event_source_arn = (await dynamodb_client.describe_table(TableName=dynamodb_table_name))["Table"]["LatestStreamArn"]
+    event_source_mapping = await _get_event_source_mapping(lambda_client, event_source_arn, function_arn)
+    if event_source_mapping is None:
+        await lambda_client.create_event_source_mapping(
+            FunctionName=function_arn,
+            EventSourceArn=event_source_arn,
+            Enabled=True,
+            StartingPosition="LATEST",
+            **config,
+        )
+    elif not is_event_source_mapping_up_to_date(event_source_mapping, config):
+        await lambda_client.update_event_source_mapping(
+            UUID=event_source_mapping["UUID"],
+            FunctionName=function_arn,
+            Enabled=True,
+            # An empty on-failure destination removes the destination
+            **{**config, "DestinationConfig": config["DestinationConfig"] or {"OnFailure": {}}},
+        )
+
+
+def get_event_source_mapping_config(  # pylint: disable=too-many-arguments
+    filter_patterns: list[dict[str, Any]],
+    batch_size: int,
+    maximum_batching_window_in_seconds: int,
+    parallelization_factor: int,
+    maximum_retry_attempts: int,
+    bisect_batch_on_function_error: bool,
+    on_failure_destination_arn: str | None,
+) -> EventSourceMappingConfig:
+    return {
+        "FilterCriteria": {"Filters": [{"Pattern": json.dumps(pattern)} for pattern in filter_patterns]},
+        "FunctionResponseTypes": ["ReportBatchItemFailures"],
+        "BatchSize": batch_size,
+        "MaximumBatchingWindowInSeconds": maximum_batching_window_in_seconds,
+        "ParallelizationFactor": parallelization_factor,
+        "MaximumRetryAttempts": maximum_retry_attempts,
+        "BisectBatchOnFunctionError": bisect_batch_on_function_error,
+        "DestinationConfig": (
+            {"OnFailure": {"Destination": on_failure_destination_arn}} if on_failure_destination_arn else {}
+        ),
+    }
+
+
+def is_event_source_mapping_up_to_date(
+    event_source_mapping: EventSourceMappingConfigurationTypeDef, config: EventSourceMappingConfig
+) -> bool:
+    return (
+        event_source_mapping.get("FilterCriteria") == config["FilterCriteria"]
+        and event_source_mapping.get("FunctionResponseTypes") == config["FunctionResponseTypes"]
+        and event_source_mapping.get("BatchSize") == config["BatchSize"]
+        and event_source_mapping.get("MaximumBatchingWindowInSeconds") == config["MaximumBatchingWindowInSeconds"]
+        and event_source_mapping.get("ParallelizationFactor") == config["ParallelizationFactor"]
+        and event_source_mapping.get("MaximumRetryAttempts") == config["MaximumRetryAttempts"]
+        and event_source_mapping.get("BisectBatchOnFunctionError") == config["BisectBatchOnFunctionError"]
+        and event_source_mapping.get("DestinationConfig", {}).get("OnFailure", {}).get("Destination")
+        == config["DestinationConfig"].get("OnFailure", {}).get("Destination")
     )
+
+
+async def _get_event_source_mapping(
+    lambda_client: LambdaClient, event_source_arn: str, function_arn: str
+) -> EventSourceMappingConfigurationTypeDef | None:
+    paginator = lambda_client.get_paginator("list_event_source_mappings")
+    async for page in paginator.paginate(EventSourceArn=event_source_arn):
+        for event_source_mapping in page.get("EventSourceMappings", []):
+            if event_source_mapping.get("FunctionArn") == function_arn:
+                return event_source_mapping
+    return None
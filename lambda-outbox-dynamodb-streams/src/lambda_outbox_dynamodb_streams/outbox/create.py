@@ -5,14 +5,24 @@ import structlog
 from types_aiobotocore_dynamodb import DynamoDBClient
 from types_aiobotocore_iam import IAMClient
 from types_aiobotocore_lambda import LambdaClient
-from types_aiobotocore_lambda.literals import ArchitectureType
+from types_aiobotocore_lambda.literals import ArchitectureType, RuntimeType
 from types_aiobotocore_s3 import S3Client
 
 from lambda_outbox_dynamodb_streams import LAMBDA_ZIP_PATH_ARM64, LAMBDA_ZIP_PATH_X86_64
+from lambda_outbox_dynamodb_streams.app.filters import get_filter_patterns
 from lambda_outbox_dynamodb_streams.outbox.aws_resources import (
+    EVENT_SOURCE_MAPPING_BATCH_SIZE,
+    EVENT_SOURCE_MAPPING_BISECT_BATCH_ON_FUNCTION_ERROR,
+    EVENT_SOURCE_MAPPING_MAXIMUM_RETRY_ATTEMPTS,
     add_dynamodb_stream_on_lambda,
     create_lambda_dynamodb_streams_role,
     create_lambda_function,
+    get_lambda_dynamodb_streams_role_arn,
+    get_lambda_function,
+    get_lambda_zip_code_sha256,
+    put_lambda_reserved_concurrency,
+    update_lambda_function_code,
+    update_lambda_function_configuration,
     upload_lambda_to_s3,
 )
 
@@ -24,6 +34,24 @@ class Settings:
     dynamodb_outbox_table_name: str
     aws_endpoint_url: str | None = None
     aws_sns_topic_prefix: str = ""
+    # S3 buckets of archived expired messages and of claim-checked message payloads
+    archive_s3_bucket: str | None = None
+    archive_s3_key_prefix: str = ""
+    claim_check_s3_bucket: str | None = None
+    # Lambda function; CPU is allocated in proportion to memory - a full vCPU at 1769 MB
+    runtime: RuntimeType = "python3.10"
+    memory_size: int = 256
+    timeout: int = 30
+    ephemeral_storage_size: int = 512
+    reserved_concurrent_executions: int | None = None
+    # DynamoDB Streams event source mapping
+    batch_size: int = EVENT_SOURCE_MAPPING_BATCH_SIZE
+    maximum_batching_window_in_seconds: int = 0
+    parallelization_factor: int = 1
+    maximum_retry_attempts: int = EVENT_SOURCE_MAPPING_MAXIMUM_RETRY_ATTEMPTS
+    bisect_batch_on_function_error: bool = EVENT_SOURCE_MAPPING_BISECT_BATCH_ON_FUNCTION_ERROR
+    # SQS queue or SNS topic of records that failed every retry; required when `maximum_retry_attempts` is bounded
+    on_failure_destination_arn: str | None = None
 
 
 async def create_dynamodb_streams_outbox(  # pylint: disable=too-many-locals
@@ -34,18 +62,25 @@ async def create_dynamodb_streams_outbox(  # pylint: disable=too-many-locals
     settings: Settings,
     skip_mark_messages_as_dispatched: bool = True,
 ) -> None:
+    """Create the outbox Lambda and its DynamoDB Streams event source mapping, or converge the existing ones.
+
+    Existing resources are reused; the zip is uploaded and the function code is updated only when the zip's hash
+    differs, and the function configuration and the event source mapping are updated only when the settings differ.
+    """
     dynamodb_table_name = settings.dynamodb_outbox_table_name
+    function_name = f"outbox-dynamodb-streams--{dynamodb_table_name}"
+    handler = "app.lambda_function.lambda_handler"
 
     architecture: ArchitectureType = "arm64" if platform.machine() in ["arm64", "aarch64"] else "x86_64"
     lambda_zip_path = LAMBDA_ZIP_PATH_ARM64 if architecture == "arm64" else LAMBDA_ZIP_PATH_X86_64
+    code_sha256 = get_lambda_zip_code_sha256(lambda_zip_path)
 
-    create_role_response = await create_lambda_dynamodb_streams_role(
-        iam_client, dynamodb_client, dynamodb_table_name=dynamodb_table_name
-    )
-    lambda_role_arn = create_role_response["Role"]["Arn"]
-
-    s3_bucket_name = f"dynamodb-streams--{dynamodb_table_name}"
-    s3_lambda_key = await upload_lambda_to_s3(s3_client, s3_bucket_name=s3_bucket_name, lambda_zip_path=lambda_zip_path)
+    lambda_role_arn = await get_lambda_dynamodb_streams_role_arn(iam_client, dynamodb_table_name)
+    if lambda_role_arn is None:
+        create_role_response = await create_lambda_dynamodb_streams_role(
+            iam_client, dynamodb_client, dynamodb_table_name=dynamodb_table_name
+        )
+        lambda_role_arn = create_role_response["Role"]["Arn"]
 
     environment_variables = {
         "DYNAMODB_OUTBOX_TABLE_NAME": dynamodb_table_name,
@@ -55,24 +90,76 @@ async def create_dynamodb_streams_outbox(  # pylint: disable=too-many-locals
         environment_variables["OUTBOX_SKIP_MARK_MESSAGES_AS_DISPATCHED"] = "1"
     if settings.aws_endpoint_url:
         environment_variables["AWS_ENDPOINT_URL"] = settings.aws_endpoint_url
+    if settings.archive_s3_bucket:
+        environment_variables["OUTBOX_ARCHIVE_S3_BUCKET"] = settings.archive_s3_bucket
+        if settings.archive_s3_key_prefix:
+            environment_variables["OUTBOX_ARCHIVE_S3_KEY_PREFIX"] = settings.archive_s3_key_prefix
+    if settings.claim_check_s3_bucket:
+        environment_variables["OUTBOX_CLAIM_CHECK_S3_BUCKET"] = settings.claim_check_s3_bucket
 
-    create_lambda_function_response = await create_lambda_function(
-        lambda_client,
-        function_name=f"outbox-dynamodb-streams--{dynamodb_table_name}",
-        environment_variables=environment_variables,
-        lambda_role_arn=lambda_role_arn,
-        handler="app.lambda_function.lambda_handler",
-        s3_bucket_name=s3_bucket_name,
-        s3_lambda_key=s3_lambda_key,
-        architecture=architecture,
-    )
-    function_name = create_lambda_function_response["FunctionName"]
+    s3_bucket_name = f"dynamodb-streams--{dynamodb_table_name}"
+    get_function_response = await get_lambda_function(lambda_client, function_name)
+    if get_function_response is None:
+        s3_lambda_key = await upload_lambda_to_s3(
+            s3_client, s3_bucket_name=s3_bucket_name, lambda_zip_path=lambda_zip_path, code_sha256=code_sha256
+        )
+        await create_lambda_function(
+            lambda_client,
+            function_name=function_name,
+            environment_variables=environment_variables,
+            lambda_role_arn=lambda_role_arn,
+            handler=handler,
+            s3_bucket_name=s3_bucket_name,
+            s3_lambda_key=s3_lambda_key,
+            architecture=architecture,
+            runtime=settings.runtime,
+            memory_size=settings.memory_size,
+            timeout=settings.timeout,
+            ephemeral_storage_size=settings.ephemeral_storage_size,
+        )
+        reserved_concurrent_executions = None
+    else:
+        configuration = get_function_response["Configuration"]
+        if configuration.get("CodeSha256") != code_sha256:
+            s3_lambda_key = await upload_lambda_to_s3(
+                s3_client, s3_bucket_name=s3_bucket_name, lambda_zip_path=lambda_zip_path, code_sha256=code_sha256
+            )
+            await update_lambda_function_code(
+                lambda_client,
+                function_name=function_name,
+                s3_bucket_name=s3_bucket_name,
+                s3_lambda_key=s3_lambda_key,
+                architecture=architecture,
+            )
+        await update_lambda_function_configuration(
+            lambda_client,
+            configuration,
+            environment_variables=environment_variables,
+            lambda_role_arn=lambda_role_arn,
+            handler=handler,
+            runtime=settings.runtime,
+            memory_size=settings.memory_size,
+            timeout=settings.timeout,
+            ephemeral_storage_size=settings.ephemeral_storage_size,
+        )
+        reserved_concurrent_executions = get_function_response.get("Concurrency", {}).get(
+            "ReservedConcurrentExecutions"
+        )
+    if reserved_concurrent_executions != settings.reserved_concurrent_executions:
+        await put_lambda_reserved_concurrency(lambda_client, function_name, settings.reserved_concurrent_executions)
 
     await add_dynamodb_stream_on_lambda(
         lambda_client,
         dynamodb_client,
         dynamodb_table_name=dynamodb_table_name,
         function_name=function_name,
+        filter_patterns=get_filter_patterns(archive_expired_messages=bool(settings.archive_s3_bucket)),
+        batch_size=settings.batch_size,
+        maximum_batching_window_in_seconds=settings.maximum_batching_window_in_seconds,
+        parallelization_factor=settings.parallelization_factor,
+        maximum_retry_attempts=settings.maximum_retry_attempts,
+        bisect_batch_on_function_error=settings.bisect_batch_on_function_error,
+        on_failure_destination_arn=settings.on_failure_destination_arn,
     )
 
     waiter = lambda_client.get_waiter("function_active_v2")
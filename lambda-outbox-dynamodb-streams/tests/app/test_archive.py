@@ -0,0 +1,67 @@
+import asyncio
+import gzip
+import json
+import uuid
+
+import pytest
+from types_aiobotocore_s3 import S3Client
+
+from lambda_outbox_dynamodb_streams.app.archive import ArchiveBatch
+from lambda_outbox_dynamodb_streams.app.lambda_function import lambda_handler, settings
+from tests.fakes import FakeArchiveTarget, expired_record_factory, record_factory
+
+
+def read_ndjson_gz(body: bytes) -> list[dict]:
+    return [json.loads(line) for line in gzip.decompress(body).decode().splitlines()]
+
+
+@pytest.mark.asyncio()
+async def test_expired_messages_archived_to_single_compressed_ndjson_file() -> None:
+    message_ids = [uuid.uuid4(), uuid.uuid4()]
+    records = [
+        expired_record_factory(sequence_number="1", message_id=message_ids[0]),
+        record_factory(event_name="REMOVE", sequence_number="2"),  # Deleted by a user, not by TTL
+        expired_record_factory(sequence_number="3", message_id=message_ids[1]),
+    ]
+    target = FakeArchiveTarget()
+    archive_batch = ArchiveBatch(records, target, key_prefix="outbox-archive/")
+
+    for record in records:
+        await archive_batch.wait_archived(record)
+
+    assert list(target.files) == ["outbox-archive/1-3.ndjson.gz"]
+    archived_messages = read_ndjson_gz(target.files["outbox-archive/1-3.ndjson.gz"])
+    assert [message["MessageId"] for message in archived_messages] == [str(message_id) for message_id in message_ids]
+    assert archived_messages[0]["ApproximateDispatchCount"] == 1
+    assert archived_messages[0]["IsDispatched"] is True
+
+
+@pytest.mark.asyncio()
+async def test_expired_messages_of_retried_and_bisected_batches_archived_to_file_per_batch() -> None:
+    records = [expired_record_factory(sequence_number=str(sequence_number)) for sequence_number in range(1, 5)]
+    target = FakeArchiveTarget()
+
+    for batch_records in (records, records, records[:2], records[2:]):
+        archive_batch = ArchiveBatch(batch_records, target)
+        await asyncio.gather(*(archive_batch.wait_archived(record) for record in batch_records))
+
+    assert sorted(target.files) == ["1-2.ndjson.gz", "1-4.ndjson.gz", "3-4.ndjson.gz"]
+    assert len(read_ndjson_gz(target.files["1-4.ndjson.gz"])) == 4
+    assert len(read_ndjson_gz(target.files["1-2.ndjson.gz"])) == 2
+
+
+@pytest.mark.usefixtures("_environment", "_create_outbox_table", "_reset_moto_container_on_teardown")
+@pytest.mark.asyncio()
+async def test_lambda_handler__expired_messages_archived_to_s3(
+    monkeypatch: pytest.MonkeyPatch, moto_s3_client: S3Client
+) -> None:
+    monkeypatch.setattr(settings, "outbox_archive_s3_bucket", "outbox-archive")
+    await moto_s3_client.create_bucket(Bucket="outbox-archive")
+    records = [expired_record_factory(sequence_number="1"), expired_record_factory(sequence_number="2")]
+
+    response = await asyncio.to_thread(lambda_handler, {"Records": [record.raw_event for record in records]}, None)
+
+    assert response == {"batchItemFailures": []}
+    s3_object = await moto_s3_client.get_object(Bucket="outbox-archive", Key="1-2.ndjson.gz")
+    assert s3_object["ContentEncoding"] == "gzip"
+    assert len(read_ndjson_gz(await s3_object["Body"].read())) == 2
@@ -0,0 +1,110 @@
+import asyncio
+from typing import Any
+
+import pytest
+from botocore.exceptions import EndpointConnectionError
+
+from lambda_outbox_dynamodb_streams.app.clients import ClientPool
+
+pytestmark = pytest.mark.usefixtures("_environment")
+
+
+@pytest.mark.asyncio()
+async def test_client_reused_across_calls() -> None:
+    client_pool = ClientPool()
+
+    async with client_pool.get_sns_client() as client_1:
+        await client_1.list_topics()
+    async with client_pool.get_sns_client() as client_2:
+        await client_2.list_topics()
+
+    assert client_1 is client_2
+    await client_pool.close()
+
+
+@pytest.mark.asyncio()
+async def test_client_created_once_for_concurrent_callers() -> None:
+    client_pool = ClientPool()
+
+    async def _get_client() -> object:
+        async with client_pool.get_dynamodb_client() as client:
+            return client
+
+    clients = await asyncio.gather(*[_get_client() for _ in range(10)])
+
+    assert len({id(client) for client in clients}) == 1
+    await client_pool.close()
+
+
+@pytest.mark.asyncio()
+async def test_client_recreated_after_connection_error() -> None:
+    client_pool = ClientPool()
+
+    with pytest.raises(EndpointConnectionError):
+        async with client_pool.get_sns_client() as client_1:
+            raise EndpointConnectionError(endpoint_url="http://localhost")
+    async with client_pool.get_sns_client() as client_2:
+        await client_2.list_topics()
+
+    assert client_1 is not client_2
+    await client_pool.close()
+
+
+@pytest.mark.asyncio()
+async def test_client_closed_after_connection_error_when_requests_in_flight_complete() -> None:
+    client_pool = ClientPool()
+
+    async with client_pool.get_sns_client() as client_1:
+        with pytest.raises(EndpointConnectionError):
+            async with client_pool.get_sns_client():
+                raise EndpointConnectionError(endpoint_url="http://localhost")
+        await client_1.list_topics()
+
+        assert not _is_closed(client_1)
+    assert _is_closed(client_1)
+    await client_pool.close()
+
+
+@pytest.mark.asyncio()
+async def test_client_kept_after_not_connection_error() -> None:
+    client_pool = ClientPool()
+
+    with pytest.raises(RuntimeError):
+        async with client_pool.get_sns_client() as client_1:
+            raise RuntimeError
+    async with client_pool.get_sns_client() as client_2:
+        pass
+
+    assert client_1 is client_2
+    await client_pool.close()
+
+
+def test_client_recreated_in_new_event_loop() -> None:
+    client_pool = ClientPool()
+
+    async def _get_client() -> object:
+        async with client_pool.get_sns_client() as client:
+            await client.list_topics()
+            return client
+
+    client_1 = asyncio.run(_get_client())
+    client_2 = asyncio.run(_get_client())
+
+    assert client_1 is not client_2
+
+
+def test_client_closed_when_event_loop_shuts_down() -> None:
+    client_pool = ClientPool()
+
+    async def _get_client() -> Any:
+        async with client_pool.get_sns_client() as client:
+            await client.list_topics()
+            return client
+
+    client = asyncio.run(_get_client())
+
+    assert _is_closed(client)
+
+
+def _is_closed(client: Any) -> bool:
+    return client._endpoint.http_session._session is None
@@ -3,6 +3,7 @@ import uuid
 from unittest.mock import call
 
 import pytest
+from botocore.exceptions import ClientError
 from pytest_mock import MockerFixture
 from tomodachi.envelope.json_base import JsonBase
 from tomodachi_testcontainers.clients import snssqs_client
@@ -11,11 +12,26 @@ from transactional_messaging.outbox import PublishedMessage
 from types_aiobotocore_sns import SNSClient
 from types_aiobotocore_sqs import SQSClient
 
-from lambda_outbox_dynamodb_streams.app.dispatch import TopicsCache, dispatch_message, envelope_json_message
+from lambda_outbox_dynamodb_streams.app.dispatch import (
+    MessageDispatchError,
+    PreviousGroupMessageNotDispatchedError,
+    TopicNotFoundError,
+    TopicsCache,
+    create_rehydrating_envelope_handler,
+    dispatch_message,
+    dispatch_messages_batch,
+    envelope_json_message,
+    envelope_serialized_json_message,
+)
+from lambda_outbox_dynamodb_streams.app.message import StreamRecordMessage
+from lambda_outbox_dynamodb_streams.app.serialization import StdlibJsonBackend
 from lambda_outbox_dynamodb_streams.app.time import utcnow
+from tests.fakes import FakePayloadStore
 
 pytestmark = pytest.mark.usefixtures("_create_topics_and_queues", "_reset_moto_container_on_teardown")
 
+TOPIC_ARN_PREFIX = "arn:aws:sns:us-east-1:123456789012:"
+
 
 @pytest.mark.asyncio()
 async def test_topics_cache__topic_created_on_first_call(moto_sns_client: SNSClient, mocker: MockerFixture) -> None:
@@ -40,6 +56,98 @@ async def test_topics_cache__cache_hit_on_second_call(moto_sns_client: SNSClient
     assert client_spy.call_count == 0
 
 
+@pytest.mark.asyncio()
+async def test_topics_cache__topic_arn_resolved_from_arn_prefix(
+    moto_sns_client: SNSClient, mocker: MockerFixture
+) -> None:
+    client_spy = mocker.spy(moto_sns_client, "create_topic")
+    topics_cache = TopicsCache(topic_name_prefix="autotest-", topic_arn_prefix=TOPIC_ARN_PREFIX)
+
+    topic_arn = await topics_cache.get_or_create_topic("test-topic", moto_sns_client)
+
+    assert topic_arn == "arn:aws:sns:us-east-1:123456789012:autotest-test-topic"
+    assert client_spy.call_count == 0
+
+
+@pytest.mark.asyncio()
+async def test_topics_cache__topic_arn_preloaded_from_configuration(
+    moto_sns_client: SNSClient, mocker: MockerFixture
+) -> None:
+    client_spy = mocker.spy(moto_sns_client, "create_topic")
+    topics_cache = TopicsCache(topic_name_prefix="autotest-", topics={"test-topic": "arn:test-topic"})
+
+    topic_arn = await topics_cache.get_or_create_topic("test-topic", moto_sns_client)
+
+    assert topic_arn == "arn:test-topic"
+    assert client_spy.call_count == 0
+
+
+@pytest.mark.asyncio()
+async def test_topics_cache__topic_arns_loaded_with_list_topics(
+    moto_sns_client: SNSClient, mocker: MockerFixture
+) -> None:
+    create_topic_spy = mocker.spy(moto_sns_client, "create_topic")
+    get_paginator_spy = mocker.spy(moto_sns_client, "get_paginator")
+    topics_cache = TopicsCache(topic_name_prefix="autotest-", list_topics=True)
+
+    await topics_cache.get_or_create_topic("test-topic", moto_sns_client)
+    topic_arn = await topics_cache.get_or_create_topic("test-topic", moto_sns_client)
+
+    assert topic_arn == "arn:aws:sns:us-east-1:123456789012:autotest-test-topic"
+    assert create_topic_spy.call_count == 0
+    assert get_paginator_spy.call_count == 1
+
+
+@pytest.mark.asyncio()
+async def test_topics_cache__failed_create_topic_cached_until_ttl_expires(
+    moto_sns_client: SNSClient, mocker: MockerFixture
+) -> None:
+    error = ClientError({"Error": {"Code": "AuthorizationError", "Message": "Not authorized"}}, "CreateTopic")
+    create_topic_mock = mocker.patch.object(moto_sns_client, "create_topic", side_effect=error)
+    now = 100.0
+    topics_cache = TopicsCache(topic_name_prefix="autotest-", not_found_ttl=60.0, clock=lambda: now)
+
+    with pytest.raises(TopicNotFoundError):
+        await topics_cache.get_or_create_topic("test-topic", moto_sns_client)
+    with pytest.raises(TopicNotFoundError):
+        await topics_cache.get_or_create_topic("test-topic", moto_sns_client)
+    assert create_topic_mock.call_count == 1
+
+    now = 160.0
+    with pytest.raises(TopicNotFoundError):
+        await topics_cache.get_or_create_topic("test-topic", moto_sns_client)
+    assert create_topic_mock.call_count == 2
+
+
+@pytest.mark.asyncio()
+async def test_dispatch_message__topic_created_when_resolved_topic_not_found(
+    moto_sns_client: SNSClient, mocker: MockerFixture
+) -> None:
+    create_topic_spy = mocker.spy(moto_sns_client, "create_topic")
+    topics_cache = TopicsCache(topic_name_prefix="autotest-", topic_arn_prefix=TOPIC_ARN_PREFIX)
+
+    await dispatch_message(moto_sns_client, published_message_factory("new-topic"), envelope_json_message, topics_cache)
+
+    assert create_topic_spy.call_args == call(Name="autotest-new-topic")
+    assert (
+        await topics_cache.get_or_create_topic("new-topic", moto_sns_client) == f"{TOPIC_ARN_PREFIX}autotest-new-topic"
+    )
+
+
+@pytest.mark.asyncio()
+async def test_dispatch_messages_batch__topic_created_when_resolved_topic_not_found(
+    moto_sns_client: SNSClient, mocker: MockerFixture
+) -> None:
+    create_topic_spy = mocker.spy(moto_sns_client, "create_topic")
+    topics_cache = TopicsCache(topic_name_prefix="autotest-", topic_arn_prefix=TOPIC_ARN_PREFIX)
+    messages = [published_message_factory("new-topic") for _ in range(3)]
+
+    failures = await dispatch_messages_batch(moto_sns_client, messages, envelope_json_message, topics_cache)
+
+    assert failures == {}
+    assert create_topic_spy.call_count == 1
+
+
 @pytest.mark.asyncio()
 async def test_envelope_json_message() -> None:
     message = PublishedMessage(
@@ -58,6 +166,127 @@ async def test_envelope_json_message() -> None:
     assert envelope["data"] == {"message": "test-message"}
 
 
+@pytest.mark.asyncio()
+@pytest.mark.parametrize("payload_size", [10, 70000])
+async def test_envelope_serialized_json_message__same_envelope_as_envelope_json_message(
+    payload_size: int, mocker: MockerFixture
+) -> None:
+    mocker.patch("uuid.uuid4", return_value=uuid.UUID("00000000-0000-0000-0000-000000000001"))
+    mocker.patch("time.time", return_value=1700000000.123)
+    message = published_message_factory()
+    message.message = json.dumps({"message": "é" * payload_size, "items": [1, 2.5, None, True]})
+
+    assert await envelope_serialized_json_message(message) == await envelope_json_message(message)
+
+
+@pytest.mark.asyncio()
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"message": "日本語 ✓ é", "emoji": "\U0001f680", "escaped": '"quoted"\n\t\u0000'},
+        {"values": [0.1, 2.5, -0.0, 1e-07, 1e20, 3.141592653589793, 1.7976931348623157e308]},
+    ],
+)
+async def test_envelope_serialized_json_message__same_bytes_as_json_base_build_message(
+    payload: dict, mocker: MockerFixture
+) -> None:
+    mocker.patch("uuid.uuid4", return_value=uuid.UUID("00000000-0000-0000-0000-000000000001"))
+    mocker.patch("time.time", return_value=1700000000.123)
+    message = published_message_factory()
+    message.message = json.dumps(payload)
+
+    envelope = await envelope_serialized_json_message(message)
+
+    assert envelope.encode() == (await JsonBase.build_message(service={}, topic=message.topic, data=payload)).encode()
+
+
+@pytest.mark.asyncio()
+async def test_envelope_serialized_json_message__parsed_by_json_base() -> None:
+    message = published_message_factory()
+
+    parsed_message, _, _ = await JsonBase.parse_message(await envelope_serialized_json_message(message))
+
+    assert parsed_message["metadata"]["topic"] == "test-topic"
+    assert parsed_message["data"] == {"message": "test-message"}
+
+
+@pytest.mark.asyncio()
+async def test_rehydrating_envelope_handler__claim_checked_payload_enveloped() -> None:
+    store = FakePayloadStore({"fake://payload.json": json.dumps({"message": "test-message"}).encode()})
+    envelope_handler = create_rehydrating_envelope_handler(envelope_json_message, store, max_payload_bytes=1024)
+    reference = {"claim_check": {"uri": "fake://payload.json", "size": 27}, "correlation_id": str(uuid.uuid4())}
+    message = published_message_factory()
+    message.message = json.dumps(reference)
+
+    envelope = json.loads(await envelope_handler(message))
+
+    assert envelope["data"] == {"message": "test-message"}
+
+
+@pytest.mark.asyncio()
+async def test_rehydrating_envelope_handler__stream_record_message_rehydrated() -> None:
+    store = FakePayloadStore({"fake://payload.json": json.dumps({"message": "test-message"}).encode()})
+    envelope_handler = create_rehydrating_envelope_handler(envelope_json_message, store, max_payload_bytes=1024)
+    reference = {"claim_check": {"uri": "fake://payload.json", "size": 27}, "correlation_id": str(uuid.uuid4())}
+    message = published_message_factory()
+    image = {
+        "MessageId": {"S": str(message.message_id)},
+        "AggregateId": {"S": str(message.aggregate_id)},
+        "CorrelationId": {"S": str(message.correlation_id)},
+        "Topic": {"S": message.topic},
+        "Message": {"S": json.dumps(reference)},
+        "CreatedAt": {"S": message.created_at.isoformat()},
+    }
+    stream_record_message = StreamRecordMessage(image)
+
+    envelope = json.loads(await envelope_handler(stream_record_message))
+
+    assert envelope["data"] == {"message": "test-message"}
+    assert stream_record_message.message == json.dumps(reference)
+
+
+@pytest.mark.asyncio()
+async def test_rehydrating_envelope_handler__only_claim_check_references_parsed(mocker: MockerFixture) -> None:
+    store = FakePayloadStore({"fake://payload.json": json.dumps({"message": "test-message"}).encode()})
+    json_backend = StdlibJsonBackend()
+    loads_spy = mocker.spy(json_backend, "loads")
+    envelope_handler = create_rehydrating_envelope_handler(
+        envelope_json_message, store, max_payload_bytes=1024, json_backend=json_backend
+    )
+    reference = {"claim_check": {"uri": "fake://payload.json", "size": 27}, "correlation_id": str(uuid.uuid4())}
+    message, claim_checked_message = published_message_factory(), published_message_factory()
+    claim_checked_message.message = json.dumps(reference)
+
+    await envelope_handler(message)
+    await envelope_handler(claim_checked_message)
+
+    loads_spy.assert_called_once_with(json.dumps(reference))
+
+
+@pytest.mark.asyncio()
+async def test_rehydrating_envelope_handler__reference_to_too_large_payload_forwarded() -> None:
+    envelope_handler = create_rehydrating_envelope_handler(
+        envelope_json_message, FakePayloadStore(), max_payload_bytes=1024
+    )
+    reference = {"claim_check": {"uri": "fake://payload.json", "size": 1025}, "correlation_id": str(uuid.uuid4())}
+    message = published_message_factory()
+    message.message = json.dumps(reference)
+
+    envelope = json.loads(await envelope_handler(message))
+
+    assert envelope["data"] == reference
+
+
+@pytest.mark.asyncio()
+async def test_rehydrating_envelope_handler__message_without_reference_enveloped_as_is() -> None:
+    envelope_handler = create_rehydrating_envelope_handler(envelope_json_message, FakePayloadStore())
+    message = published_message_factory()
+
+    envelope = json.loads(await envelope_handler(message))
+
+    assert envelope["data"] == json.loads(message.message)
+
+
 @pytest.mark.asyncio()
 async def test_dispatch_message(moto_sns_client: SNSClient, moto_sqs_client: SQSClient) -> None:
     topics_cache = TopicsCache(topic_name_prefix="autotest-")
@@ -78,3 +307,197 @@ async def test_dispatch_message(moto_sns_client: SNSClient, moto_sqs_client: SQS
         assert message == {"message": "test-message"}
 
     await probe_until(_assert_message_received, probe_interval=0.3, stop_after=8)
+
+
+def published_message_factory(topic: str = "test-topic") -> PublishedMessage:
+    return PublishedMessage(
+        message_id=uuid.uuid4(),
+        aggregate_id=uuid.uuid4(),
+        correlation_id=uuid.uuid4(),
+        topic=topic,
+        message=json.dumps({"message": "test-message"}),
+        created_at=utcnow(),
+    )
+
+
+@pytest.mark.asyncio()
+async def test_dispatch_messages_batch(moto_sns_client: SNSClient, moto_sqs_client: SQSClient) -> None:
+    topics_cache = TopicsCache(topic_name_prefix="autotest-")
+    messages = [published_message_factory() for _ in range(3)]
+
+    failures = await dispatch_messages_batch(moto_sns_client, messages, envelope_json_message, topics_cache)
+
+    assert failures == {}
+
+    async def _assert_messages_received() -> None:
+        received_messages = await snssqs_client.receive(
+            moto_sqs_client, "autotest-test-queue", JsonBase, dict[str, str]
+        )
+
+        assert received_messages == [{"message": "test-message"}] * 3
+
+    await probe_until(_assert_messages_received, probe_interval=0.3, stop_after=8)
+
+
+@pytest.mark.asyncio()
+async def test_dispatch_messages_batch__messages_published_in_chunks_of_10_per_topic(
+    moto_sns_client: SNSClient, mocker: MockerFixture
+) -> None:
+    client_spy = mocker.spy(moto_sns_client, "publish_batch")
+    topics_cache = TopicsCache(topic_name_prefix="autotest-")
+    messages = [published_message_factory("test-topic") for _ in range(25)]
+    messages += [published_message_factory("test-topic-2") for _ in range(5)]
+
+    failures = await dispatch_messages_batch(moto_sns_client, messages, envelope_json_message, topics_cache)
+
+    assert failures == {}
+    batch_sizes = sorted(len(c.kwargs["PublishBatchRequestEntries"]) for c in client_spy.call_args_list)
+    assert batch_sizes == [5, 5, 10, 10]
+
+
+@pytest.mark.asyncio()
+async def test_dispatch_messages_batch__failed_entries_mapped_to_message_ids(
+    moto_sns_client: SNSClient, mocker: MockerFixture
+) -> None:
+    topics_cache = TopicsCache(topic_name_prefix="autotest-")
+    messages = [published_message_factory() for _ in range(3)]
+    mocker.patch.object(
+        moto_sns_client,
+        "publish_batch",
+        new=mocker.AsyncMock(
+            return_value={
+                "Successful": [
+                    {"Id": "0", "MessageId": str(uuid.uuid4())},
+                    {"Id": "2", "MessageId": str(uuid.uuid4())},
+                ],
+                "Failed": [{"Id": "1", "Code": "InternalError", "SenderFault": False}],
+            }
+        ),
+    )
+
+    failures = await dispatch_messages_batch(moto_sns_client, messages, envelope_json_message, topics_cache)
+
+    assert list(failures.keys()) == [messages[1].message_id]
+    assert isinstance(failures[messages[1].message_id], MessageDispatchError)
+
+
+@pytest.mark.asyncio()
+async def test_dispatch_messages_batch__all_chunk_messages_failed_on_publish_error(
+    moto_sns_client: SNSClient, mocker: MockerFixture
+) -> None:
+    topics_cache = TopicsCache(topic_name_prefix="autotest-")
+    messages = [published_message_factory() for _ in range(2)]
+    throttling_error = ClientError({"Error": {"Code": "Throttling", "Message": "Rate exceeded"}}, "PublishBatch")
+    mocker.patch.object(moto_sns_client, "publish_batch", new=mocker.AsyncMock(side_effect=throttling_error))
+
+    failures = await dispatch_messages_batch(moto_sns_client, messages, envelope_json_message, topics_cache)
+
+    assert set(failures.keys()) == {message.message_id for message in messages}
+
+
+@pytest.mark.asyncio()
+async def test_dispatch_messages_batch__only_message_that_failed_to_envelope_failed(
+    moto_sns_client: SNSClient, mocker: MockerFixture
+) -> None:
+    client_spy = mocker.spy(moto_sns_client, "publish_batch")
+    topics_cache = TopicsCache(topic_name_prefix="autotest-")
+    messages = [published_message_factory() for _ in range(3)]
+    messages[1].message = "not JSON"
+
+    failures = await dispatch_messages_batch(moto_sns_client, messages, envelope_json_message, topics_cache)
+
+    assert list(failures.keys()) == [messages[1].message_id]
+    entries = client_spy.call_args.kwargs["PublishBatchRequestEntries"]
+    assert [entry["Id"] for entry in entries] == ["0", "2"]
+
+
+@pytest.mark.asyncio()
+async def test_topics_cache__fifo_topic_created(moto_sns_client: SNSClient) -> None:
+    topics_cache = TopicsCache(topic_name_prefix="autotest-")
+
+    topic_arn = await topics_cache.get_or_create_topic("test-topic.fifo", moto_sns_client)
+
+    attributes = (await moto_sns_client.get_topic_attributes(TopicArn=topic_arn))["Attributes"]
+    assert topic_arn == "arn:aws:sns:us-east-1:123456789012:autotest-test-topic.fifo"
+    assert attributes["FifoTopic"] == "true"
+
+
+@pytest.mark.asyncio()
+async def test_dispatch_message__fifo_topic(moto_sns_client: SNSClient, mocker: MockerFixture) -> None:
+    client_spy = mocker.spy(moto_sns_client, "publish")
+    topics_cache = TopicsCache(topic_name_prefix="autotest-")
+    message = published_message_factory("test-topic.fifo")
+
+    await dispatch_message(moto_sns_client, message, envelope_json_message, topics_cache)
+
+    assert client_spy.call_args.kwargs["MessageGroupId"] == str(message.aggregate_id)
+    assert client_spy.call_args.kwargs["MessageDeduplicationId"] == str(message.message_id)
+
+
+@pytest.mark.asyncio()
+async def test_dispatch_messages_batch__fifo_topic_messages_of_aggregate_published_in_order(
+    moto_sns_client: SNSClient, mocker: MockerFixture
+) -> None:
+    client_spy = mocker.spy(moto_sns_client, "publish_batch")
+    topics_cache = TopicsCache(topic_name_prefix="autotest-")
+    aggregate_ids = [uuid.uuid4() for _ in range(5)]
+    messages = [published_message_factory("test-topic.fifo") for _ in range(30)]
+    for index, message in enumerate(messages):
+        message.aggregate_id = aggregate_ids[index % 5]
+
+    failures = await dispatch_messages_batch(moto_sns_client, messages, envelope_json_message, topics_cache)
+
+    assert failures == {}
+    published_message_ids_by_group: dict[str, list[str]] = {}
+    for publish_batch_call in client_spy.call_args_list:
+        for entry in publish_batch_call.kwargs["PublishBatchRequestEntries"]:
+            published_message_ids_by_group.setdefault(entry["MessageGroupId"], []).append(
+                entry["MessageDeduplicationId"]
+            )
+    for aggregate_id in aggregate_ids:
+        expected_message_ids = [str(m.message_id) for m in messages if m.aggregate_id == aggregate_id]
+        assert published_message_ids_by_group[str(aggregate_id)] == expected_message_ids
+
+
+@pytest.mark.asyncio()
+async def test_dispatch_messages_batch__fifo_topic_group_not_published_after_failed_message(
+    moto_sns_client: SNSClient, mocker: MockerFixture
+) -> None:
+    topics_cache = TopicsCache(topic_name_prefix="autotest-")
+    aggregate_id = uuid.uuid4()
+    messages = [published_message_factory("test-topic.fifo") for _ in range(12)]
+    for message in messages:
+        message.aggregate_id = aggregate_id
+    publish_batch_mock = mocker.AsyncMock(
+        return_value={
+            "Successful": [{"Id": str(index), "MessageId": str(uuid.uuid4())} for index in range(9)],
+            "Failed": [{"Id": "9", "Code": "InternalError", "SenderFault": False}],
+        }
+    )
+    mocker.patch.object(moto_sns_client, "publish_batch", new=publish_batch_mock)
+
+    failures = await dispatch_messages_batch(moto_sns_client, messages, envelope_json_message, topics_cache)
+
+    assert publish_batch_mock.await_count == 1
+    assert list(failures.keys()) == [message.message_id for message in messages[9:]]
+    assert isinstance(failures[messages[10].message_id], PreviousGroupMessageNotDispatchedError)
+
+
+@pytest.mark.asyncio()
+async def test_dispatch_messages_batch__fifo_topic_group_not_published_after_message_failed_to_envelope(
+    moto_sns_client: SNSClient, mocker: MockerFixture
+) -> None:
+    client_spy = mocker.spy(moto_sns_client, "publish_batch")
+    topics_cache = TopicsCache(topic_name_prefix="autotest-")
+    aggregate_id = uuid.uuid4()
+    messages = [published_message_factory("test-topic.fifo") for _ in range(3)]
+    for message in messages[:2]:
+        message.aggregate_id = aggregate_id
+    messages[0].message = "not JSON"
+
+    failures = await dispatch_messages_batch(moto_sns_client, messages, envelope_json_message, topics_cache)
+
+    assert list(failures.keys()) == [messages[0].message_id, messages[1].message_id]
+    assert isinstance(failures[messages[1].message_id], PreviousGroupMessageNotDispatchedError)
+    entries = client_spy.call_args.kwargs["PublishBatchRequestEntries"]
+    assert [entry["MessageDeduplicationId"] for entry in entries] == [str(messages[2].message_id)]
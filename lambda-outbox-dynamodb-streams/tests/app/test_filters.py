@@ -0,0 +1,46 @@
+import pytest
+
+from lambda_outbox_dynamodb_streams.app.filters import (
+    EXPIRED_MESSAGE_REMOVE_FILTER_PATTERN,
+    NOT_DISPATCHED_MESSAGE_INSERT_FILTER_PATTERN,
+    filter_stream_event,
+    get_filter_patterns,
+)
+from tests.fakes import expired_record_factory, record_factory
+
+
+def test_filter_stream_event__only_not_dispatched_message_inserts_kept() -> None:
+    insert_record = record_factory(event_name="INSERT", sequence_number="1").raw_event
+    modify_record = record_factory(event_name="MODIFY", sequence_number="2").raw_event
+    remove_record = record_factory(event_name="REMOVE", sequence_number="3").raw_event
+    expired_record = expired_record_factory(sequence_number="4").raw_event
+    dispatched_insert_record = record_factory(event_name="INSERT", sequence_number="5").raw_event
+    del dispatched_insert_record["dynamodb"]["NewImage"]["NotDispatched"]
+    event = {"Records": [insert_record, modify_record, remove_record, expired_record, dispatched_insert_record]}
+
+    filtered_event = filter_stream_event(event, archive_expired_messages=False)
+
+    assert filtered_event == {"Records": [insert_record]}
+
+
+def test_filter_stream_event__expired_messages_kept_when_archived() -> None:
+    insert_record = record_factory(event_name="INSERT", sequence_number="1").raw_event
+    remove_record = record_factory(event_name="REMOVE", sequence_number="2").raw_event
+    expired_record = expired_record_factory(sequence_number="3").raw_event
+
+    filtered_event = filter_stream_event(
+        {"Records": [insert_record, remove_record, expired_record]}, archive_expired_messages=True
+    )
+
+    assert filtered_event == {"Records": [insert_record, expired_record]}
+
+
+@pytest.mark.parametrize(
+    ("archive_expired_messages", "filter_patterns"),
+    [
+        (False, [NOT_DISPATCHED_MESSAGE_INSERT_FILTER_PATTERN]),
+        (True, [NOT_DISPATCHED_MESSAGE_INSERT_FILTER_PATTERN, EXPIRED_MESSAGE_REMOVE_FILTER_PATTERN]),
+    ],
+)
+def test_get_filter_patterns(archive_expired_messages: bool, filter_patterns: list[dict]) -> None:
+    assert get_filter_patterns(archive_expired_messages) == filter_patterns
@@ -1,4 +1,8 @@
+import asyncio
+import uuid
+
 import pytest
+from pytest_mock import MockerFixture
 from tomodachi.envelope.json_base import JsonBase
 from tomodachi_testcontainers.clients import snssqs_client
 from tomodachi_testcontainers.pytest.async_probes import probe_during_interval, probe_until
@@ -6,7 +10,8 @@ from transactional_messaging.dynamodb import DynamoDBOutboxRepository
 from types_aiobotocore_sqs import SQSClient
 from unit_of_work.dynamodb import DynamoDBSession
 
-from lambda_outbox_dynamodb_streams.app.lambda_function import async_record_handler
+from lambda_outbox_dynamodb_streams.app import lambda_function
+from lambda_outbox_dynamodb_streams.app.lambda_function import async_record_handler, lambda_handler, settings
 from tests.fakes import message_factory, record_factory
 
 pytestmark = pytest.mark.usefixtures(
@@ -83,3 +88,79 @@ async def test_dynamodb_update_event__not_insert_dynamodb_stream_record_skipped(
         assert len(messages) == 0
 
     await probe_during_interval(_assert_message_received, probe_interval=0.3, stop_after=5)
+
+
+def test_lambda_handler__messages_dispatched_in_batch(published_message_ids: list[uuid.UUID]) -> None:
+    records = [
+        record_factory(event_name="INSERT", sequence_number=str(i), message_id=message_id)
+        for i, message_id in enumerate(published_message_ids)
+    ]
+
+    response = lambda_handler({"Records": [record.raw_event for record in records]}, None)
+
+    assert response == {"batchItemFailures": []}
+
+
+@pytest.mark.asyncio()
+async def test_lambda_handler__messages_marked_as_dispatched_in_bulk(
+    published_message_ids: list[uuid.UUID], outbox_repository: DynamoDBOutboxRepository
+) -> None:
+    records = [
+        record_factory(event_name="INSERT", sequence_number=str(i), message_id=message_id)
+        for i, message_id in enumerate(published_message_ids)
+    ]
+
+    await asyncio.to_thread(lambda_handler, {"Records": [record.raw_event for record in records]}, None)
+
+    for message_id in published_message_ids:
+        published_message = await outbox_repository.get(message_id=message_id)
+        assert published_message
+        assert published_message.is_dispatched is True
+        assert published_message.approximate_dispatch_count == 1
+
+
+def test_lambda_handler__records_dropped_by_filter_not_processed(mocker: MockerFixture) -> None:
+    dispatch_spy = mocker.spy(lambda_function, "DispatchBatch")
+    dispatched_insert_record = record_factory(event_name="INSERT", sequence_number="2").raw_event
+    del dispatched_insert_record["dynamodb"]["NewImage"]["NotDispatched"]
+    records = [record_factory(event_name="MODIFY", sequence_number="1").raw_event, dispatched_insert_record]
+
+    response = lambda_handler({"Records": records}, None)
+
+    assert response == {"batchItemFailures": []}
+    assert not list(dispatch_spy.call_args.args[0])
+
+
+def test_lambda_handler__partial_failure_reported_for_failed_record_sequence_number(
+    published_message_ids: list[uuid.UUID],
+) -> None:
+    records = [
+        record_factory(event_name="INSERT", sequence_number="1", message_id=published_message_ids[0]),
+        record_factory(event_name="INSERT", sequence_number="2", message_id=uuid.uuid4()),  # Not in the outbox
+        record_factory(event_name="MODIFY", sequence_number="3", message_id=published_message_ids[1]),
+    ]
+
+    response = lambda_handler({"Records": [record.raw_event for record in records]}, None)
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": "2"}]}
+
+
+def test_lambda_handler__ordered_dispatch_mode__failed_record_stops_its_aggregate(
+    monkeypatch: pytest.MonkeyPatch, published_message_ids: list[uuid.UUID]
+) -> None:
+    monkeypatch.setattr(settings, "outbox_dispatch_mode", "ordered")
+    other_aggregate_id = uuid.uuid4()
+    records = [
+        record_factory(event_name="INSERT", sequence_number="1", message_id=uuid.uuid4()),  # Not in the outbox
+        record_factory(event_name="INSERT", sequence_number="2", message_id=published_message_ids[0]),
+        record_factory(
+            event_name="INSERT",
+            sequence_number="3",
+            message_id=published_message_ids[1],
+            aggregate_id=other_aggregate_id,
+        ),
+    ]
+
+    response = lambda_handler({"Records": [record.raw_event for record in records]}, None)
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": "1"}, {"itemIdentifier": "2"}]}
@@ -1,11 +1,17 @@
+import base64
 import datetime
 import json
 import uuid
+import zlib
 
 import pytest
 from aws_lambda_powertools.utilities.data_classes.dynamo_db_stream_event import DynamoDBRecord
+from transactional_messaging.outbox import PublishedMessage
 
-from lambda_outbox_dynamodb_streams.app.message import create_published_message_from_dynamodb_stream_record
+from lambda_outbox_dynamodb_streams.app.message import (
+    create_published_message_from_dynamodb_stream_record,
+    to_published_message,
+)
 
 
 def test_create_published_message_from_dynamodb_stream_record() -> None:
@@ -48,6 +54,42 @@ def test_create_published_message_from_dynamodb_stream_record() -> None:
     assert message.created_at == datetime.datetime(2023, 8, 15, 8, 24, 5, 961363, tzinfo=datetime.timezone.utc)
 
 
+def test_create_published_message_from_dynamodb_stream_record__compressed_message_decompressed() -> None:
+    compressed_message = zlib.compress(json.dumps({"message": "test-message"}).encode())
+    record = DynamoDBRecord(
+        {
+            "eventID": "1e8883d7812c4016b68a365ad51dd453",
+            "eventName": "INSERT",
+            "eventVersion": "1.0",
+            "eventSource": "aws:dynamodb",
+            "awsRegion": "us-east-1",
+            "dynamodb": {
+                "StreamViewType": "NEW_AND_OLD_IMAGES",
+                "ApproximateCreationDateTime": "2023-08-15T08:24:08.202526",
+                "SequenceNumber": "1100000000017454423009",
+                "SizeBytes": 648,
+                "Keys": {"PK": {"S": "MESSAGE#c79e7d16-4562-4350-ab53-f697bfc120e9"}},
+                "NewImage": {
+                    "PK": {"S": "MESSAGE#c79e7d16-4562-4350-ab53-f697bfc120e9"},
+                    "MessageId": {"S": "c79e7d16-4562-4350-ab53-f697bfc120e9"},
+                    "AggregateId": {"S": "de8fe25c-21a5-4169-b8ad-bc5084333ba9"},
+                    "CorrelationId": {"S": "ed5ff64d-946d-43b3-ada0-532cd8eb1fa7"},
+                    "Topic": {"S": "test-topic"},
+                    "Message": {"B": base64.b64encode(compressed_message).decode()},
+                    "MessageCodec": {"S": "zlib"},
+                    "CreatedAt": {"S": "2023-08-15T08:24:05.961363+00:00"},
+                },
+                "OldImage": {},
+            },
+            "eventSourceARN": "arn:aws:dynamodb:us-east-1:123456789012:table/outbox/stream/2023-08-15T08:24:06.046495",
+        }
+    )
+
+    message = create_published_message_from_dynamodb_stream_record(record)
+
+    assert message.message == json.dumps({"message": "test-message"})
+
+
 @pytest.mark.asyncio()
 async def test_value_error_if_new_image_not_provided() -> None:
     record = DynamoDBRecord(
@@ -71,3 +113,80 @@ async def test_value_error_if_new_image_not_provided() -> None:
 
     with pytest.raises(ValueError, match="PublishedMessage not created from stream record"):
         create_published_message_from_dynamodb_stream_record(record)
+
+
+def test_stream_record_message_attributes_decoded_on_first_access() -> None:
+    record = DynamoDBRecord(
+        {
+            "eventName": "INSERT",
+            "dynamodb": {
+                "SequenceNumber": "1100000000017454423009",
+                "NewImage": {
+                    "MessageId": {"S": "c79e7d16-4562-4350-ab53-f697bfc120e9"},
+                    "AggregateId": {"S": "de8fe25c-21a5-4169-b8ad-bc5084333ba9"},
+                    "CorrelationId": {"S": "not-a-uuid"},
+                    "Topic": {"S": "test-topic"},
+                    "Message": {"S": '{"message": "test-message"}'},
+                    "CreatedAt": {"S": "not-a-datetime"},
+                },
+            },
+        }
+    )
+
+    message = create_published_message_from_dynamodb_stream_record(record)
+
+    assert message.message_id == uuid.UUID("c79e7d16-4562-4350-ab53-f697bfc120e9")
+    assert message.topic == "test-topic"
+    with pytest.raises(ValueError, match="badly formed hexadecimal UUID string"):
+        _ = message.correlation_id
+    with pytest.raises(ValueError, match="Invalid isoformat string"):
+        _ = message.created_at
+
+
+def test_stream_record_message_converted_to_published_message() -> None:
+    record = DynamoDBRecord(
+        {
+            "eventName": "INSERT",
+            "dynamodb": {
+                "SequenceNumber": "1100000000017454423009",
+                "NewImage": {
+                    "MessageId": {"S": "c79e7d16-4562-4350-ab53-f697bfc120e9"},
+                    "AggregateId": {"S": "de8fe25c-21a5-4169-b8ad-bc5084333ba9"},
+                    "CorrelationId": {"S": "ed5ff64d-946d-43b3-ada0-532cd8eb1fa7"},
+                    "Topic": {"S": "test-topic"},
+                    "Message": {"S": '{"message": "test-message"}'},
+                    "CreatedAt": {"S": "2023-08-15T08:24:05.961363+00:00"},
+                },
+            },
+        }
+    )
+
+    message = to_published_message(create_published_message_from_dynamodb_stream_record(record))
+
+    assert message == PublishedMessage(
+        message_id=uuid.UUID("c79e7d16-4562-4350-ab53-f697bfc120e9"),
+        aggregate_id=uuid.UUID("de8fe25c-21a5-4169-b8ad-bc5084333ba9"),
+        correlation_id=uuid.UUID("ed5ff64d-946d-43b3-ada0-532cd8eb1fa7"),
+        topic="test-topic",
+        message=json.dumps({"message": "test-message"}),
+        created_at=datetime.datetime(2023, 8, 15, 8, 24, 5, 961363, tzinfo=datetime.timezone.utc),
+    )
+    assert to_published_message(message) is message
+
+
+def test_value_error_if_new_image_attribute_missing() -> None:
+    record = DynamoDBRecord(
+        {
+            "eventName": "INSERT",
+            "dynamodb": {
+                "SequenceNumber": "1100000000017454423009",
+                "NewImage": {
+                    "MessageId": {"S": "c79e7d16-4562-4350-ab53-f697bfc120e9"},
+                    "Topic": {"S": "test-topic"},
+                },
+            },
+        }
+    )
+
+    with pytest.raises(ValueError, match="PublishedMessage not created from stream record"):
+        create_published_message_from_dynamodb_stream_record(record)
@@ -0,0 +1,84 @@
+import uuid
+from pathlib import Path
+
+import pytest
+from transactional_messaging.dynamodb import DynamoDBOutboxRepository
+from types_aiobotocore_dynamodb import DynamoDBClient
+
+from lambda_outbox_dynamodb_streams.app.dispatch import TopicsCache, envelope_json_message
+from lambda_outbox_dynamodb_streams.app.recovery import OutboxRecoveryScan, ScanCheckpoint
+
+pytestmark = pytest.mark.usefixtures(
+    "_environment", "_create_topics_and_queues", "_create_outbox_table", "_reset_moto_container_on_teardown"
+)
+
+
+def recovery_scan_factory(
+    outbox_repository: DynamoDBOutboxRepository, checkpoint: ScanCheckpoint
+) -> OutboxRecoveryScan:
+    return OutboxRecoveryScan(
+        outbox_repository=outbox_repository,
+        envelope_handler=envelope_json_message,
+        topics_cache=TopicsCache(topic_name_prefix="autotest-"),
+        checkpoint=checkpoint,
+        page_size=2,
+    )
+
+
+def test_scan_checkpoint__saved_and_loaded(tmp_path: Path) -> None:
+    path = tmp_path / "checkpoint.json"
+    checkpoint = ScanCheckpoint(total_segments=3, path=path)
+
+    checkpoint.update(segment=0, cursor="cursor-0")
+    checkpoint.update(segment=1, cursor=None)
+
+    loaded_checkpoint = ScanCheckpoint(total_segments=3, path=path)
+    assert loaded_checkpoint.get_cursor(0) == "cursor-0"
+    assert loaded_checkpoint.is_completed(0) is False
+    assert loaded_checkpoint.is_completed(1) is True
+    assert loaded_checkpoint.get_cursor(2) is None
+
+
+def test_scan_checkpoint__total_segments_mismatch_raises(tmp_path: Path) -> None:
+    path = tmp_path / "checkpoint.json"
+    ScanCheckpoint(total_segments=3, path=path).update(segment=0, cursor="cursor-0")
+
+    with pytest.raises(ValueError, match="created with 3 total segments, not 4"):
+        ScanCheckpoint(total_segments=4, path=path)
+
+
+@pytest.mark.asyncio()
+async def test_recovery_scan__dispatches_messages_missing_from_not_dispatched_messages_index(
+    outbox_repository: DynamoDBOutboxRepository,
+    published_message_ids: list[uuid.UUID],
+    moto_dynamodb_client: DynamoDBClient,
+    tmp_path: Path,
+) -> None:
+    await moto_dynamodb_client.update_item(
+        TableName="outbox",
+        Key={"PK": {"S": f"MESSAGE#{published_message_ids[0]}"}},
+        UpdateExpression="REMOVE NotDispatched",
+    )
+    checkpoint = ScanCheckpoint(total_segments=1, path=tmp_path / "checkpoint.json")
+
+    dispatched_messages_count = await recovery_scan_factory(outbox_repository, checkpoint).run()
+
+    assert dispatched_messages_count == 3
+    assert checkpoint.is_completed(0) is True
+    for message_id in published_message_ids:
+        published_message = await outbox_repository.get(message_id=message_id)
+        assert published_message
+        assert published_message.is_dispatched is True
+
+
+@pytest.mark.asyncio()
+async def test_recovery_scan__completed_segments_skipped(
+    outbox_repository: DynamoDBOutboxRepository, published_message_ids: list[uuid.UUID], tmp_path: Path
+) -> None:
+    path = tmp_path / "checkpoint.json"
+    ScanCheckpoint(total_segments=1, path=path).update(segment=0, cursor=None)
+
+    dispatched_messages_count = await recovery_scan_factory(outbox_repository, ScanCheckpoint(1, path)).run()
+
+    assert dispatched_messages_count == 0
+    assert len(await outbox_repository.get_not_dispatched_messages()) == 3
@@ -0,0 +1,194 @@
+import asyncio
+import datetime
+import json
+import uuid
+from typing import AsyncGenerator
+
+import pytest
+from pytest_mock import MockerFixture
+from tomodachi.envelope.json_base import JsonBase
+from tomodachi_testcontainers.clients import snssqs_client
+from tomodachi_testcontainers.pytest.async_probes import probe_until
+from transactional_messaging.dynamodb import DynamoDBOutboxRepository
+from transactional_messaging.outbox import (
+    MarkAsDispatchedResult,
+    NotDispatchedMessagesPage,
+    OutboxRepository,
+    PublishedMessage,
+)
+from types_aiobotocore_sqs import SQSClient
+
+from lambda_outbox_dynamodb_streams.app.dispatch import TopicsCache, envelope_json_message
+from lambda_outbox_dynamodb_streams.app.relay import AdaptivePolling, OutboxRelay, dispatch_and_mark_as_dispatched
+from lambda_outbox_dynamodb_streams.app.time import utcnow
+
+pytestmark = pytest.mark.usefixtures(
+    "_environment", "_create_topics_and_queues", "_create_outbox_table", "_reset_moto_container_on_teardown"
+)
+
+
+def polling_factory() -> AdaptivePolling:
+    return AdaptivePolling(
+        min_poll_interval=0.1, max_poll_interval=1.0, min_batch_size=2, max_batch_size=8, max_concurrency=4
+    )
+
+
+@pytest.fixture()
+def relay(outbox_repository: DynamoDBOutboxRepository) -> OutboxRelay:
+    return OutboxRelay(
+        outbox_repository=outbox_repository,
+        envelope_handler=envelope_json_message,
+        topics_cache=TopicsCache(topic_name_prefix="autotest-"),
+        polling=polling_factory(),
+    )
+
+
+def test_adaptive_polling__full_batch_grows_batch_size_and_polls_immediately() -> None:
+    polling = polling_factory()
+
+    polling.update(fetched_messages_count=2)
+    polling.update(fetched_messages_count=4)
+    polling.update(fetched_messages_count=8)
+
+    assert polling.batch_size == 8
+    assert polling.poll_interval == 0
+    assert polling.concurrency == 4
+
+
+def test_adaptive_polling__partial_batch_shrinks_batch_size() -> None:
+    polling = polling_factory()
+    polling.update(fetched_messages_count=2)
+    polling.update(fetched_messages_count=4)
+
+    polling.update(fetched_messages_count=3)
+
+    assert polling.batch_size == 4
+    assert polling.poll_interval == 0.1
+
+
+def test_adaptive_polling__empty_polls_back_off_poll_interval() -> None:
+    polling = polling_factory()
+
+    for _ in range(5):
+        polling.update(fetched_messages_count=0)
+
+    assert polling.poll_interval == 1.0
+    assert polling.batch_size == 2
+
+
+@pytest.mark.asyncio()
+async def test_relay_once__dispatches_and_marks_messages_as_dispatched(
+    relay: OutboxRelay,
+    outbox_repository: DynamoDBOutboxRepository,
+    published_message_ids: list[uuid.UUID],
+    moto_sqs_client: SQSClient,
+) -> None:
+    fetched_messages_count = await relay.relay_once()
+
+    assert fetched_messages_count == 2  # Limited by the batch size
+    assert len(await outbox_repository.get_not_dispatched_messages()) == 1
+
+    async def _assert_messages_received() -> None:
+        messages = await snssqs_client.receive(moto_sqs_client, "autotest-test-queue", JsonBase, dict[str, str])
+
+        assert messages == [{"message": "test-message"}] * 2
+
+    await probe_until(_assert_messages_received, probe_interval=0.3, stop_after=8)
+
+
+@pytest.mark.asyncio()
+async def test_run__drains_outbox_until_stopped(
+    relay: OutboxRelay, outbox_repository: DynamoDBOutboxRepository, published_message_ids: list[uuid.UUID]
+) -> None:
+    stop_event = asyncio.Event()
+    task = asyncio.create_task(relay.run(stop_event))
+
+    async def _assert_all_messages_dispatched() -> None:
+        assert await outbox_repository.get_not_dispatched_messages() == []
+
+    await probe_until(_assert_all_messages_dispatched, probe_interval=0.3, stop_after=8)
+    stop_event.set()
+    await asyncio.wait_for(task, timeout=5)
+
+    for message_id in published_message_ids:
+        published_message = await outbox_repository.get(message_id=message_id)
+        assert published_message
+        assert published_message.approximate_dispatch_count == 1
+
+
+@pytest.mark.asyncio()
+async def test_dispatch_and_mark_as_dispatched__fifo_topic_aggregate_messages_published_in_order(
+    mocker: MockerFixture,
+) -> None:
+    aggregate_id = uuid.uuid4()
+    messages = [published_message_factory(aggregate_id) for _ in range(3)]
+    for seconds, message in enumerate(messages):
+        message.created_at += datetime.timedelta(seconds=seconds)
+    dispatch_message_mock = mocker.patch(
+        "lambda_outbox_dynamodb_streams.app.relay.dispatch_message",
+        side_effect=[None, RuntimeError("Throttled"), None],
+    )
+    outbox_repository = mocker.AsyncMock(spec=OutboxRepository)
+    outbox_repository.mark_as_dispatched_many.return_value = [MarkAsDispatchedResult(messages[0].message_id)]
+
+    dispatched_message_ids = await dispatch_and_mark_as_dispatched(
+        list(reversed(messages)), outbox_repository, envelope_json_message, TopicsCache(""), concurrency=4
+    )
+
+    assert dispatched_message_ids == [messages[0].message_id]
+    assert [c.args[1] for c in dispatch_message_mock.call_args_list] == messages[:2]
+    outbox_repository.mark_as_dispatched_many.assert_awaited_once_with([messages[0].message_id])
+
+
+@pytest.mark.asyncio()
+async def test_relay_once__fifo_aggregate_messages_on_next_page_not_published_until_failed_message_published(
+    mocker: MockerFixture,
+) -> None:
+    aggregate_id = uuid.uuid4()
+    failed_message, next_message = published_message_factory(aggregate_id), published_message_factory(aggregate_id)
+    other_aggregate_message = published_message_factory(uuid.uuid4())
+    pages = [[failed_message], [next_message, other_aggregate_message]]
+    dispatched_message_ids: set[uuid.UUID] = set()
+
+    async def _get_not_dispatched_messages_pages(
+        page_size: int, cursor: str | None
+    ) -> AsyncGenerator[NotDispatchedMessagesPage, None]:
+        page_messages = pages[1] if cursor == "page-2" else pages[0]
+        yield NotDispatchedMessagesPage(
+            messages=[m for m in page_messages if m.message_id not in dispatched_message_ids],
+            cursor=None if cursor == "page-2" else "page-2",
+        )
+
+    def _mark_as_dispatched_many(message_ids: list[uuid.UUID]) -> list[MarkAsDispatchedResult]:
+        dispatched_message_ids.update(message_ids)
+        return [MarkAsDispatchedResult(message_id) for message_id in message_ids]
+
+    outbox_repository = mocker.Mock(spec=OutboxRepository)
+    outbox_repository.get_not_dispatched_messages_pages.side_effect = _get_not_dispatched_messages_pages
+    outbox_repository.mark_as_dispatched_many.side_effect = _mark_as_dispatched_many
+    dispatch_message_mock = mocker.patch(
+        "lambda_outbox_dynamodb_streams.app.relay.dispatch_message",
+        side_effect=[RuntimeError("Throttled"), None, None, None],
+    )
+    relay = OutboxRelay(outbox_repository, envelope_json_message, TopicsCache(""), polling_factory())
+
+    for _ in range(4):  # Both pages twice
+        await relay.relay_once()
+
+    assert [c.args[1] for c in dispatch_message_mock.call_args_list] == [
+        failed_message,
+        other_aggregate_message,
+        failed_message,
+        next_message,
+    ]
+
+
+def published_message_factory(aggregate_id: uuid.UUID) -> PublishedMessage:
+    return PublishedMessage(
+        message_id=uuid.uuid4(),
+        aggregate_id=aggregate_id,
+        correlation_id=uuid.uuid4(),
+        topic="test-topic.fifo",
+        message=json.dumps({"message": "test-message"}),
+        created_at=utcnow(),
+    )
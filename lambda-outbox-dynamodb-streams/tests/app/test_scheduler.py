@@ -0,0 +1,114 @@
+import asyncio
+import uuid
+
+import pytest
+from aws_lambda_powertools.utilities.data_classes.dynamo_db_stream_event import DynamoDBRecord
+
+from lambda_outbox_dynamodb_streams.app.scheduler import (
+    DispatchScheduler,
+    PreviousMessageNotDispatchedError,
+    RecordHandler,
+)
+from tests.fakes import record_factory
+
+AGGREGATE_ID_1 = uuid.UUID("a6a0f6a2-0e0e-4b5b-9c37-45f0a0bbd4f1")
+AGGREGATE_ID_2 = uuid.UUID("f3c1e0a2-7f8a-4c2b-8f6e-3a9d2b1c0d4e")
+
+
+def _sequence_number(record: DynamoDBRecord) -> str:
+    assert record.dynamodb
+    assert record.dynamodb.sequence_number
+    return record.dynamodb.sequence_number
+
+
+async def _run(
+    scheduler: DispatchScheduler, records: list[DynamoDBRecord], handler: RecordHandler
+) -> list[BaseException | None]:
+    return await asyncio.gather(*[scheduler.run(record, handler) for record in records], return_exceptions=True)
+
+
+@pytest.mark.asyncio()
+async def test_records_of_the_same_aggregate_processed_in_stream_order() -> None:
+    records = [
+        record_factory(
+            event_name="INSERT", sequence_number=str(i), message_id=uuid.uuid4(), aggregate_id=AGGREGATE_ID_1
+        )
+        for i in range(5)
+    ]
+    scheduler = DispatchScheduler(records, max_concurrency=10)
+    processed: list[str] = []
+
+    async def _handler(record: DynamoDBRecord) -> None:
+        # Earlier records take longer, so they would finish last if processed concurrently
+        await asyncio.sleep(0.01 * (5 - int(_sequence_number(record))))
+        processed.append(_sequence_number(record))
+
+    await _run(scheduler, records, _handler)
+
+    assert processed == ["0", "1", "2", "3", "4"]
+
+
+@pytest.mark.asyncio()
+async def test_records_of_different_aggregates_processed_concurrently_up_to_limit() -> None:
+    records = [
+        record_factory(event_name="INSERT", sequence_number=str(i), message_id=uuid.uuid4(), aggregate_id=uuid.uuid4())
+        for i in range(10)
+    ]
+    scheduler = DispatchScheduler(records, max_concurrency=3)
+    in_progress = 0
+    max_in_progress = 0
+
+    async def _handler(record: DynamoDBRecord) -> None:
+        nonlocal in_progress, max_in_progress
+        in_progress += 1
+        max_in_progress = max(max_in_progress, in_progress)
+        await asyncio.sleep(0.01)
+        in_progress -= 1
+
+    await _run(scheduler, records, _handler)
+
+    assert max_in_progress == 3
+
+
+@pytest.mark.asyncio()
+async def test_failed_record_stops_the_rest_of_its_aggregate_partition() -> None:
+    records = [
+        record_factory(event_name="INSERT", sequence_number="0", message_id=uuid.uuid4(), aggregate_id=AGGREGATE_ID_1),
+        record_factory(event_name="INSERT", sequence_number="1", message_id=uuid.uuid4(), aggregate_id=AGGREGATE_ID_2),
+        record_factory(event_name="INSERT", sequence_number="2", message_id=uuid.uuid4(), aggregate_id=AGGREGATE_ID_1),
+        record_factory(event_name="INSERT", sequence_number="3", message_id=uuid.uuid4(), aggregate_id=AGGREGATE_ID_2),
+        record_factory(event_name="INSERT", sequence_number="4", message_id=uuid.uuid4(), aggregate_id=AGGREGATE_ID_1),
+    ]
+    scheduler = DispatchScheduler(records, max_concurrency=10)
+    processed: list[str] = []
+
+    async def _handler(record: DynamoDBRecord) -> None:
+        if _sequence_number(record) == "0":
+            raise ValueError("Failed to dispatch")
+        processed.append(_sequence_number(record))
+
+    results = await _run(scheduler, records, _handler)
+
+    assert sorted(processed) == ["1", "3"]
+    assert isinstance(results[0], ValueError)
+    assert isinstance(results[2], PreviousMessageNotDispatchedError)
+    assert isinstance(results[4], PreviousMessageNotDispatchedError)
+
+
+@pytest.mark.asyncio()
+async def test_not_insert_records_not_blocked_by_failed_partition() -> None:
+    records = [
+        record_factory(event_name="INSERT", sequence_number="0", aggregate_id=AGGREGATE_ID_1),
+        record_factory(event_name="MODIFY", sequence_number="1", aggregate_id=AGGREGATE_ID_1),
+    ]
+    scheduler = DispatchScheduler(records, max_concurrency=10)
+    processed: list[str] = []
+
+    async def _handler(record: DynamoDBRecord) -> None:
+        if record.event_name and record.event_name.name == "INSERT":
+            raise ValueError("Failed to dispatch")
+        processed.append(_sequence_number(record))
+
+    await _run(scheduler, records, _handler)
+
+    assert processed == ["1"]
@@ -0,0 +1,31 @@
+import json
+
+import pytest
+
+from lambda_outbox_dynamodb_streams.app.serialization import (
+    JsonBackendName,
+    OrjsonJsonBackend,
+    StdlibJsonBackend,
+    get_json_backend,
+)
+
+
+def test_auto_json_backend_is_orjson_when_installed() -> None:
+    pytest.importorskip("orjson")
+
+    assert isinstance(get_json_backend("auto"), OrjsonJsonBackend)
+
+
+def test_json_backend_by_name() -> None:
+    assert isinstance(get_json_backend("json"), StdlibJsonBackend)
+
+
+@pytest.mark.parametrize("name", ["json", "orjson"])
+def test_json_backends_parse_same_data(name: JsonBackendName) -> None:
+    if name == "orjson":
+        pytest.importorskip("orjson")
+    backend = get_json_backend(name)
+    data = {"message": "é", "items": [1, 2.5, None, True], "nested": {"key": "value"}}
+
+    assert backend.loads(json.dumps(data)) == data
+    assert backend.loads(json.dumps(data).encode()) == data
@@ -1,3 +1,5 @@
+import uuid
+
 import pytest
 import pytest_asyncio
 from tomodachi_testcontainers.clients import snssqs_client
@@ -10,7 +12,7 @@ from unit_of_work.dynamodb import DynamoDBSession
 
 from lambda_outbox_dynamodb_streams.app import clients
 from lambda_outbox_dynamodb_streams.app.settings import get_settings
-from tests.fakes import SampleMessage
+from tests.fakes import SampleMessage, message_factory
 
 
 @pytest.fixture()
@@ -49,3 +51,13 @@ def outbox_repository(session: DynamoDBSession) -> DynamoDBOutboxRepository:
     dynamodb_table_name = get_settings().dynamodb_outbox_table_name
     topic_map = {SampleMessage: "test-topic"}
     return DynamoDBOutboxRepository(dynamodb_table_name, session, topic_map)
+
+
+@pytest_asyncio.fixture()
+async def published_message_ids(
+    session: DynamoDBSession, outbox_repository: DynamoDBOutboxRepository
+) -> list[uuid.UUID]:
+    messages = [message_factory(message_id=uuid.uuid4()) for _ in range(3)]
+    await outbox_repository.publish(messages)
+    await session.commit()
+    return [message.message_id for message in messages]
@@ -1,10 +1,13 @@
 import datetime
 import json
 import uuid
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from aws_lambda_powertools.utilities.data_classes.dynamo_db_stream_event import DynamoDBRecord
 
+MESSAGE_ID = uuid.UUID("c79e7d16-4562-4350-ab53-f697bfc120e9")
+AGGREGATE_ID = uuid.UUID("de8fe25c-21a5-4169-b8ad-bc5084333ba9")
+
 
 @dataclass
 class SampleMessage:
@@ -17,7 +20,12 @@ class SampleMessage:
         return json.dumps({"message": "test-message"})
 
 
-def record_factory(event_name: str) -> DynamoDBRecord:
+def record_factory(
+    event_name: str,
+    sequence_number: str = "1100000000017454423009",
+    message_id: uuid.UUID = MESSAGE_ID,
+    aggregate_id: uuid.UUID = AGGREGATE_ID,
+) -> DynamoDBRecord:
     return DynamoDBRecord(
         {
             "eventID": "1e8883d7812c4016b68a365ad51dd453",
@@ -28,17 +36,18 @@ def record_factory(event_name: str) -> DynamoDBRecord:
             "dynamodb": {
                 "StreamViewType": "NEW_AND_OLD_IMAGES",
                 "ApproximateCreationDateTime": "2023-08-15T08:24:08.202526",
-                "SequenceNumber": "1100000000017454423009",
+                "SequenceNumber": sequence_number,
                 "SizeBytes": 648,
-                "Keys": {"PK": {"S": "MESSAGE#c79e7d16-4562-4350-ab53-f697bfc120e9"}},
+                "Keys": {"PK": {"S": f"MESSAGE#{message_id}"}},
                 "NewImage": {
-                    "PK": {"S": "MESSAGE#c79e7d16-4562-4350-ab53-f697bfc120e9"},
-                    "MessageId": {"S": "c79e7d16-4562-4350-ab53-f697bfc120e9"},
-                    "AggregateId": {"S": "de8fe25c-21a5-4169-b8ad-bc5084333ba9"},
+                    "PK": {"S": f"MESSAGE#{message_id}"},
+                    "MessageId": {"S": str(message_id)},
+                    "AggregateId": {"S": str(aggregate_id)},
                     "CorrelationId": {"S": "ed5ff64d-946d-43b3-ada0-532cd8eb1fa7"},
                     "Topic": {"S": "test-topic"},
                     "Message": {"S": '{"message": "test-message"}'},
                     "CreatedAt": {"S": "2023-08-15T08:24:05.961363+00:00"},
+                    "NotDispatched": {"S": "x"},
                 },
                 "OldImage": {},
             },
@@ -47,10 +56,60 @@ def record_factory(event_name: str) -> DynamoDBRecord:
     )
 
 
-def message_factory() -> SampleMessage:
+def expired_record_factory(sequence_number: str, message_id: uuid.UUID = MESSAGE_ID) -> DynamoDBRecord:
+    return DynamoDBRecord(
+        {
+            "eventID": "a3a4b5fe4a3a4c5a9b6d7e8f9a0b1c2d",
+            "eventName": "REMOVE",
+            "eventVersion": "1.1",
+            "eventSource": "aws:dynamodb",
+            "awsRegion": "us-east-1",
+            "userIdentity": {"type": "Service", "principalId": "dynamodb.amazonaws.com"},
+            "dynamodb": {
+                "StreamViewType": "NEW_AND_OLD_IMAGES",
+                "ApproximateCreationDateTime": "2023-08-22T08:24:08.202526",
+                "SequenceNumber": sequence_number,
+                "SizeBytes": 712,
+                "Keys": {"PK": {"S": f"MESSAGE#{message_id}"}},
+                "OldImage": {
+                    "PK": {"S": f"MESSAGE#{message_id}"},
+                    "MessageId": {"S": str(message_id)},
+                    "Topic": {"S": "test-topic"},
+                    "Message": {"S": '{"message": "test-message"}'},
+                    "ApproximateDispatchCount": {"N": "1"},
+                    "IsDispatched": {"BOOL": True},
+                    "ExpiresAt": {"N": "1692692648"},
+                },
+            },
+            "eventSourceARN": "arn:aws:dynamodb:us-east-1:123456789012:table/outbox/stream/2023-08-15T08:24:06.046495",
+        }
+    )
+
+
+@dataclass
+class FakeArchiveTarget:
+    files: dict[str, bytes] = field(default_factory=dict)
+
+    async def put(self, key: str, body: bytes) -> None:
+        self.files[key] = body
+
+
+@dataclass
+class FakePayloadStore:
+    payloads: dict[str, bytes] = field(default_factory=dict)
+
+    async def put(self, key: str, payload: bytes) -> str:
+        self.payloads[f"fake://{key}"] = payload
+        return f"fake://{key}"
+
+    async def get(self, uri: str) -> bytes:
+        return self.payloads[uri]
+
+
+def message_factory(message_id: uuid.UUID = MESSAGE_ID) -> SampleMessage:
     return SampleMessage(
-        message_id=uuid.UUID("c79e7d16-4562-4350-ab53-f697bfc120e9"),
-        aggregate_id=uuid.UUID("de8fe25c-21a5-4169-b8ad-bc5084333ba9"),
+        message_id=message_id,
+        aggregate_id=AGGREGATE_ID,
         correlation_id=uuid.UUID("ed5ff64d-946d-43b3-ada0-532cd8eb1fa7"),
         created_at=datetime.datetime(2023, 8, 15, 8, 24, 5, 961363, tzinfo=datetime.timezone.utc),
     )
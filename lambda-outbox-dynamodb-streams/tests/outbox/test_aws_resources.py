@@ -0,0 +1,160 @@
+import io
+import json
+import zipfile
+
+import pytest
+from pytest_mock import MockerFixture
+from types_aiobotocore_dynamodb import DynamoDBClient
+from types_aiobotocore_iam import IAMClient
+from types_aiobotocore_lambda import LambdaClient
+from types_aiobotocore_s3 import S3Client
+
+from lambda_outbox_dynamodb_streams.app.filters import NOT_DISPATCHED_MESSAGE_INSERT_FILTER_PATTERN
+from lambda_outbox_dynamodb_streams.outbox.aws_resources import (
+    add_dynamodb_stream_on_lambda,
+    create_lambda_dynamodb_streams_role,
+    create_lambda_function,
+    put_lambda_reserved_concurrency,
+)
+from lambda_outbox_dynamodb_streams.outbox.create import Settings
+
+pytestmark = pytest.mark.usefixtures("_create_outbox_table", "_reset_moto_container_on_teardown")
+
+
+@pytest.fixture()
+def lambda_zip() -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zip_file:
+        zip_file.writestr("lambda_function.py", "def lambda_handler(event, context):\n    return event\n")
+    return buffer.getvalue()
+
+
+@pytest.mark.asyncio()
+async def test_create_lambda_function__function_configured(
+    moto_lambda_client: LambdaClient,
+    moto_iam_client: IAMClient,
+    moto_dynamodb_client: DynamoDBClient,
+    moto_s3_client: S3Client,
+    lambda_zip: bytes,
+) -> None:
+    create_role_response = await create_lambda_dynamodb_streams_role(moto_iam_client, moto_dynamodb_client, "outbox")
+    await moto_s3_client.create_bucket(Bucket="lambda-code")
+    await moto_s3_client.put_object(Bucket="lambda-code", Key="lambda.zip", Body=lambda_zip)
+
+    await create_lambda_function(
+        moto_lambda_client,
+        function_name="outbox-dynamodb-streams--outbox",
+        environment_variables={},
+        lambda_role_arn=create_role_response["Role"]["Arn"],
+        handler="lambda_function.lambda_handler",
+        s3_bucket_name="lambda-code",
+        s3_lambda_key="lambda.zip",
+        architecture="arm64",
+        runtime="python3.11",
+        memory_size=1769,
+        timeout=60,
+        ephemeral_storage_size=1024,
+    )
+    await put_lambda_reserved_concurrency(moto_lambda_client, "outbox-dynamodb-streams--outbox", 5)
+
+    function = await moto_lambda_client.get_function(FunctionName="outbox-dynamodb-streams--outbox")
+    assert function["Configuration"]["Runtime"] == "python3.11"
+    assert function["Configuration"]["MemorySize"] == 1769
+    assert function["Configuration"]["Timeout"] == 60
+    assert function["Configuration"]["EphemeralStorage"] == {"Size": 1024}
+    assert function["Concurrency"] == {"ReservedConcurrentExecutions": 5}
+
+
+@pytest.mark.asyncio()
+async def test_add_dynamodb_stream_on_lambda__event_source_mapping_configured(
+    moto_lambda_client: LambdaClient,
+    moto_iam_client: IAMClient,
+    moto_dynamodb_client: DynamoDBClient,
+    lambda_zip: bytes,
+    mocker: MockerFixture,
+) -> None:
+    create_event_source_mapping_spy = mocker.spy(moto_lambda_client, "create_event_source_mapping")
+    create_role_response = await create_lambda_dynamodb_streams_role(moto_iam_client, moto_dynamodb_client, "outbox")
+    await moto_lambda_client.create_function(
+        FunctionName="outbox-dynamodb-streams--outbox",
+        Runtime="python3.10",
+        Role=create_role_response["Role"]["Arn"],
+        Handler="lambda_function.lambda_handler",
+        Code={"ZipFile": lambda_zip},
+    )
+
+    await add_dynamodb_stream_on_lambda(
+        moto_lambda_client,
+        moto_dynamodb_client,
+        dynamodb_table_name="outbox",
+        function_name="outbox-dynamodb-streams--outbox",
+        batch_size=50,
+        maximum_batching_window_in_seconds=1,
+        parallelization_factor=2,
+        maximum_retry_attempts=5,
+        bisect_batch_on_function_error=True,
+        on_failure_destination_arn="arn:aws:sqs:us-east-1:123456789012:outbox-dlq",
+    )
+
+    [event_source_mapping] = (await moto_lambda_client.list_event_source_mappings())["EventSourceMappings"]
+    assert event_source_mapping["BatchSize"] == 50
+    # Moto doesn't return the rest of the event source mapping configuration
+    create_event_source_mapping_kwargs = create_event_source_mapping_spy.call_args.kwargs
+    assert create_event_source_mapping_kwargs["MaximumBatchingWindowInSeconds"] == 1
+    assert create_event_source_mapping_kwargs["ParallelizationFactor"] == 2
+    assert create_event_source_mapping_kwargs["MaximumRetryAttempts"] == 5
+    assert create_event_source_mapping_kwargs["BisectBatchOnFunctionError"] is True
+    assert create_event_source_mapping_kwargs["FunctionResponseTypes"] == ["ReportBatchItemFailures"]
+    assert create_event_source_mapping_kwargs["DestinationConfig"] == {
+        "OnFailure": {"Destination": "arn:aws:sqs:us-east-1:123456789012:outbox-dlq"}
+    }
+    assert create_event_source_mapping_kwargs["FilterCriteria"] == {
+        "Filters": [{"Pattern": json.dumps(NOT_DISPATCHED_MESSAGE_INSERT_FILTER_PATTERN)}]
+    }
+
+
+@pytest.mark.asyncio()
+async def test_add_dynamodb_stream_on_lambda__default_event_source_mapping_configuration(
+    moto_lambda_client: LambdaClient,
+    moto_iam_client: IAMClient,
+    moto_dynamodb_client: DynamoDBClient,
+    lambda_zip: bytes,
+    mocker: MockerFixture,
+) -> None:
+    create_event_source_mapping_spy = mocker.spy(moto_lambda_client, "create_event_source_mapping")
+    create_role_response = await create_lambda_dynamodb_streams_role(moto_iam_client, moto_dynamodb_client, "outbox")
+    await moto_lambda_client.create_function(
+        FunctionName="outbox-dynamodb-streams--outbox",
+        Runtime="python3.10",
+        Role=create_role_response["Role"]["Arn"],
+        Handler="lambda_function.lambda_handler",
+        Code={"ZipFile": lambda_zip},
+    )
+
+    await add_dynamodb_stream_on_lambda(
+        moto_lambda_client,
+        moto_dynamodb_client,
+        dynamodb_table_name="outbox",
+        function_name="outbox-dynamodb-streams--outbox",
+    )
+
+    create_event_source_mapping_kwargs = create_event_source_mapping_spy.call_args.kwargs
+    assert create_event_source_mapping_kwargs["BatchSize"] == Settings.batch_size
+    assert create_event_source_mapping_kwargs["MaximumRetryAttempts"] == Settings.maximum_retry_attempts
+    assert create_event_source_mapping_kwargs["BisectBatchOnFunctionError"] is Settings.bisect_batch_on_function_error
+    assert create_event_source_mapping_kwargs["BisectBatchOnFunctionError"] is True
+    assert create_event_source_mapping_kwargs["DestinationConfig"] == {}
+
+
+@pytest.mark.asyncio()
+async def test_add_dynamodb_stream_on_lambda__bounded_retries_without_on_failure_destination_rejected(
+    moto_lambda_client: LambdaClient, moto_dynamodb_client: DynamoDBClient
+) -> None:
+    with pytest.raises(ValueError, match="on_failure_destination_arn is required"):
+        await add_dynamodb_stream_on_lambda(
+            moto_lambda_client,
+            moto_dynamodb_client,
+            dynamodb_table_name="outbox",
+            function_name="outbox-dynamodb-streams--outbox",
+            maximum_retry_attempts=10,
+        )
@@ -1,6 +1,10 @@
+import json
+import zipfile
+from pathlib import Path
 from typing import Any
 
 import pytest
+from pytest_mock import MockerFixture
 from tomodachi.envelope.json_base import JsonBase
 from tomodachi_testcontainers.clients import snssqs_client
 from tomodachi_testcontainers.containers import MotoContainer
@@ -13,6 +17,11 @@ from types_aiobotocore_s3 import S3Client
 from types_aiobotocore_sqs import SQSClient
 from unit_of_work.dynamodb import DynamoDBSession
 
+from lambda_outbox_dynamodb_streams.app.filters import (
+    EXPIRED_MESSAGE_REMOVE_FILTER_PATTERN,
+    NOT_DISPATCHED_MESSAGE_INSERT_FILTER_PATTERN,
+)
+from lambda_outbox_dynamodb_streams.outbox import create as create_module
 from lambda_outbox_dynamodb_streams.outbox import create_dynamodb_streams_outbox
 from lambda_outbox_dynamodb_streams.outbox.create import Settings
 from tests.fakes import message_factory
@@ -57,3 +66,135 @@ async def test_create_dynamodb_streams_outbox(
         assert message == {"message": "test-message"}
 
     await probe_until(_receive_sns_message, probe_interval=0.3, stop_after=8)
+
+
+@pytest.fixture()
+def lambda_zip_path(tmp_path: Path, mocker: MockerFixture) -> Path:
+    lambda_zip_path = tmp_path / "lambda.zip"
+    _write_lambda_zip(lambda_zip_path, "v1")
+    mocker.patch.object(create_module, "LAMBDA_ZIP_PATH_ARM64", lambda_zip_path)
+    mocker.patch.object(create_module, "LAMBDA_ZIP_PATH_X86_64", lambda_zip_path)
+    return lambda_zip_path
+
+
+def _write_lambda_zip(path: Path, version: str) -> None:
+    with zipfile.ZipFile(path, "w") as zip_file:
+        zip_file.writestr("app/lambda_function.py", f"VERSION = {version!r}\n")
+
+
+@pytest.mark.asyncio()
+async def test_create_dynamodb_streams_outbox__existing_resources_not_recreated(
+    moto_iam_client: IAMClient,
+    moto_lambda_client: LambdaClient,
+    moto_dynamodb_client: DynamoDBClient,
+    moto_s3_client: S3Client,
+    lambda_zip_path: Path,
+    mocker: MockerFixture,
+) -> None:
+    settings = Settings(dynamodb_outbox_table_name="outbox")
+    clients = (moto_lambda_client, moto_iam_client, moto_dynamodb_client, moto_s3_client)
+    await create_dynamodb_streams_outbox(*clients, settings=settings)
+    create_role_spy = mocker.spy(moto_iam_client, "create_role")
+    put_object_spy = mocker.spy(moto_s3_client, "put_object")
+    create_function_spy = mocker.spy(moto_lambda_client, "create_function")
+    update_function_code_spy = mocker.spy(moto_lambda_client, "update_function_code")
+    update_function_configuration_spy = mocker.spy(moto_lambda_client, "update_function_configuration")
+    create_event_source_mapping_spy = mocker.spy(moto_lambda_client, "create_event_source_mapping")
+
+    await create_dynamodb_streams_outbox(*clients, settings=settings)
+
+    create_role_spy.assert_not_called()
+    put_object_spy.assert_not_called()
+    create_function_spy.assert_not_called()
+    update_function_code_spy.assert_not_called()
+    update_function_configuration_spy.assert_not_called()
+    create_event_source_mapping_spy.assert_not_called()
+    event_source_mappings = (await moto_lambda_client.list_event_source_mappings())["EventSourceMappings"]
+    assert len(event_source_mappings) == 1
+
+
+@pytest.mark.asyncio()
+async def test_create_dynamodb_streams_outbox__changed_code_and_configuration_updated(
+    moto_iam_client: IAMClient,
+    moto_lambda_client: LambdaClient,
+    moto_dynamodb_client: DynamoDBClient,
+    moto_s3_client: S3Client,
+    lambda_zip_path: Path,
+    mocker: MockerFixture,
+) -> None:
+    clients = (moto_lambda_client, moto_iam_client, moto_dynamodb_client, moto_s3_client)
+    await create_dynamodb_streams_outbox(*clients, settings=Settings(dynamodb_outbox_table_name="outbox"))
+    put_object_spy = mocker.spy(moto_s3_client, "put_object")
+    update_function_code_spy = mocker.spy(moto_lambda_client, "update_function_code")
+    update_function_configuration_spy = mocker.spy(moto_lambda_client, "update_function_configuration")
+    _write_lambda_zip(lambda_zip_path, "v2")
+
+    await create_dynamodb_streams_outbox(
+        *clients, settings=Settings(dynamodb_outbox_table_name="outbox", memory_size=512)
+    )
+
+    put_object_spy.assert_called_once()
+    update_function_code_spy.assert_called_once()
+    update_function_configuration_spy.assert_called_once()
+    function = await moto_lambda_client.get_function(FunctionName="outbox-dynamodb-streams--outbox")
+    assert function["Configuration"]["MemorySize"] == 512
+
+
+@pytest.mark.asyncio()
+async def test_create_dynamodb_streams_outbox__archive_and_claim_check_configured(
+    moto_iam_client: IAMClient,
+    moto_lambda_client: LambdaClient,
+    moto_dynamodb_client: DynamoDBClient,
+    moto_s3_client: S3Client,
+    lambda_zip_path: Path,
+    mocker: MockerFixture,
+) -> None:
+    create_event_source_mapping_spy = mocker.spy(moto_lambda_client, "create_event_source_mapping")
+    settings = Settings(
+        dynamodb_outbox_table_name="outbox",
+        archive_s3_bucket="outbox-archive",
+        archive_s3_key_prefix="expired/",
+        claim_check_s3_bucket="outbox-claim-check",
+    )
+
+    await create_dynamodb_streams_outbox(
+        moto_lambda_client, moto_iam_client, moto_dynamodb_client, moto_s3_client, settings=settings
+    )
+
+    function = await moto_lambda_client.get_function(FunctionName="outbox-dynamodb-streams--outbox")
+    environment_variables = function["Configuration"]["Environment"]["Variables"]
+    assert environment_variables["OUTBOX_ARCHIVE_S3_BUCKET"] == "outbox-archive"
+    assert environment_variables["OUTBOX_ARCHIVE_S3_KEY_PREFIX"] == "expired/"
+    assert environment_variables["OUTBOX_CLAIM_CHECK_S3_BUCKET"] == "outbox-claim-check"
+    assert create_event_source_mapping_spy.call_args.kwargs["FilterCriteria"] == {
+        "Filters": [
+            {"Pattern": json.dumps(NOT_DISPATCHED_MESSAGE_INSERT_FILTER_PATTERN)},
+            {"Pattern": json.dumps(EXPIRED_MESSAGE_REMOVE_FILTER_PATTERN)},
+        ]
+    }
+
+
+@pytest.mark.asyncio()
+async def test_create_dynamodb_streams_outbox__expired_messages_not_archived_by_default(
+    moto_iam_client: IAMClient,
+    moto_lambda_client: LambdaClient,
+    moto_dynamodb_client: DynamoDBClient,
+    moto_s3_client: S3Client,
+    lambda_zip_path: Path,
+    mocker: MockerFixture,
+) -> None:
+    create_event_source_mapping_spy = mocker.spy(moto_lambda_client, "create_event_source_mapping")
+
+    await create_dynamodb_streams_outbox(
+        moto_lambda_client,
+        moto_iam_client,
+        moto_dynamodb_client,
+        moto_s3_client,
+        settings=Settings(dynamodb_outbox_table_name="outbox"),
+    )
+
+    function = await moto_lambda_client.get_function(FunctionName="outbox-dynamodb-streams--outbox")
+    assert "OUTBOX_ARCHIVE_S3_BUCKET" not in function["Configuration"]["Environment"]["Variables"]
+    assert create_event_source_mapping_spy.call_args.kwargs["FilterCriteria"] == {
+        "Filters": [{"Pattern": json.dumps(NOT_DISPATCHED_MESSAGE_INSERT_FILTER_PATTERN)}]
+    }
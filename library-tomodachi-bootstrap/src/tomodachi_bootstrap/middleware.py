@@ -1,5 +1,5 @@
 import uuid
-from typing import Any, Callable
+from typing import Any, Awaitable, Callable
 
 import structlog
 from aiohttp import web
@@ -7,6 +7,8 @@ from tomodachi.transport.aws_sns_sqs import AWSSNSSQSInternalServiceError
 
 logger: structlog.stdlib.BoundLogger = structlog.get_logger()
 
+ClaimCheckResolver = Callable[[Any], Awaitable[Any]]
+
 
 async def sns_sqs_message_retry_middleware(func: Callable, *args: Any, **kwargs: Any) -> Any:
     try:
@@ -38,6 +40,26 @@ async def http_correlation_id_middleware(
     return response
 
 
+def create_claim_check_middleware(resolve: ClaimCheckResolver) -> Callable[..., Awaitable[Any]]:
+    """Resolve a claim check reference in JSON message data to the payload before the message is handled.
+
+    `resolve` returns the payload that the reference points to, or the data as is when it's not a reference,
+    e.g. `transactional_messaging.resolve_claim_check` with the payload store.
+    """
+
+    async def claim_check_middleware(func: Callable, *args: Any, **kwargs: Any) -> Any:
+        message = kwargs.get("message")
+        if not isinstance(message, dict) or "data" not in message:
+            return await func(*args, **kwargs)
+        data = await resolve(message["data"])
+        if data is message["data"]:
+            return await func(*args, **kwargs)
+        message["data"] = data  # Following middlewares read the payload from the message
+        return await func(*args, **{**kwargs, "data": data})
+
+    return claim_check_middleware
+
+
 async def message_correlation_id_middleware(func: Callable, *args: Any, **kwargs: Any) -> Any:
     message = kwargs.get("message")
 
@@ -0,0 +1,45 @@
+from typing import Any
+
+import pytest
+
+from tomodachi_bootstrap.middleware import create_claim_check_middleware
+
+PAYLOAD = {"correlation_id": "430d1506-5e9c-467d-a303-751d2ddee79d", "order_id": "c79e7d16"}
+REFERENCE = {"claim_check": {"uri": "s3://payloads/c79e7d16.json"}}
+
+
+async def _resolve(data: Any) -> Any:
+    return PAYLOAD if data == REFERENCE else data
+
+
+@pytest.mark.asyncio()
+async def test_claim_check_reference_resolved_to_payload() -> None:
+    message = {"data": REFERENCE}
+    middleware = create_claim_check_middleware(_resolve)
+
+    async def _message_handler(message: dict, data: dict) -> None:
+        assert message == {"data": PAYLOAD}
+        assert data == PAYLOAD
+
+    await middleware(_message_handler, message=message)
+
+
+@pytest.mark.asyncio()
+async def test_message_without_claim_check_reference_handled_as_is() -> None:
+    message = {"data": {"order_id": "c79e7d16"}}
+    middleware = create_claim_check_middleware(_resolve)
+
+    async def _message_handler(message: dict) -> None:
+        assert message == {"data": {"order_id": "c79e7d16"}}
+
+    await middleware(_message_handler, message=message)
+
+
+@pytest.mark.asyncio()
+async def test_non_json_message_handled_as_is() -> None:
+    middleware = create_claim_check_middleware(_resolve)
+
+    async def _message_handler(message: str) -> None:
+        assert message == "message"
+
+    await middleware(_message_handler, message="message")
@@ -0,0 +1,172 @@
+"""Write capacity units of publishing a message to the Outbox table and marking it as dispatched, by GSI projection.
+
+Items are written with `DynamoDBOutboxRepository` to Moto, then the table item and every index entry
+are read back, so the WCU are calculated from the item sizes that each projection actually stores.
+A write costs 1 WCU per started 1 KB of the table item, plus the same for every GSI entry that is
+written - a new entry, an entry with changed projected attributes, or a deleted entry.
+
+Usage:
+    poetry run python benchmarks/outbox_index_projections_wcu.py [--endpoint-url http://localhost:5000]
+
+Without the endpoint URL, Moto is started in a Docker container.
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import json
+import math
+import uuid
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Iterator
+
+from aiobotocore.session import get_session
+from tomodachi_testcontainers.containers import MotoContainer
+from types_aiobotocore_dynamodb import DynamoDBClient
+from unit_of_work.dynamodb import DynamoDBSession
+
+from transactional_messaging.dynamodb import DynamoDBOutboxRepository, IndexProjection, create_outbox_table
+from transactional_messaging.dynamodb.outbox import (
+    ALL_PROJECTION,
+    KEYS_ONLY_PROJECTION,
+    NOT_DISPATCHED_MESSAGES_INDEX_MINIMAL_PROJECTION,
+)
+from transactional_messaging.utils.time import utcnow
+
+PAYLOAD_SIZES = [256, 2048, 8192]
+INDEX_NAMES = ["CorrelationIdIndex", "AggregateIdIndex", "NotDispatchedMessagesIndex"]
+PROJECTIONS: dict[str, tuple[IndexProjection, IndexProjection, IndexProjection]] = {
+    "ALL (default)": (ALL_PROJECTION, ALL_PROJECTION, ALL_PROJECTION),
+    "KEYS_ONLY + minimal INCLUDE": (
+        KEYS_ONLY_PROJECTION,
+        KEYS_ONLY_PROJECTION,
+        NOT_DISPATCHED_MESSAGES_INDEX_MINIMAL_PROJECTION,
+    ),
+    "INCLUDE Topic + minimal INCLUDE": (
+        IndexProjection(projection_type="INCLUDE", non_key_attributes=("Topic", "CreatedAt")),
+        IndexProjection(projection_type="INCLUDE", non_key_attributes=("Topic", "CreatedAt")),
+        NOT_DISPATCHED_MESSAGES_INDEX_MINIMAL_PROJECTION,
+    ),
+}
+
+
+@dataclass
+class BenchmarkMessage:
+    payload_size: int
+    message_id: uuid.UUID = field(default_factory=uuid.uuid4)
+    aggregate_id: uuid.UUID = field(default_factory=uuid.uuid4)
+    correlation_id: uuid.UUID = field(default_factory=uuid.uuid4)
+    created_at: datetime.datetime = field(default_factory=utcnow)
+
+    def serialize(self) -> str:
+        return json.dumps({"message_id": str(self.message_id), "payload": "x" * self.payload_size})
+
+
+def attribute_value_size(value: dict[str, Any]) -> int:
+    [(value_type, value_data)] = value.items()
+    if value_type == "S":
+        return len(value_data.encode())
+    if value_type == "N":
+        return math.ceil(len(str(Decimal(value_data).normalize()).lstrip("-").replace(".", "")) / 2) + 1
+    if value_type == "B":
+        return len(value_data)
+    if value_type in ("BOOL", "NULL"):
+        return 1
+    raise ValueError(f"Unsupported attribute value type: {value_type}")
+
+
+def item_size(item: dict[str, Any]) -> int:
+    return sum(len(name.encode()) + attribute_value_size(value) for name, value in item.items())
+
+
+def write_units(size: int) -> int:
+    return math.ceil(size / 1024)
+
+
+@dataclass
+class ItemSnapshot:
+    table_item: dict[str, Any]
+    index_entries: dict[str, dict[str, Any] | None]
+
+
+async def take_snapshot(client: DynamoDBClient, table_name: str, message_id: uuid.UUID) -> ItemSnapshot:
+    key = {"PK": {"S": f"MESSAGE#{message_id}"}}
+    table_item = (await client.get_item(TableName=table_name, Key=key))["Item"]
+    index_entries: dict[str, dict[str, Any] | None] = {}
+    for index_name in INDEX_NAMES:
+        response = await client.scan(TableName=table_name, IndexName=index_name)
+        index_entries[index_name] = next((item for item in response["Items"] if item["PK"] == key["PK"]), None)
+    return ItemSnapshot(table_item, index_entries)
+
+
+def put_wcu(new: ItemSnapshot) -> int:
+    table_wcu = write_units(item_size(new.table_item))
+    return table_wcu + sum(write_units(item_size(entry)) for entry in new.index_entries.values() if entry)
+
+
+def update_wcu(old: ItemSnapshot, new: ItemSnapshot) -> int:
+    table_wcu = write_units(max(item_size(old.table_item), item_size(new.table_item)))
+    index_wcu = 0
+    for index_name in INDEX_NAMES:
+        old_entry, new_entry = old.index_entries[index_name], new.index_entries[index_name]
+        if old_entry == new_entry:
+            continue  # Projected attributes didn't change, so the index isn't written
+        index_wcu += write_units(max(item_size(old_entry or {}), item_size(new_entry or {})))
+    return table_wcu + index_wcu
+
+
+async def benchmark_projection(
+    client: DynamoDBClient, session: DynamoDBSession, name: str, projections: tuple[IndexProjection, ...]
+) -> list[tuple[str, int, int, int]]:
+    table_name = f"outbox-benchmark-{uuid.uuid4()}"
+    await create_outbox_table(
+        table_name,
+        client,
+        correlation_id_index_projection=projections[0],
+        aggregate_id_index_projection=projections[1],
+        not_dispatched_messages_index_projection=projections[2],
+    )
+    repository = DynamoDBOutboxRepository(table_name, session, topic_map={BenchmarkMessage: "benchmark"})
+    results = []
+    for payload_size in PAYLOAD_SIZES:
+        message = BenchmarkMessage(payload_size=payload_size)
+        await repository.publish([message])
+        await session.commit()
+        published = await take_snapshot(client, table_name, message.message_id)
+        await repository.mark_as_dispatched(message.message_id)
+        dispatched = await take_snapshot(client, table_name, message.message_id)
+        results.append((name, payload_size, put_wcu(published), update_wcu(published, dispatched)))
+    await client.delete_table(TableName=table_name)
+    return results
+
+
+@contextlib.contextmanager
+def moto_endpoint_url(endpoint_url: str | None) -> Iterator[dict[str, str]]:
+    if endpoint_url:
+        yield {"endpoint_url": endpoint_url, "region_name": "us-east-1"}
+        return
+    with MotoContainer() as moto:
+        yield dict(moto.get_aws_client_config())
+
+
+async def main(endpoint_url: str | None) -> None:
+    with moto_endpoint_url(endpoint_url) as client_config:
+        client_config.setdefault("aws_access_key_id", "testing")
+        client_config.setdefault("aws_secret_access_key", "testing")
+        session = DynamoDBSession(lambda: get_session().create_client("dynamodb", **client_config))  # type: ignore
+        async with get_session().create_client("dynamodb", **client_config) as client:  # type: ignore
+            results = [
+                result
+                for name, projections in PROJECTIONS.items()
+                for result in await benchmark_projection(client, session, name, projections)
+            ]
+    print(f"{'GSI projections':<34}{'payload bytes':>14}{'publish WCU':>13}{'dispatch WCU':>14}{'total WCU':>11}")
+    for name, payload_size, publish_wcu, dispatch_wcu in results:
+        print(f"{name:<34}{payload_size:>14}{publish_wcu:>13}{dispatch_wcu:>14}{publish_wcu + dispatch_wcu:>11}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--endpoint-url", default=None)
+    asyncio.run(main(parser.parse_args().endpoint_url))
@@ -1,8 +1,13 @@
-from transactional_messaging.idempotent_consumer import InboxRepository, ensure_idempotence
+from transactional_messaging.claim_check import ClaimCheck, PayloadStore, resolve_claim_check
+from transactional_messaging.idempotent_consumer import InboxRepository, ProcessedMessagesCache, ensure_idempotence
 from transactional_messaging.outbox import OutboxRepository
 
 __all__ = [
+    "ClaimCheck",
     "InboxRepository",
     "OutboxRepository",
+    "PayloadStore",
+    "ProcessedMessagesCache",
     "ensure_idempotence",
+    "resolve_claim_check",
 ]
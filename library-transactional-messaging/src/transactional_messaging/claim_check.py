@@ -0,0 +1,54 @@
+import json
+from dataclasses import dataclass
+from typing import Any, Protocol
+
+from transactional_messaging.outbox import Message
+
+CLAIM_CHECK_KEY = "claim_check"
+# SNS and SQS messages are limited to 256 KB, so the payload is offloaded before it leaves no room for the envelope
+CLAIM_CHECK_THRESHOLD_BYTES = 200 * 1024
+
+
+class PayloadStore(Protocol):
+    async def put(self, key: str, payload: bytes) -> str:
+        """Store the payload under the key; returns the URI of the stored payload."""
+
+    async def get(self, uri: str) -> bytes:
+        ...
+
+
+@dataclass(frozen=True)
+class ClaimCheck:
+    """Claim check of message payloads that are too large for the Outbox table item or the message broker.
+
+    A payload larger than `threshold_bytes` is stored in the `store` under the message ID,
+    and the message carries a reference to it, with the message's correlation ID, instead of the payload.
+    """
+
+    store: PayloadStore
+    threshold_bytes: int = CLAIM_CHECK_THRESHOLD_BYTES
+    key_prefix: str = ""
+
+    async def check_in(self, message: Message, payload: str) -> str | None:
+        """Store the payload if it's larger than the threshold; returns the serialized reference to the payload."""
+        body = payload.encode()
+        if len(body) <= self.threshold_bytes:
+            return None
+        uri = await self.store.put(f"{self.key_prefix}{message.message_id}.json", body)
+        return json.dumps(
+            {
+                CLAIM_CHECK_KEY: {"uri": uri, "size": len(body)},
+                "correlation_id": str(message.correlation_id),
+            }
+        )
+
+
+def is_claim_check_reference(data: Any) -> bool:
+    return isinstance(data, dict) and isinstance(data.get(CLAIM_CHECK_KEY), dict) and "uri" in data[CLAIM_CHECK_KEY]
+
+
+async def resolve_claim_check(data: Any, store: PayloadStore) -> Any:
+    """Load the payload that the claim check reference points to; other data is returned as is."""
+    if not is_claim_check_reference(data):
+        return data
+    return json.loads(await store.get(data[CLAIM_CHECK_KEY]["uri"]))
@@ -1,9 +1,12 @@
+from transactional_messaging.dynamodb.compression import MessageCompression
 from transactional_messaging.dynamodb.inbox import DynamoDBInboxRepository, create_inbox_table
-from transactional_messaging.dynamodb.outbox import DynamoDBOutboxRepository, create_outbox_table
+from transactional_messaging.dynamodb.outbox import DynamoDBOutboxRepository, IndexProjection, create_outbox_table
 
 __all__ = [
     "DynamoDBInboxRepository",
     "DynamoDBOutboxRepository",
+    "IndexProjection",
+    "MessageCompression",
     "create_inbox_table",
     "create_outbox_table",
 ]
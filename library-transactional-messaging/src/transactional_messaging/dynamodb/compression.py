@@ -0,0 +1,58 @@
+import zlib
+from dataclasses import dataclass
+from typing import Any, Literal
+
+MESSAGE_CODEC_ATTRIBUTE_NAME = "MessageCodec"
+MESSAGE_COMPRESSION_THRESHOLD_BYTES = 1024
+
+MessageCodec = Literal["zlib", "zstd"]
+
+
+class UnknownMessageCodecError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class MessageCompression:
+    """Compression of the serialized message payload stored in the Outbox table.
+
+    A message larger than `threshold_bytes` is compressed with `codec` and stored as a binary attribute,
+    with the codec in the `MessageCodec` attribute, so that it's decompressed when the message is read.
+    Smaller messages, and messages that don't get smaller when compressed, are stored as strings.
+    The `zstd` codec requires the `zstandard` package.
+    """
+
+    codec: MessageCodec = "zlib"
+    threshold_bytes: int = MESSAGE_COMPRESSION_THRESHOLD_BYTES
+    level: int | None = None
+
+    def compress(self, message: str) -> bytes | None:
+        payload = message.encode()
+        if len(payload) <= self.threshold_bytes:
+            return None
+        compressed = compress_message(payload, self.codec, self.level)
+        return compressed if len(compressed) < len(payload) else None
+
+
+def compress_message(payload: bytes, codec: str, level: int | None = None) -> bytes:
+    if codec == "zlib":
+        return zlib.compress(payload, level if level is not None else zlib.Z_DEFAULT_COMPRESSION)
+    if codec == "zstd":
+        return _get_zstandard().ZstdCompressor(level=level if level is not None else 3).compress(payload)
+    raise UnknownMessageCodecError(codec)
+
+
+def decompress_message(payload: bytes, codec: str) -> str:
+    if codec == "zlib":
+        return zlib.decompress(payload).decode()
+    if codec == "zstd":
+        return _get_zstandard().ZstdDecompressor().decompress(payload).decode()
+    raise UnknownMessageCodecError(codec)
+
+
+def _get_zstandard() -> Any:
+    try:
+        import zstandard  # pylint: disable=import-outside-toplevel
+    except ImportError as e:
+        raise ImportError("zstd message codec requires the 'zstandard' package") from e
+    return zstandard
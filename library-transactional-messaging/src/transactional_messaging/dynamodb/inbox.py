@@ -1,38 +1,77 @@
+import datetime
+import functools
 import uuid
 
 import structlog
 from types_aiobotocore_dynamodb import DynamoDBClient
+from types_aiobotocore_dynamodb.type_defs import AttributeValueTypeDef
 from unit_of_work.dynamodb import DynamoDBSession
 
-from transactional_messaging.idempotent_consumer import InboxRepository, MessageAlreadyProcessedError, ProcessedMessage
+from transactional_messaging.dynamodb.ttl import enable_time_to_live
+from transactional_messaging.idempotent_consumer import (
+    InboxRepository,
+    MessageAlreadyProcessedError,
+    ProcessedMessage,
+    ProcessedMessagesCache,
+)
 from transactional_messaging.utils.time import datetime_to_str, str_to_datetime, utcnow
 
 logger: structlog.stdlib.BoundLogger = structlog.get_logger()
 
+INBOX_TTL_ATTRIBUTE_NAME = "ExpiresAt"
+
 
 class DynamoDBInboxRepository(InboxRepository):
-    def __init__(self, table_name: str, session: DynamoDBSession) -> None:
+    """Inbox of processed message IDs.
+
+    With `retention`, a processed message expires with DynamoDB TTL after the retention window;
+    it should be longer than a message can be redelivered, e.g. the source SQS queue's message retention period.
+    With `compact_items`, the message ID is stored only in the key, without the `MessageId` attribute.
+    """
+
+    def __init__(
+        self,
+        table_name: str,
+        session: DynamoDBSession,
+        cache: ProcessedMessagesCache | None = None,
+        retention: datetime.timedelta | None = None,
+        compact_items: bool = False,
+    ) -> None:
         self._table_name = table_name
         self._session = session
+        self._cache = cache
+        self._retention = retention
+        self._compact_items = compact_items
 
     async def save(self, message_id: uuid.UUID) -> None:
+        if self._cache is not None and message_id in self._cache:
+            logger.info("dynamodb_inbox_repository__message_already_processed_cached", message_id=message_id)
+            raise MessageAlreadyProcessedError(message_id)
+        message = ProcessedMessage(message_id=message_id, created_at=utcnow())
+        item: dict[str, AttributeValueTypeDef] = {
+            "PK": {"S": f"MESSAGE#{message_id}"},
+            "CreatedAt": {"S": datetime_to_str(message.created_at)},
+        }
+        if not self._compact_items:
+            item["MessageId"] = {"S": str(message_id)}
+        if self._retention is not None:
+            item[INBOX_TTL_ATTRIBUTE_NAME] = {"N": str(int((message.created_at + self._retention).timestamp()))}
         self._session.add(
             {
                 "Put": {
                     "TableName": self._table_name,
-                    "Item": {
-                        "PK": {"S": f"MESSAGE#{message_id}"},
-                        "MessageId": {"S": str(message_id)},
-                        "CreatedAt": {"S": datetime_to_str(utcnow())},
-                    },
+                    "Item": item,
                     "ConditionExpression": "attribute_not_exists(PK)",
                 }
             },
             raise_on_condition_check_failure=MessageAlreadyProcessedError(message_id),
+            on_commit=functools.partial(self._cache.add, message) if self._cache is not None else None,
         )
         logger.info("dynamodb_inbox_repository__processed_message_saved", message_id=message_id)
 
     async def get(self, message_id: uuid.UUID) -> ProcessedMessage | None:
+        if self._cache is not None and (message := self._cache.get(message_id)):
+            return message
         async with self._session.get_client() as client:
             response = await client.get_item(
                 TableName=self._table_name,
@@ -42,13 +81,18 @@ class DynamoDBInboxRepository(InboxRepository):
             item = response.get("Item")
             if not item:
                 return None
-            return ProcessedMessage(
-                message_id=uuid.UUID(item["MessageId"]["S"]),
+            message = ProcessedMessage(
+                message_id=uuid.UUID(item["PK"]["S"].removeprefix("MESSAGE#")),
                 created_at=str_to_datetime(item["CreatedAt"]["S"]),
             )
+            if self._cache is not None:
+                self._cache.add(message)  # Consistently read message is committed
+            return message
 
 
-async def create_inbox_table(table_name: str, client: DynamoDBClient) -> None:
+async def create_inbox_table(
+    table_name: str, client: DynamoDBClient, ttl_attribute_name: str | None = INBOX_TTL_ATTRIBUTE_NAME
+) -> None:
     try:
         await client.create_table(
             TableName=table_name,
@@ -70,3 +114,5 @@ async def create_inbox_table(table_name: str, client: DynamoDBClient) -> None:
         logger.info("dynamodb_inbox_table_already_exists", table_name=table_name)
     else:
         logger.info("dynamodb_inbox_table_created", table_name=table_name)
+    if ttl_attribute_name and await enable_time_to_live(table_name, client, ttl_attribute_name):
+        logger.info("dynamodb_inbox_table_ttl_enabled", table_name=table_name, attribute_name=ttl_attribute_name)
@@ -1,14 +1,30 @@
+import asyncio
+import base64
+import datetime
+import json
 import uuid
-from typing import Any
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Literal
 
 import structlog
 from types_aiobotocore_dynamodb import DynamoDBClient
+from types_aiobotocore_dynamodb.type_defs import AttributeValueTypeDef, ProjectionTypeDef, UpdateTypeDef
 from unit_of_work.dynamodb import DynamoDBSession
 
+from transactional_messaging.claim_check import ClaimCheck
+from transactional_messaging.dynamodb.compression import (
+    MESSAGE_CODEC_ATTRIBUTE_NAME,
+    MessageCompression,
+    decompress_message,
+)
+from transactional_messaging.dynamodb.ttl import enable_time_to_live
 from transactional_messaging.outbox import (
+    NOT_DISPATCHED_MESSAGES_PAGE_SIZE,
+    MarkAsDispatchedResult,
     Message,
     MessageAlreadyPublishedError,
     MessageNotFoundError,
+    NotDispatchedMessagesPage,
     OutboxRepository,
     PublishedMessage,
     UnknownTopicError,
@@ -17,16 +33,89 @@ from transactional_messaging.utils.time import datetime_to_str, str_to_datetime,
 
 logger: structlog.stdlib.BoundLogger = structlog.get_logger()
 
+MARK_AS_DISPATCHED_MAX_CONCURRENCY = 25
+SCAN_PAGE_SIZE = 1000
+BATCH_GET_ITEM_MAX_KEYS = 100
+OUTBOX_TTL_ATTRIBUTE_NAME = "ExpiresAt"
+
+# Attributes that are required to read a PublishedMessage from an item
+PUBLISHED_MESSAGE_ATTRIBUTES = frozenset(
+    {
+        "MessageId",
+        "AggregateId",
+        "CorrelationId",
+        "Topic",
+        "Message",
+        "CreatedAt",
+        "ApproximateDispatchCount",
+        "IsDispatched",
+    }
+)
+
+
+@dataclass(frozen=True)
+class IndexProjection:
+    """Projection of an Outbox table GSI - `ALL`, `KEYS_ONLY` or `INCLUDE` with the listed non-key attributes.
+
+    Every attribute projected to a GSI is written to the GSI on every change of the item;
+    an item read from an index without all the attributes is fetched from the table when needed.
+    """
+
+    projection_type: Literal["ALL", "KEYS_ONLY", "INCLUDE"] = "ALL"
+    non_key_attributes: tuple[str, ...] = ()
+
+    def to_projection(self) -> ProjectionTypeDef:
+        if self.projection_type == "INCLUDE":
+            return {"ProjectionType": "INCLUDE", "NonKeyAttributes": list(self.non_key_attributes)}
+        return {"ProjectionType": self.projection_type}
+
+
+ALL_PROJECTION = IndexProjection()
+KEYS_ONLY_PROJECTION = IndexProjection(projection_type="KEYS_ONLY")
+NOT_DISPATCHED_MESSAGES_INDEX_MINIMAL_PROJECTION = IndexProjection(
+    projection_type="INCLUDE", non_key_attributes=("MessageId",)
+)
+
+
+@dataclass
+class NotDispatchedMessageIdsPage:
+    message_ids: list[uuid.UUID]
+    cursor: str | None = None  # Resumes the scan segment from the next page; None on the last page
+
 
 class DynamoDBOutboxRepository(OutboxRepository):
-    def __init__(self, table_name: str, session: DynamoDBSession, topic_map: dict[type[Any], str]) -> None:
+    """Outbox of published messages.
+
+    With `dispatched_retention`, a message expires with DynamoDB TTL after the retention window
+    since it was last marked as dispatched; not dispatched messages never expire.
+    With `compression`, large message payloads are stored compressed and decompressed when read.
+    With `claim_check`, payloads over its threshold are stored in its payload store when published,
+    and the message carries a reference to the payload, which is resolved by the message consumers.
+    """
+
+    def __init__(
+        self,
+        table_name: str,
+        session: DynamoDBSession,
+        topic_map: dict[type[Any], str],
+        dispatched_retention: datetime.timedelta | None = None,
+        compression: MessageCompression | None = None,
+        claim_check: ClaimCheck | None = None,
+    ) -> None:
         self._table_name = table_name
         self._session = session
         self._topics_map = topic_map
+        self._dispatched_retention = dispatched_retention
+        self._compression = compression
+        self._claim_check = claim_check
 
     async def publish(self, messages: list[Message]) -> None:
         for message in messages:
             topic = self._get_topic(message)
+            payload = message.serialize()
+            if self._claim_check and (reference := await self._claim_check.check_in(message, payload)):
+                logger.info("dynamodb_outbox_repository__message_payload_checked_in", message_id=message.message_id)
+                payload = reference
             self._session.add(
                 {
                     "Put": {
@@ -37,7 +126,7 @@ class DynamoDBOutboxRepository(OutboxRepository):
                             "AggregateId": {"S": str(message.aggregate_id)},
                             "CorrelationId": {"S": str(message.correlation_id)},
                             "Topic": {"S": topic},
-                            "Message": {"S": message.serialize()},
+                            **self._message_attributes(payload),
                             "CreatedAt": {"S": datetime_to_str(message.created_at)},
                             "ApproximateDispatchCount": {"N": "0"},
                             "IsDispatched": {"BOOL": False},
@@ -67,44 +156,172 @@ class DynamoDBOutboxRepository(OutboxRepository):
                 return None
             return self._item_to_published_message(item)
 
+    async def get_many(self, message_ids: list[uuid.UUID]) -> list[PublishedMessage]:
+        """Get messages with BatchGetItem calls of up to 100 keys; not found messages are skipped.
+
+        Returns messages in the order of `message_ids`.
+        """
+        unique_message_ids = list(dict.fromkeys(message_ids))
+        items: dict[str, dict[str, Any]] = {}
+        async with self._session.get_client() as client:
+            for i in range(0, len(unique_message_ids), BATCH_GET_ITEM_MAX_KEYS):
+                keys: list[dict[str, Any]] = [
+                    {"PK": {"S": f"MESSAGE#{message_id}"}}
+                    for message_id in unique_message_ids[i : i + BATCH_GET_ITEM_MAX_KEYS]
+                ]
+                attempt = 0
+                while keys:
+                    if attempt:
+                        await asyncio.sleep(min(0.05 * 2**attempt, 1.0))  # Backoff on throttled keys
+                    response = await client.batch_get_item(RequestItems={self._table_name: {"Keys": keys}})
+                    for item in response.get("Responses", {}).get(self._table_name, []):
+                        items[item["PK"]["S"]] = item
+                    keys = list(response.get("UnprocessedKeys", {}).get(self._table_name, {}).get("Keys", []))
+                    attempt += 1
+        return [
+            self._item_to_published_message(item)
+            for message_id in unique_message_ids
+            if (item := items.get(f"MESSAGE#{message_id}"))
+        ]
+
     async def mark_as_dispatched(self, message_id: uuid.UUID) -> None:
         log = logger.bind(message_id=message_id)
         async with self._session.get_client() as client:
             try:
-                await client.update_item(
-                    TableName=self._table_name,
-                    Key={"PK": {"S": f"MESSAGE#{message_id}"}},
-                    UpdateExpression=(
-                        "REMOVE NotDispatched "
-                        "SET ApproximateDispatchCount = ApproximateDispatchCount + :Increment, "
-                        "IsDispatched = :IsDispatched, "
-                        "LastDispatchedAt = :LastDispatchedAt"
-                    ),
-                    ExpressionAttributeValues={
-                        ":Increment": {"N": "1"},
-                        ":IsDispatched": {"BOOL": True},
-                        ":LastDispatchedAt": {"S": datetime_to_str(utcnow())},
-                    },
-                    ConditionExpression="attribute_exists(PK)",
-                )
+                await client.update_item(**self._mark_as_dispatched_update(message_id))
             except client.exceptions.ConditionalCheckFailedException as e:
                 log.error("dynamodb_outbox_repository__message_not_found")
                 raise MessageNotFoundError(message_id) from e
             log.info("dynamodb_outbox_repository__message_marked_as_dispatched")
 
-    async def get_not_dispatched_messages(self) -> list[PublishedMessage]:
+    async def mark_as_dispatched_many(
+        self, message_ids: list[uuid.UUID], max_concurrency: int = MARK_AS_DISPATCHED_MAX_CONCURRENCY
+    ) -> list[MarkAsDispatchedResult]:
+        """Mark messages as dispatched with up to `max_concurrency` concurrent conditional UpdateItem calls.
+
+        Messages don't need to be marked atomically, so a message that fails doesn't fail the others,
+        and every message costs the write capacity of a single update.
+        Returns a result per message in the order of `message_ids`.
+        """
+        unique_message_ids = list(dict.fromkeys(message_ids))
+        semaphore = asyncio.Semaphore(max_concurrency)
         async with self._session.get_client() as client:
-            response = await client.query(
-                TableName=self._table_name,
-                IndexName="NotDispatchedMessagesIndex",
-                KeyConditionExpression="NotDispatched = :NotDispatched",
-                ExpressionAttributeValues={":NotDispatched": {"S": "x"}},
-                ScanIndexForward=True,  # Older message first
+            errors = await asyncio.gather(
+                *[
+                    self._mark_as_dispatched_with_result(client, message_id, semaphore)
+                    for message_id in unique_message_ids
+                ]
             )
-            items = response.get("Items")
-            if not items:
-                return []
-            return [self._item_to_published_message(item) for item in items]
+        errors_by_message_id = dict(zip(unique_message_ids, errors))
+        return [
+            MarkAsDispatchedResult(message_id=message_id, error=errors_by_message_id[message_id])
+            for message_id in message_ids
+        ]
+
+    async def _mark_as_dispatched_with_result(
+        self, client: DynamoDBClient, message_id: uuid.UUID, semaphore: asyncio.Semaphore
+    ) -> Exception | None:
+        log = logger.bind(message_id=message_id)
+        try:
+            async with semaphore:
+                await client.update_item(**self._mark_as_dispatched_update(message_id))
+        except client.exceptions.ConditionalCheckFailedException:
+            log.error("dynamodb_outbox_repository__message_not_found")
+            return MessageNotFoundError(message_id)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            log.exception("dynamodb_outbox_repository__mark_as_dispatched_failed")
+            return e
+        log.info("dynamodb_outbox_repository__message_marked_as_dispatched")
+        return None
+
+    async def get_not_dispatched_messages(self) -> list[PublishedMessage]:
+        return [message async for page in self.get_not_dispatched_messages_pages() for message in page.messages]
+
+    def get_not_dispatched_messages_pages(
+        self,
+        page_size: int = NOT_DISPATCHED_MESSAGES_PAGE_SIZE,
+        cursor: str | None = None,
+        created_after: datetime.datetime | None = None,
+        created_before: datetime.datetime | None = None,
+    ) -> AsyncGenerator[NotDispatchedMessagesPage, None]:
+        """Stream not dispatched messages page by page, older messages first.
+
+        Every page has a cursor that resumes the iteration from the next page.
+        The `created_after` and `created_before` bounds of the `CreatedAt` window are inclusive.
+        """
+        query: dict[str, Any] = {
+            "TableName": self._table_name,
+            "IndexName": "NotDispatchedMessagesIndex",
+            "KeyConditionExpression": "NotDispatched = :NotDispatched",
+            "ExpressionAttributeValues": {":NotDispatched": {"S": "x"}},
+            "ScanIndexForward": True,  # Older message first
+            "Limit": page_size,
+        }
+        if created_after and created_before:
+            query["KeyConditionExpression"] += " AND CreatedAt BETWEEN :CreatedAfter AND :CreatedBefore"
+        elif created_after:
+            query["KeyConditionExpression"] += " AND CreatedAt >= :CreatedAfter"
+        elif created_before:
+            query["KeyConditionExpression"] += " AND CreatedAt <= :CreatedBefore"
+        if created_after:
+            query["ExpressionAttributeValues"][":CreatedAfter"] = {"S": datetime_to_str(created_after)}
+        if created_before:
+            query["ExpressionAttributeValues"][":CreatedBefore"] = {"S": datetime_to_str(created_before)}
+        return self._query_not_dispatched_messages_pages(query, cursor)
+
+    async def _query_not_dispatched_messages_pages(
+        self, query: dict[str, Any], cursor: str | None
+    ) -> AsyncGenerator[NotDispatchedMessagesPage, None]:
+        exclusive_start_key = _decode_cursor(cursor) if cursor else None
+        while True:
+            async with self._session.get_client() as client:
+                if exclusive_start_key:
+                    response = await client.query(**query, ExclusiveStartKey=exclusive_start_key)
+                else:
+                    response = await client.query(**query)
+            exclusive_start_key = response.get("LastEvaluatedKey")
+            messages = await self._index_items_to_not_dispatched_messages(response.get("Items", []))
+            next_cursor = _encode_cursor(exclusive_start_key) if exclusive_start_key else None
+            if messages or next_cursor is None:
+                yield NotDispatchedMessagesPage(messages=messages, cursor=next_cursor)
+            if next_cursor is None:
+                return
+
+    async def scan_not_dispatched_message_ids(
+        self,
+        segment: int,
+        total_segments: int,
+        page_size: int = SCAN_PAGE_SIZE,
+        cursor: str | None = None,
+    ) -> AsyncGenerator[NotDispatchedMessageIdsPage, None]:
+        """Scan a segment of the whole table for messages with `IsDispatched = false`, page by page.
+
+        Unlike `get_not_dispatched_messages_pages`, it doesn't rely on the sparse `NotDispatchedMessagesIndex`,
+        so it finds messages that are missing from the index. Only the message IDs are projected.
+        Every page is yielded, even if no message on it matched, so the cursor can be checkpointed.
+        """
+        scan: dict[str, Any] = {
+            "TableName": self._table_name,
+            "Segment": segment,
+            "TotalSegments": total_segments,
+            "ProjectionExpression": "MessageId",
+            "FilterExpression": "IsDispatched = :IsDispatched",
+            "ExpressionAttributeValues": {":IsDispatched": {"BOOL": False}},
+            "Limit": page_size,
+        }
+        exclusive_start_key = _decode_cursor(cursor) if cursor else None
+        while True:
+            async with self._session.get_client() as client:
+                if exclusive_start_key:
+                    response = await client.scan(**scan, ExclusiveStartKey=exclusive_start_key)
+                else:
+                    response = await client.scan(**scan)
+            exclusive_start_key = response.get("LastEvaluatedKey")
+            message_ids = [uuid.UUID(item["MessageId"]["S"]) for item in response.get("Items", [])]
+            next_cursor = _encode_cursor(exclusive_start_key) if exclusive_start_key else None
+            yield NotDispatchedMessageIdsPage(message_ids=message_ids, cursor=next_cursor)
+            if next_cursor is None:
+                return
 
     def _get_topic(self, message: Message) -> str:
         try:
@@ -114,13 +331,52 @@ class DynamoDBOutboxRepository(OutboxRepository):
             logger.error("dynamodb_outbox_repository__unknown_topic", message_name=message_name)
             raise UnknownTopicError(message_name) from e
 
+    def _message_attributes(self, message: str) -> dict[str, AttributeValueTypeDef]:
+        if self._compression and (compressed := self._compression.compress(message)) is not None:
+            return {"Message": {"B": compressed}, MESSAGE_CODEC_ATTRIBUTE_NAME: {"S": self._compression.codec}}
+        return {"Message": {"S": message}}
+
+    def _mark_as_dispatched_update(self, message_id: uuid.UUID) -> UpdateTypeDef:
+        dispatched_at = utcnow()
+        update_expression = (
+            "REMOVE NotDispatched "
+            "SET ApproximateDispatchCount = ApproximateDispatchCount + :Increment, "
+            "IsDispatched = :IsDispatched, "
+            "LastDispatchedAt = :LastDispatchedAt"
+        )
+        expression_attribute_values: dict[str, AttributeValueTypeDef] = {
+            ":Increment": {"N": "1"},
+            ":IsDispatched": {"BOOL": True},
+            ":LastDispatchedAt": {"S": datetime_to_str(dispatched_at)},
+        }
+        if self._dispatched_retention is not None:
+            update_expression += f", {OUTBOX_TTL_ATTRIBUTE_NAME} = :ExpiresAt"
+            expires_at = int((dispatched_at + self._dispatched_retention).timestamp())
+            expression_attribute_values[":ExpiresAt"] = {"N": str(expires_at)}
+        return {
+            "TableName": self._table_name,
+            "Key": {"PK": {"S": f"MESSAGE#{message_id}"}},
+            "UpdateExpression": update_expression,
+            "ExpressionAttributeValues": expression_attribute_values,
+            "ConditionExpression": "attribute_exists(PK)",
+        }
+
+    async def _index_items_to_not_dispatched_messages(self, items: list[dict[str, Any]]) -> list[PublishedMessage]:
+        if all(_has_published_message_attributes(item) for item in items):
+            return [self._item_to_published_message(item) for item in items]
+        # The index doesn't project the whole message, so the messages are fetched from the table
+        message_ids = [uuid.UUID(item["PK"]["S"].removeprefix("MESSAGE#")) for item in items]
+        messages = await self.get_many(message_ids)
+        # The index is eventually consistent, so the message could have been dispatched since the query
+        return [message for message in messages if not message.is_dispatched]
+
     def _item_to_published_message(self, item: dict[str, Any]) -> PublishedMessage:
         return PublishedMessage(
             message_id=uuid.UUID(item["MessageId"]["S"]),
             aggregate_id=uuid.UUID(item["AggregateId"]["S"]),
             correlation_id=uuid.UUID(item["CorrelationId"]["S"]),
             topic=item["Topic"]["S"],
-            message=item["Message"]["S"],
+            message=_item_to_message(item),
             created_at=str_to_datetime(item["CreatedAt"]["S"]),
             approximate_dispatch_count=int(item["ApproximateDispatchCount"]["N"]),
             is_dispatched=bool(item["IsDispatched"]["BOOL"]),
@@ -128,7 +384,36 @@ class DynamoDBOutboxRepository(OutboxRepository):
         )
 
 
-async def create_outbox_table(table_name: str, client: DynamoDBClient) -> None:
+def _has_published_message_attributes(item: dict[str, Any]) -> bool:
+    if not PUBLISHED_MESSAGE_ATTRIBUTES <= item.keys():
+        return False
+    # A compressed message can't be read without its codec
+    return "B" not in item["Message"] or MESSAGE_CODEC_ATTRIBUTE_NAME in item
+
+
+def _item_to_message(item: dict[str, Any]) -> str:
+    if codec := item.get(MESSAGE_CODEC_ATTRIBUTE_NAME):
+        return decompress_message(item["Message"]["B"], codec["S"])
+    return item["Message"]["S"]
+
+
+def _encode_cursor(last_evaluated_key: dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> dict[str, Any]:
+    return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+
+
+async def create_outbox_table(
+    table_name: str,
+    client: DynamoDBClient,
+    ttl_attribute_name: str | None = OUTBOX_TTL_ATTRIBUTE_NAME,
+    correlation_id_index_projection: IndexProjection = ALL_PROJECTION,
+    aggregate_id_index_projection: IndexProjection = ALL_PROJECTION,
+    not_dispatched_messages_index_projection: IndexProjection = ALL_PROJECTION,
+) -> None:
+    """Create the Outbox table; every GSI projects all attributes unless its projection is given."""
     try:
         await client.create_table(
             TableName=table_name,
@@ -166,14 +451,14 @@ async def create_outbox_table(table_name: str, client: DynamoDBClient) -> None:
                     "KeySchema": [
                         {"AttributeName": "CorrelationId", "KeyType": "HASH"},
                     ],
-                    "Projection": {"ProjectionType": "ALL"},
+                    "Projection": correlation_id_index_projection.to_projection(),
                 },
                 {
                     "IndexName": "AggregateIdIndex",
                     "KeySchema": [
                         {"AttributeName": "AggregateId", "KeyType": "HASH"},
                     ],
-                    "Projection": {"ProjectionType": "ALL"},
+                    "Projection": aggregate_id_index_projection.to_projection(),
                 },
                 {
                     "IndexName": "NotDispatchedMessagesIndex",
@@ -181,7 +466,7 @@ async def create_outbox_table(table_name: str, client: DynamoDBClient) -> None:
                         {"AttributeName": "NotDispatched", "KeyType": "HASH"},
                         {"AttributeName": "CreatedAt", "KeyType": "RANGE"},
                     ],
-                    "Projection": {"ProjectionType": "ALL"},
+                    "Projection": not_dispatched_messages_index_projection.to_projection(),
                 },
             ],
             StreamSpecification={
@@ -194,3 +479,5 @@ async def create_outbox_table(table_name: str, client: DynamoDBClient) -> None:
         logger.info("dynamodb_outbox_table_already_exists", table_name=table_name)
     else:
         logger.info("dynamodb_outbox_table_created", table_name=table_name)
+    if ttl_attribute_name and await enable_time_to_live(table_name, client, ttl_attribute_name):
+        logger.info("dynamodb_outbox_table_ttl_enabled", table_name=table_name, attribute_name=ttl_attribute_name)
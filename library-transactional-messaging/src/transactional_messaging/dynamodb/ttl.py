@@ -0,0 +1,19 @@
+from types_aiobotocore_dynamodb import DynamoDBClient
+
+TTL_ENABLED_STATUSES = ("ENABLED", "ENABLING")
+
+
+async def enable_time_to_live(table_name: str, client: DynamoDBClient, attribute_name: str) -> bool:
+    """Enable TTL on the table unless it's already enabled; returns whether TTL was enabled by this call.
+
+    TTL is described first, since DynamoDB rejects enabling TTL that is already enabled,
+    so that a table created earlier without TTL gets it enabled on the next start.
+    """
+    response = await client.describe_time_to_live(TableName=table_name)
+    if response["TimeToLiveDescription"].get("TimeToLiveStatus") in TTL_ENABLED_STATUSES:
+        return False
+    await client.update_time_to_live(
+        TableName=table_name,
+        TimeToLiveSpecification={"Enabled": True, "AttributeName": attribute_name},
+    )
+    return True
@@ -1,8 +1,18 @@
 import copy
+import datetime
 import uuid
+from typing import AsyncGenerator
 
 from transactional_messaging.idempotent_consumer import InboxRepository, MessageAlreadyProcessedError, ProcessedMessage
-from transactional_messaging.outbox import Message, MessageAlreadyPublishedError, OutboxRepository, PublishedMessage
+from transactional_messaging.outbox import (
+    NOT_DISPATCHED_MESSAGES_PAGE_SIZE,
+    MarkAsDispatchedResult,
+    Message,
+    MessageAlreadyPublishedError,
+    NotDispatchedMessagesPage,
+    OutboxRepository,
+    PublishedMessage,
+)
 from transactional_messaging.utils.time import utcnow
 
 
@@ -57,5 +67,17 @@ class FakeOutboxRepository(OutboxRepository):
     async def mark_as_dispatched(self, message_id: uuid.UUID) -> None:
         raise NotImplementedError
 
+    async def mark_as_dispatched_many(self, message_ids: list[uuid.UUID]) -> list[MarkAsDispatchedResult]:
+        raise NotImplementedError
+
     async def get_not_dispatched_messages(self) -> list[PublishedMessage]:
         raise NotImplementedError
+
+    def get_not_dispatched_messages_pages(
+        self,
+        page_size: int = NOT_DISPATCHED_MESSAGES_PAGE_SIZE,
+        cursor: str | None = None,
+        created_after: datetime.datetime | None = None,
+        created_before: datetime.datetime | None = None,
+    ) -> AsyncGenerator[NotDispatchedMessagesPage, None]:
+        raise NotImplementedError
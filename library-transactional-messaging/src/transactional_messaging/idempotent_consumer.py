@@ -1,12 +1,17 @@
 import datetime
+import time
 import uuid
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Protocol
+from typing import Callable, Protocol
 
 import structlog
 
 logger: structlog.stdlib.BoundLogger = structlog.get_logger()
 
+PROCESSED_MESSAGES_CACHE_MAX_SIZE = 10_000
+PROCESSED_MESSAGES_CACHE_TTL = 300.0
+
 
 class MessageAlreadyProcessedError(Exception):
     pass
@@ -26,9 +31,64 @@ class InboxRepository(Protocol):
         ...
 
 
-async def ensure_idempotence(message_id: uuid.UUID, repository: InboxRepository) -> None:
-    processed_message = await repository.get(message_id=message_id)
-    if processed_message is not None:
-        logger.info("idempotent_consumer__message_already_processed", message_id=message_id)
-        raise MessageAlreadyProcessedError(message_id)
+class ProcessedMessagesCache:
+    """Bounded in-process LRU cache of recently processed messages; entries expire after `ttl` seconds.
+
+    Only committed messages must be added, so a cache hit is always a processed message,
+    but a cache miss doesn't mean that the message wasn't processed - the inbox table must be checked.
+    """
+
+    def __init__(
+        self,
+        max_size: int = PROCESSED_MESSAGES_CACHE_MAX_SIZE,
+        ttl: float = PROCESSED_MESSAGES_CACHE_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._max_size = max_size
+        self._ttl = ttl
+        self._clock = clock
+        self._messages: OrderedDict[uuid.UUID, tuple[ProcessedMessage, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, message_id: uuid.UUID) -> bool:
+        return self._get_entry(message_id) is not None
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def get(self, message_id: uuid.UUID) -> ProcessedMessage | None:
+        entry = self._get_entry(message_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._messages.move_to_end(message_id)
+        return entry[0]
+
+    def _get_entry(self, message_id: uuid.UUID) -> tuple[ProcessedMessage, float] | None:
+        entry = self._messages.get(message_id)
+        if entry is not None and entry[1] <= self._clock():
+            del self._messages[message_id]
+            return None
+        return entry
+
+    def add(self, message: ProcessedMessage) -> None:
+        self._messages[message.message_id] = (message, self._clock() + self._ttl)
+        self._messages.move_to_end(message.message_id)
+        while len(self._messages) > self._max_size:
+            self._messages.popitem(last=False)
+
+
+async def ensure_idempotence(message_id: uuid.UUID, repository: InboxRepository, optimistic: bool = False) -> None:
+    """Save the message to the inbox, or raise `MessageAlreadyProcessedError` if it's already processed.
+
+    In the optimistic mode, the message isn't read from the inbox beforehand - a duplicate is detected
+    by the inbox repository's conditional save, at the latest when the unit of work is committed.
+    """
+    if not optimistic:
+        processed_message = await repository.get(message_id=message_id)
+        if processed_message is not None:
+            logger.info("idempotent_consumer__message_already_processed", message_id=message_id)
+            raise MessageAlreadyProcessedError(message_id)
     await repository.save(message_id=message_id)
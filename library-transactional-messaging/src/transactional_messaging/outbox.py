@@ -1,7 +1,9 @@
 import datetime
 import uuid
 from dataclasses import dataclass
-from typing import Protocol
+from typing import AsyncGenerator, Protocol
+
+NOT_DISPATCHED_MESSAGES_PAGE_SIZE = 100
 
 
 class MessageAlreadyPublishedError(Exception):
@@ -50,6 +52,22 @@ class PublishedMessage:
     last_dispatched_at: datetime.datetime | None = None
 
 
+@dataclass
+class NotDispatchedMessagesPage:
+    messages: list[PublishedMessage]
+    cursor: str | None = None  # Resumes from the next page; None on the last page
+
+
+@dataclass
+class MarkAsDispatchedResult:
+    message_id: uuid.UUID
+    error: Exception | None = None
+
+    @property
+    def is_success(self) -> bool:
+        return self.error is None
+
+
 class OutboxRepository(Protocol):
     async def publish(self, messages: list[Message]) -> None:
         ...
@@ -60,5 +78,17 @@ class OutboxRepository(Protocol):
     async def mark_as_dispatched(self, message_id: uuid.UUID) -> None:
         ...
 
+    async def mark_as_dispatched_many(self, message_ids: list[uuid.UUID]) -> list[MarkAsDispatchedResult]:
+        ...
+
     async def get_not_dispatched_messages(self) -> list[PublishedMessage]:
         ...
+
+    def get_not_dispatched_messages_pages(
+        self,
+        page_size: int = NOT_DISPATCHED_MESSAGES_PAGE_SIZE,
+        cursor: str | None = None,
+        created_after: datetime.datetime | None = None,
+        created_before: datetime.datetime | None = None,
+    ) -> AsyncGenerator[NotDispatchedMessagesPage, None]:
+        ...
@@ -0,0 +1,5 @@
+from transactional_messaging.s3.payload_store import S3PayloadStore
+
+__all__ = [
+    "S3PayloadStore",
+]
@@ -0,0 +1,40 @@
+from typing import AsyncContextManager, Callable
+
+import structlog
+from types_aiobotocore_s3 import S3Client
+
+from transactional_messaging.claim_check import PayloadStore
+
+logger: structlog.stdlib.BoundLogger = structlog.get_logger()
+
+S3ClientFactory = Callable[[], AsyncContextManager[S3Client]]
+
+
+class InvalidPayloadURIError(Exception):
+    pass
+
+
+class S3PayloadStore(PayloadStore):
+    def __init__(self, bucket: str, client_factory: S3ClientFactory) -> None:
+        self._bucket = bucket
+        self._get_client = client_factory
+
+    async def put(self, key: str, payload: bytes) -> str:
+        async with self._get_client() as client:
+            await client.put_object(Bucket=self._bucket, Key=key, Body=payload, ContentType="application/json")
+        logger.info("s3_payload_store__payload_stored", bucket=self._bucket, key=key, size=len(payload))
+        return f"s3://{self._bucket}/{key}"
+
+    async def get(self, uri: str) -> bytes:
+        bucket, key = _parse_s3_uri(uri)
+        async with self._get_client() as client:
+            response = await client.get_object(Bucket=bucket, Key=key)
+            async with response["Body"] as stream:
+                return await stream.read()
+
+
+def _parse_s3_uri(uri: str) -> tuple[str, str]:
+    bucket, _, key = uri.removeprefix("s3://").partition("/")
+    if not uri.startswith("s3://") or not bucket or not key:
+        raise InvalidPayloadURIError(uri)
+    return bucket, key
@@ -0,0 +1,103 @@
+import json
+import uuid
+
+import pytest
+import pytest_asyncio
+from aiobotocore.session import get_session
+from tomodachi_testcontainers.containers import MotoContainer
+from types_aiobotocore_s3 import S3Client
+from unit_of_work.dynamodb import DynamoDBSession
+
+from tests.events import OrderCreatedEvent
+from transactional_messaging import ClaimCheck, resolve_claim_check
+from transactional_messaging.dynamodb import DynamoDBOutboxRepository
+from transactional_messaging.s3 import S3PayloadStore
+from transactional_messaging.s3.payload_store import InvalidPayloadURIError
+
+pytestmark = pytest.mark.usefixtures("_create_outbox_table", "_reset_moto_container_on_teardown")
+
+
+@pytest_asyncio.fixture()
+async def store(moto_container: MotoContainer, moto_s3_client: S3Client) -> S3PayloadStore:
+    await moto_s3_client.create_bucket(Bucket="orders-payloads")
+    return S3PayloadStore(
+        "orders-payloads", lambda: get_session().create_client("s3", **moto_container.get_aws_client_config())
+    )
+
+
+@pytest.fixture()
+def repo(session: DynamoDBSession, store: S3PayloadStore) -> DynamoDBOutboxRepository:
+    return DynamoDBOutboxRepository(
+        table_name="orders-outbox",
+        session=session,
+        topic_map={OrderCreatedEvent: "order--created"},
+        claim_check=ClaimCheck(store, threshold_bytes=100, key_prefix="outbox/"),
+    )
+
+
+@pytest.mark.asyncio()
+async def test_large_message_payload_checked_in(
+    repo: DynamoDBOutboxRepository, session: DynamoDBSession, moto_s3_client: S3Client
+) -> None:
+    event = OrderCreatedEvent(order_id=uuid.uuid4())
+
+    await repo.publish([event])
+    await session.commit()
+
+    published_message = await repo.get(message_id=event.event_id)
+    assert published_message
+    assert json.loads(published_message.message) == {
+        "claim_check": {"uri": f"s3://orders-payloads/outbox/{event.event_id}.json", "size": len(event.serialize())},
+        "correlation_id": str(event.correlation_id),
+    }
+    response = await moto_s3_client.get_object(Bucket="orders-payloads", Key=f"outbox/{event.event_id}.json")
+    assert json.loads(await response["Body"].read()) == event.to_dict()
+
+
+@pytest.mark.asyncio()
+async def test_small_message_payload_not_checked_in(
+    session: DynamoDBSession, store: S3PayloadStore, moto_s3_client: S3Client
+) -> None:
+    repo = DynamoDBOutboxRepository(
+        table_name="orders-outbox",
+        session=session,
+        topic_map={OrderCreatedEvent: "order--created"},
+        claim_check=ClaimCheck(store, threshold_bytes=1024),
+    )
+    event = OrderCreatedEvent(order_id=uuid.uuid4())
+
+    await repo.publish([event])
+    await session.commit()
+
+    published_message = await repo.get(message_id=event.event_id)
+    assert published_message
+    assert json.loads(published_message.message) == event.to_dict()
+    assert "Contents" not in await moto_s3_client.list_objects_v2(Bucket="orders-payloads")
+
+
+@pytest.mark.asyncio()
+async def test_claim_check_reference_resolved(
+    repo: DynamoDBOutboxRepository, session: DynamoDBSession, store: S3PayloadStore
+) -> None:
+    event = OrderCreatedEvent(order_id=uuid.uuid4())
+    await repo.publish([event])
+    await session.commit()
+    published_message = await repo.get(message_id=event.event_id)
+    assert published_message
+
+    data = await resolve_claim_check(json.loads(published_message.message), store)
+
+    assert data == event.to_dict()
+
+
+@pytest.mark.asyncio()
+async def test_data_without_claim_check_reference_returned_as_is(store: S3PayloadStore) -> None:
+    data = {"order_id": str(uuid.uuid4())}
+
+    assert await resolve_claim_check(data, store) is data
+
+
+@pytest.mark.asyncio()
+async def test_invalid_payload_uri_raises(store: S3PayloadStore) -> None:
+    with pytest.raises(InvalidPayloadURIError, match="https://orders-payloads/key"):
+        await store.get("https://orders-payloads/key")
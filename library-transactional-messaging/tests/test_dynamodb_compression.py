@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from transactional_messaging.dynamodb.compression import (
+    MessageCompression,
+    UnknownMessageCodecError,
+    compress_message,
+    decompress_message,
+)
+
+
+def test_message_compressed_above_threshold() -> None:
+    message = json.dumps({"items": [{"product_id": "a1b2c3", "quantity": 1} for _ in range(100)]})
+    compression = MessageCompression(codec="zlib", threshold_bytes=1024)
+
+    compressed = compression.compress(message)
+
+    assert compressed
+    assert len(compressed) < len(message) / 10
+    assert decompress_message(compressed, "zlib") == message
+
+
+def test_message_not_compressed_below_threshold() -> None:
+    compression = MessageCompression(codec="zlib", threshold_bytes=1024)
+
+    assert compression.compress("x" * 1024) is None
+
+
+def test_message_not_compressed_when_compressed_payload_is_not_smaller() -> None:
+    compression = MessageCompression(codec="zlib", threshold_bytes=0)
+
+    assert compression.compress("x") is None
+
+
+def test_unknown_codec_raises() -> None:
+    with pytest.raises(UnknownMessageCodecError, match="lz4"):
+        compress_message(b"message", "lz4")
+    with pytest.raises(UnknownMessageCodecError, match="lz4"):
+        decompress_message(b"message", "lz4")
+
+
+def test_zstd_codec() -> None:
+    pytest.importorskip("zstandard")
+    message = "x" * 2048
+
+    compressed = MessageCompression(codec="zstd").compress(message)
+
+    assert compressed
+    assert decompress_message(compressed, "zstd") == message
@@ -1,12 +1,18 @@
 import datetime
 import uuid
+from unittest.mock import patch
 
 import pytest
+from types_aiobotocore_dynamodb import DynamoDBClient
 from unit_of_work.dynamodb import DynamoDBClientFactory, DynamoDBSession
 
-from transactional_messaging.dynamodb import DynamoDBInboxRepository
-from transactional_messaging.idempotent_consumer import MessageAlreadyProcessedError
-from transactional_messaging.utils.time import utcnow
+from transactional_messaging.dynamodb import DynamoDBInboxRepository, create_inbox_table
+from transactional_messaging.idempotent_consumer import (
+    MessageAlreadyProcessedError,
+    ProcessedMessagesCache,
+    ensure_idempotence,
+)
+from transactional_messaging.utils.time import str_to_datetime, utcnow
 
 pytestmark = pytest.mark.usefixtures("_create_inbox_table", "_reset_moto_container_on_teardown")
 
@@ -48,3 +54,142 @@ async def test_message_already_processed(repo: DynamoDBInboxRepository, session:
     await repo.save(message_id=message_id)
     with pytest.raises(MessageAlreadyProcessedError, match=str(message_id)):
         await session.commit()
+
+
+@pytest.mark.asyncio()
+async def test_message_already_processed__rejected_by_cache_without_commit(session: DynamoDBSession) -> None:
+    cache = ProcessedMessagesCache()
+    repo = DynamoDBInboxRepository(table_name="orders-inbox", session=session, cache=cache)
+    message_id = uuid.uuid4()
+
+    await repo.save(message_id=message_id)
+    assert message_id not in cache
+    await session.commit()
+    assert message_id in cache
+
+    with pytest.raises(MessageAlreadyProcessedError, match=str(message_id)):
+        await repo.save(message_id=message_id)
+
+
+@pytest.mark.asyncio()
+async def test_message_not_cached__when_commit_fails(session: DynamoDBSession) -> None:
+    message_id = uuid.uuid4()
+    await DynamoDBInboxRepository(table_name="orders-inbox", session=session).save(message_id=message_id)
+    await session.commit()
+    cache = ProcessedMessagesCache()
+    repo = DynamoDBInboxRepository(table_name="orders-inbox", session=session, cache=cache)
+
+    await repo.save(message_id=message_id)
+    with pytest.raises(MessageAlreadyProcessedError, match=str(message_id)):
+        await session.commit()
+
+    assert message_id not in cache
+
+
+@pytest.mark.asyncio()
+async def test_processed_message_get_from_cache(session: DynamoDBSession) -> None:
+    cache = ProcessedMessagesCache()
+    repo = DynamoDBInboxRepository(table_name="orders-inbox", session=session, cache=cache)
+    message_id = uuid.uuid4()
+    await repo.save(message_id=message_id)
+    await session.commit()
+
+    with patch.object(session, "get_client", side_effect=AssertionError("DynamoDB must not be called")):
+        message = await repo.get(message_id=message_id)
+
+    assert message
+    assert message.message_id == message_id
+    assert cache.hits == 1
+
+
+@pytest.mark.asyncio()
+async def test_processed_message_not_found_in_cache__read_from_table_and_cached(
+    repo: DynamoDBInboxRepository, session: DynamoDBSession
+) -> None:
+    message_id = uuid.uuid4()
+    await repo.save(message_id=message_id)
+    await session.commit()
+    cache = ProcessedMessagesCache()
+    cached_repo = DynamoDBInboxRepository(table_name="orders-inbox", session=session, cache=cache)
+
+    assert await cached_repo.get(message_id=uuid.uuid4()) is None
+    assert await cached_repo.get(message_id=message_id)
+
+    assert cache.misses == 2
+    assert message_id in cache
+
+
+@pytest.mark.asyncio()
+async def test_new_message_counted_as_single_cache_miss(session: DynamoDBSession) -> None:
+    cache = ProcessedMessagesCache()
+    repo = DynamoDBInboxRepository(table_name="orders-inbox", session=session, cache=cache)
+
+    await ensure_idempotence(uuid.uuid4(), repo)
+
+    assert cache.hits == 0
+    assert cache.misses == 1
+
+
+@pytest.mark.asyncio()
+async def test_inbox_table_ttl_enabled(moto_dynamodb_client: DynamoDBClient) -> None:
+    response = await moto_dynamodb_client.describe_time_to_live(TableName="orders-inbox")
+
+    assert response["TimeToLiveDescription"] == {"TimeToLiveStatus": "ENABLED", "AttributeName": "ExpiresAt"}
+
+
+@pytest.mark.asyncio()
+async def test_inbox_table_ttl_enabled_when_table_already_exists_without_ttl(
+    moto_dynamodb_client: DynamoDBClient,
+) -> None:
+    await moto_dynamodb_client.create_table(
+        TableName="customers-inbox",
+        AttributeDefinitions=[{"AttributeName": "PK", "AttributeType": "S"}],
+        KeySchema=[{"AttributeName": "PK", "KeyType": "HASH"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+    await create_inbox_table(table_name="customers-inbox", client=moto_dynamodb_client)
+
+    response = await moto_dynamodb_client.describe_time_to_live(TableName="customers-inbox")
+    assert response["TimeToLiveDescription"] == {"TimeToLiveStatus": "ENABLED", "AttributeName": "ExpiresAt"}
+
+
+@pytest.mark.asyncio()
+async def test_create_inbox_table_when_table_already_exists_with_ttl(moto_dynamodb_client: DynamoDBClient) -> None:
+    await create_inbox_table(table_name="orders-inbox", client=moto_dynamodb_client)
+
+    response = await moto_dynamodb_client.describe_time_to_live(TableName="orders-inbox")
+    assert response["TimeToLiveDescription"] == {"TimeToLiveStatus": "ENABLED", "AttributeName": "ExpiresAt"}
+
+
+@pytest.mark.asyncio()
+async def test_processed_message_saved_with_expiry(
+    session: DynamoDBSession, moto_dynamodb_client: DynamoDBClient
+) -> None:
+    repo = DynamoDBInboxRepository(table_name="orders-inbox", session=session, retention=datetime.timedelta(days=14))
+    message_id = uuid.uuid4()
+
+    await repo.save(message_id=message_id)
+    await session.commit()
+
+    response = await moto_dynamodb_client.get_item(TableName="orders-inbox", Key={"PK": {"S": f"MESSAGE#{message_id}"}})
+    created_at = str_to_datetime(response["Item"]["CreatedAt"]["S"])
+    expires_at = int(response["Item"]["ExpiresAt"]["N"])
+    assert expires_at == int((created_at + datetime.timedelta(days=14)).timestamp())
+
+
+@pytest.mark.asyncio()
+async def test_processed_message_saved_as_compact_item(
+    session: DynamoDBSession, moto_dynamodb_client: DynamoDBClient
+) -> None:
+    repo = DynamoDBInboxRepository(table_name="orders-inbox", session=session, compact_items=True)
+    message_id = uuid.uuid4()
+
+    await repo.save(message_id=message_id)
+    await session.commit()
+
+    response = await moto_dynamodb_client.get_item(TableName="orders-inbox", Key={"PK": {"S": f"MESSAGE#{message_id}"}})
+    assert set(response["Item"]) == {"PK", "CreatedAt"}
+    message = await repo.get(message_id=message_id)
+    assert message
+    assert message.message_id == message_id
@@ -1,15 +1,24 @@
 import datetime
 import json
 import uuid
+from unittest.mock import patch
 
 import pytest
+from types_aiobotocore_dynamodb import DynamoDBClient
+from types_aiobotocore_dynamodb.type_defs import UpdateTypeDef
 from unit_of_work.dynamodb import DynamoDBSession
 
 from tests.events import OrderCreatedEvent, UnknownOrderEvent
-from transactional_messaging.dynamodb import DynamoDBOutboxRepository
-from transactional_messaging.dynamodb.outbox import MessageNotFoundError, UnknownTopicError
-from transactional_messaging.outbox import MessageAlreadyPublishedError
-from transactional_messaging.utils.time import utcnow
+from transactional_messaging.dynamodb import DynamoDBOutboxRepository, MessageCompression, create_outbox_table
+from transactional_messaging.dynamodb.outbox import (
+    KEYS_ONLY_PROJECTION,
+    NOT_DISPATCHED_MESSAGES_INDEX_MINIMAL_PROJECTION,
+    IndexProjection,
+    MessageNotFoundError,
+    UnknownTopicError,
+)
+from transactional_messaging.outbox import Message, MessageAlreadyPublishedError
+from transactional_messaging.utils.time import str_to_datetime, utcnow
 
 pytestmark = pytest.mark.usefixtures("_create_outbox_table", "_reset_moto_container_on_teardown")
 
@@ -83,6 +92,62 @@ async def test_mark_as_dispatched(repo: DynamoDBOutboxRepository, session: Dynam
     assert datetime.timedelta(seconds=1) > utcnow() - published_message.last_dispatched_at
 
 
+@pytest.mark.asyncio()
+async def test_outbox_table_ttl_enabled(moto_dynamodb_client: DynamoDBClient) -> None:
+    response = await moto_dynamodb_client.describe_time_to_live(TableName="orders-outbox")
+
+    assert response["TimeToLiveDescription"] == {"TimeToLiveStatus": "ENABLED", "AttributeName": "ExpiresAt"}
+
+
+@pytest.mark.asyncio()
+async def test_outbox_table_ttl_enabled_when_table_already_exists_without_ttl(
+    moto_dynamodb_client: DynamoDBClient,
+) -> None:
+    await moto_dynamodb_client.create_table(
+        TableName="customers-outbox",
+        AttributeDefinitions=[{"AttributeName": "PK", "AttributeType": "S"}],
+        KeySchema=[{"AttributeName": "PK", "KeyType": "HASH"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+    await create_outbox_table(table_name="customers-outbox", client=moto_dynamodb_client)
+
+    response = await moto_dynamodb_client.describe_time_to_live(TableName="customers-outbox")
+    assert response["TimeToLiveDescription"] == {"TimeToLiveStatus": "ENABLED", "AttributeName": "ExpiresAt"}
+
+
+@pytest.mark.asyncio()
+async def test_create_outbox_table_when_table_already_exists_with_ttl(moto_dynamodb_client: DynamoDBClient) -> None:
+    await create_outbox_table(table_name="orders-outbox", client=moto_dynamodb_client)
+
+    response = await moto_dynamodb_client.describe_time_to_live(TableName="orders-outbox")
+    assert response["TimeToLiveDescription"] == {"TimeToLiveStatus": "ENABLED", "AttributeName": "ExpiresAt"}
+
+
+@pytest.mark.asyncio()
+async def test_mark_as_dispatched__expiry_set_with_dispatched_retention(
+    session: DynamoDBSession, moto_dynamodb_client: DynamoDBClient
+) -> None:
+    repo = DynamoDBOutboxRepository(
+        table_name="orders-outbox",
+        session=session,
+        topic_map={OrderCreatedEvent: "order--created"},
+        dispatched_retention=datetime.timedelta(days=7),
+    )
+    event = OrderCreatedEvent(order_id=uuid.uuid4())
+    await repo.publish([event])
+    await session.commit()
+
+    await repo.mark_as_dispatched_many([event.event_id])
+
+    response = await moto_dynamodb_client.get_item(
+        TableName="orders-outbox", Key={"PK": {"S": f"MESSAGE#{event.event_id}"}}
+    )
+    last_dispatched_at = str_to_datetime(response["Item"]["LastDispatchedAt"]["S"])
+    expires_at = int(response["Item"]["ExpiresAt"]["N"])
+    assert expires_at == int((last_dispatched_at + datetime.timedelta(days=7)).timestamp())
+
+
 @pytest.mark.asyncio()
 async def test_mark_as_dispatched_twice(repo: DynamoDBOutboxRepository, session: DynamoDBSession) -> None:
     event = OrderCreatedEvent(order_id=uuid.uuid4())
@@ -97,6 +162,85 @@ async def test_mark_as_dispatched_twice(repo: DynamoDBOutboxRepository, session:
     assert published_message.approximate_dispatch_count == 2
 
 
+@pytest.mark.asyncio()
+async def test_mark_as_dispatched_many(repo: DynamoDBOutboxRepository, session: DynamoDBSession) -> None:
+    events: list[Message] = [OrderCreatedEvent(order_id=uuid.uuid4()) for _ in range(7)]
+    await repo.publish(events)
+    await session.commit()
+
+    results = await repo.mark_as_dispatched_many([event.message_id for event in events], max_concurrency=3)
+
+    assert [result.message_id for result in results] == [event.message_id for event in events]
+    assert all(result.is_success for result in results)
+    for event in events:
+        published_message = await repo.get(message_id=event.message_id)
+        assert published_message
+        assert published_message.approximate_dispatch_count == 1
+        assert published_message.is_dispatched is True
+
+
+@pytest.mark.asyncio()
+async def test_mark_as_dispatched_many__not_existing_message_does_not_fail_other_messages(
+    repo: DynamoDBOutboxRepository, session: DynamoDBSession
+) -> None:
+    event_1 = OrderCreatedEvent(order_id=uuid.uuid4())
+    event_2 = OrderCreatedEvent(order_id=uuid.uuid4())
+    not_existing_message_id = uuid.uuid4()
+    await repo.publish([event_1, event_2])
+    await session.commit()
+
+    results = await repo.mark_as_dispatched_many([event_1.event_id, not_existing_message_id, event_2.event_id])
+
+    assert [result.is_success for result in results] == [True, False, True]
+    assert isinstance(results[1].error, MessageNotFoundError)
+    assert str(results[1].error) == str(not_existing_message_id)
+    published_message = await repo.get(message_id=event_2.event_id)
+    assert published_message
+    assert published_message.is_dispatched is True
+
+
+@pytest.mark.asyncio()
+async def test_mark_as_dispatched_many__failed_update_does_not_fail_other_messages(
+    repo: DynamoDBOutboxRepository, session: DynamoDBSession
+) -> None:
+    event_1 = OrderCreatedEvent(order_id=uuid.uuid4())
+    event_2 = OrderCreatedEvent(order_id=uuid.uuid4())
+    await repo.publish([event_1, event_2])
+    await session.commit()
+    mark_as_dispatched_update = repo._mark_as_dispatched_update
+
+    def _failing_mark_as_dispatched_update(message_id: uuid.UUID) -> UpdateTypeDef:
+        update = mark_as_dispatched_update(message_id)
+        if message_id == event_1.event_id:
+            update["TableName"] = "not-existing-table"
+        return update
+
+    with patch.object(repo, "_mark_as_dispatched_update", _failing_mark_as_dispatched_update):
+        results = await repo.mark_as_dispatched_many([event_1.event_id, event_2.event_id])
+
+    assert [result.is_success for result in results] == [False, True]
+    assert not isinstance(results[0].error, MessageNotFoundError)
+    published_message = await repo.get(message_id=event_2.event_id)
+    assert published_message
+    assert published_message.is_dispatched is True
+
+
+@pytest.mark.asyncio()
+async def test_mark_as_dispatched_many__duplicate_message_ids_marked_once(
+    repo: DynamoDBOutboxRepository, session: DynamoDBSession
+) -> None:
+    event = OrderCreatedEvent(order_id=uuid.uuid4())
+    await repo.publish([event])
+    await session.commit()
+
+    results = await repo.mark_as_dispatched_many([event.event_id, event.event_id])
+
+    assert [result.is_success for result in results] == [True, True]
+    published_message = await repo.get(message_id=event.event_id)
+    assert published_message
+    assert published_message.approximate_dispatch_count == 1
+
+
 @pytest.mark.asyncio()
 async def test_get_not_dispatched_messages__oldest_message_first(
     repo: DynamoDBOutboxRepository, session: DynamoDBSession
@@ -132,3 +276,226 @@ async def test_dispatched_message_removed_from_not_dispatched_messages_collectio
     not_dispatched_messages = await repo.get_not_dispatched_messages()
     assert len(not_dispatched_messages) == 1
     assert not_dispatched_messages[0] == await repo.get(message_id=event_2.event_id)
+
+
+@pytest.mark.asyncio()
+async def test_get_not_dispatched_messages_pages(repo: DynamoDBOutboxRepository, session: DynamoDBSession) -> None:
+    events: list[Message] = [
+        OrderCreatedEvent(order_id=uuid.uuid4(), created_at=datetime.datetime(2023, 1, i)) for i in range(1, 6)
+    ]
+    await repo.publish(events)
+    await session.commit()
+
+    pages = [page async for page in repo.get_not_dispatched_messages_pages(page_size=2)]
+
+    assert [[message.message_id for message in page.messages] for page in pages] == [
+        [events[0].message_id, events[1].message_id],
+        [events[2].message_id, events[3].message_id],
+        [events[4].message_id],
+    ]
+    assert pages[0].cursor
+    assert pages[-1].cursor is None
+
+
+@pytest.mark.asyncio()
+async def test_get_not_dispatched_messages_pages__resumed_from_cursor(
+    repo: DynamoDBOutboxRepository, session: DynamoDBSession
+) -> None:
+    events: list[Message] = [
+        OrderCreatedEvent(order_id=uuid.uuid4(), created_at=datetime.datetime(2023, 1, i)) for i in range(1, 6)
+    ]
+    await repo.publish(events)
+    await session.commit()
+    first_page = await anext(repo.get_not_dispatched_messages_pages(page_size=2))
+
+    messages = [
+        message
+        async for page in repo.get_not_dispatched_messages_pages(page_size=2, cursor=first_page.cursor)
+        for message in page.messages
+    ]
+
+    assert [message.message_id for message in messages] == [event.message_id for event in events[2:]]
+
+
+@pytest.mark.asyncio()
+async def test_get_not_dispatched_messages_pages__created_at_window(
+    repo: DynamoDBOutboxRepository, session: DynamoDBSession
+) -> None:
+    events: list[Message] = [
+        OrderCreatedEvent(order_id=uuid.uuid4(), created_at=datetime.datetime(2023, 1, i)) for i in range(1, 6)
+    ]
+    await repo.publish(events)
+    await session.commit()
+
+    async def _get_message_ids(**kwargs: datetime.datetime) -> list[uuid.UUID]:
+        pages = repo.get_not_dispatched_messages_pages(**kwargs)  # type: ignore
+        return [message.message_id async for page in pages for message in page.messages]
+
+    assert await _get_message_ids(created_after=datetime.datetime(2023, 1, 4)) == [
+        events[3].message_id,
+        events[4].message_id,
+    ]
+    assert await _get_message_ids(created_before=datetime.datetime(2023, 1, 2)) == [
+        events[0].message_id,
+        events[1].message_id,
+    ]
+    assert await _get_message_ids(
+        created_after=datetime.datetime(2023, 1, 2), created_before=datetime.datetime(2023, 1, 3)
+    ) == [events[1].message_id, events[2].message_id]
+
+
+@pytest.mark.asyncio()
+async def test_get_not_dispatched_messages__reads_all_pages(
+    repo: DynamoDBOutboxRepository, session: DynamoDBSession
+) -> None:
+    events: list[Message] = [OrderCreatedEvent(order_id=uuid.uuid4()) for _ in range(150)]
+    for i in range(0, len(events), 50):
+        await repo.publish(events[i : i + 50])
+        await session.commit()
+
+    not_dispatched_messages = await repo.get_not_dispatched_messages()
+
+    assert len(not_dispatched_messages) == 150
+
+
+@pytest.mark.asyncio()
+async def test_scan_not_dispatched_message_ids(repo: DynamoDBOutboxRepository, session: DynamoDBSession) -> None:
+    events: list[Message] = [OrderCreatedEvent(order_id=uuid.uuid4()) for _ in range(20)]
+    await repo.publish(events)
+    await session.commit()
+    await repo.mark_as_dispatched(message_id=events[0].message_id)
+
+    # Moto doesn't split the table into parallel scan segments, so a single segment is scanned
+    message_ids = [
+        message_id
+        async for page in repo.scan_not_dispatched_message_ids(segment=0, total_segments=1, page_size=3)
+        for message_id in page.message_ids
+    ]
+
+    assert sorted(message_ids) == sorted(event.message_id for event in events[1:])
+
+
+@pytest.mark.asyncio()
+async def test_scan_not_dispatched_message_ids__resumed_from_cursor(
+    repo: DynamoDBOutboxRepository, session: DynamoDBSession
+) -> None:
+    events: list[Message] = [OrderCreatedEvent(order_id=uuid.uuid4()) for _ in range(5)]
+    await repo.publish(events)
+    await session.commit()
+    first_page = await anext(repo.scan_not_dispatched_message_ids(segment=0, total_segments=1, page_size=2))
+
+    message_ids = [
+        message_id
+        async for page in repo.scan_not_dispatched_message_ids(
+            segment=0, total_segments=1, page_size=2, cursor=first_page.cursor
+        )
+        for message_id in page.message_ids
+    ]
+
+    assert len(first_page.message_ids) == 2
+    assert sorted(first_page.message_ids + message_ids) == sorted(event.message_id for event in events)
+
+
+@pytest.mark.asyncio()
+async def test_get_many(repo: DynamoDBOutboxRepository, session: DynamoDBSession) -> None:
+    events: list[Message] = [OrderCreatedEvent(order_id=uuid.uuid4()) for _ in range(3)]
+    await repo.publish(events)
+    await session.commit()
+
+    messages = await repo.get_many([events[2].message_id, uuid.uuid4(), events[0].message_id, events[2].message_id])
+
+    assert messages == [
+        await repo.get(message_id=events[2].message_id),
+        await repo.get(message_id=events[0].message_id),
+    ]
+
+
+@pytest.mark.asyncio()
+async def test_create_outbox_table_with_index_projections(moto_dynamodb_client: DynamoDBClient) -> None:
+    await create_outbox_table(
+        table_name="orders-outbox-projections",
+        client=moto_dynamodb_client,
+        correlation_id_index_projection=KEYS_ONLY_PROJECTION,
+        aggregate_id_index_projection=IndexProjection(projection_type="INCLUDE", non_key_attributes=("Topic",)),
+        not_dispatched_messages_index_projection=NOT_DISPATCHED_MESSAGES_INDEX_MINIMAL_PROJECTION,
+    )
+
+    response = await moto_dynamodb_client.describe_table(TableName="orders-outbox-projections")
+    projections = {index["IndexName"]: index["Projection"] for index in response["Table"]["GlobalSecondaryIndexes"]}
+    assert projections == {
+        "CorrelationIdIndex": {"ProjectionType": "KEYS_ONLY"},
+        "AggregateIdIndex": {"ProjectionType": "INCLUDE", "NonKeyAttributes": ["Topic"]},
+        "NotDispatchedMessagesIndex": {"ProjectionType": "INCLUDE", "NonKeyAttributes": ["MessageId"]},
+    }
+
+
+@pytest.mark.asyncio()
+async def test_get_not_dispatched_messages_pages__messages_fetched_from_table_when_index_projection_is_minimal(
+    session: DynamoDBSession, moto_dynamodb_client: DynamoDBClient
+) -> None:
+    await create_outbox_table(
+        table_name="orders-outbox-minimal",
+        client=moto_dynamodb_client,
+        not_dispatched_messages_index_projection=NOT_DISPATCHED_MESSAGES_INDEX_MINIMAL_PROJECTION,
+    )
+    repo = DynamoDBOutboxRepository("orders-outbox-minimal", session, topic_map={OrderCreatedEvent: "order--created"})
+    events: list[Message] = [
+        OrderCreatedEvent(order_id=uuid.uuid4(), created_at=datetime.datetime(2023, 1, i)) for i in range(1, 4)
+    ]
+    await repo.publish(events)
+    await session.commit()
+
+    with patch.object(repo, "get_many", wraps=repo.get_many) as get_many_spy:
+        pages = [page async for page in repo.get_not_dispatched_messages_pages(page_size=2)]
+
+    assert get_many_spy.await_count == 2
+    assert [message for page in pages for message in page.messages] == [
+        await repo.get(message_id=event.message_id) for event in events
+    ]
+
+
+@pytest.mark.asyncio()
+async def test_publish_compressed_message(session: DynamoDBSession, moto_dynamodb_client: DynamoDBClient) -> None:
+    repo = DynamoDBOutboxRepository(
+        table_name="orders-outbox",
+        session=session,
+        topic_map={OrderCreatedEvent: "order--created"},
+        compression=MessageCompression(codec="zlib", threshold_bytes=100),
+    )
+    event = OrderCreatedEvent(order_id=uuid.uuid4())
+
+    await repo.publish([event])
+    await session.commit()
+
+    response = await moto_dynamodb_client.get_item(
+        TableName="orders-outbox", Key={"PK": {"S": f"MESSAGE#{event.event_id}"}}
+    )
+    assert response["Item"]["MessageCodec"] == {"S": "zlib"}
+    assert len(response["Item"]["Message"]["B"]) < len(event.serialize())
+    published_message = await repo.get(message_id=event.event_id)
+    assert published_message
+    assert json.loads(published_message.message) == event.to_dict()
+    [not_dispatched_message] = await repo.get_not_dispatched_messages()
+    assert not_dispatched_message == published_message
+
+
+@pytest.mark.asyncio()
+async def test_message_below_compression_threshold_not_compressed(
+    session: DynamoDBSession, moto_dynamodb_client: DynamoDBClient
+) -> None:
+    repo = DynamoDBOutboxRepository(
+        table_name="orders-outbox",
+        session=session,
+        topic_map={OrderCreatedEvent: "order--created"},
+        compression=MessageCompression(codec="zlib", threshold_bytes=1024),
+    )
+    event = OrderCreatedEvent(order_id=uuid.uuid4())
+
+    await repo.publish([event])
+    await session.commit()
+
+    response = await moto_dynamodb_client.get_item(
+        TableName="orders-outbox", Key={"PK": {"S": f"MESSAGE#{event.event_id}"}}
+    )
+    assert response["Item"]["Message"] == {"S": event.serialize()}
+    assert "MessageCodec" not in response["Item"]
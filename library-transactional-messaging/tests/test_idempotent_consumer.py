@@ -1,9 +1,17 @@
 import uuid
+from unittest.mock import AsyncMock
 
 import pytest
 
 from transactional_messaging.fakes import FakeInboxRepository
-from transactional_messaging.idempotent_consumer import MessageAlreadyProcessedError, ensure_idempotence
+from transactional_messaging.idempotent_consumer import (
+    InboxRepository,
+    MessageAlreadyProcessedError,
+    ProcessedMessage,
+    ProcessedMessagesCache,
+    ensure_idempotence,
+)
+from transactional_messaging.utils.time import utcnow
 
 
 @pytest.fixture()
@@ -30,3 +38,83 @@ async def test_already_processed_message(repo: FakeInboxRepository) -> None:
 
     with pytest.raises(MessageAlreadyProcessedError, match=str(message_id)):
         await ensure_idempotence(message_id, repo)
+
+
+@pytest.mark.asyncio()
+async def test_already_processed_message__optimistic_mode(repo: FakeInboxRepository) -> None:
+    message_id = uuid.uuid4()
+    await ensure_idempotence(message_id, repo, optimistic=True)
+
+    with pytest.raises(MessageAlreadyProcessedError, match=str(message_id)):
+        await ensure_idempotence(message_id, repo, optimistic=True)
+
+
+@pytest.mark.asyncio()
+async def test_optimistic_mode_skips_inbox_read() -> None:
+    message_id = uuid.uuid4()
+    repo = AsyncMock(spec=InboxRepository)
+
+    await ensure_idempotence(message_id, repo, optimistic=True)
+
+    repo.get.assert_not_awaited()
+    repo.save.assert_awaited_once_with(message_id=message_id)
+
+
+def processed_message_factory() -> ProcessedMessage:
+    return ProcessedMessage(message_id=uuid.uuid4(), created_at=utcnow())
+
+
+def test_processed_messages_cache__least_recently_used_message_evicted() -> None:
+    cache = ProcessedMessagesCache(max_size=2)
+    message_1, message_2, message_3 = (
+        processed_message_factory(),
+        processed_message_factory(),
+        processed_message_factory(),
+    )
+
+    cache.add(message_1)
+    cache.add(message_2)
+    assert cache.get(message_1.message_id) == message_1
+    cache.add(message_3)
+
+    assert len(cache) == 2
+    assert message_1.message_id in cache
+    assert message_2.message_id not in cache
+    assert message_3.message_id in cache
+
+
+def test_processed_messages_cache__expired_message_evicted() -> None:
+    now = 1000.0
+    cache = ProcessedMessagesCache(ttl=60.0, clock=lambda: now)
+    message = processed_message_factory()
+    cache.add(message)
+
+    now += 59.9
+    assert message.message_id in cache
+    now += 0.1
+    assert message.message_id not in cache
+    assert len(cache) == 0
+
+
+def test_processed_messages_cache__hits_and_misses_counted() -> None:
+    cache = ProcessedMessagesCache()
+    message = processed_message_factory()
+
+    assert cache.get(message.message_id) is None
+    cache.add(message)
+    assert cache.get(message.message_id) == message
+
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_processed_messages_cache__contains_does_not_count_hits_and_misses() -> None:
+    cache = ProcessedMessagesCache()
+    message = processed_message_factory()
+
+    assert message.message_id not in cache
+    cache.add(message)
+    assert message.message_id in cache
+
+    assert cache.hits == 0
+    assert cache.misses == 0
@@ -1,7 +1,9 @@
-from unit_of_work.dynamodb.client import DynamoDBClientFactory
-from unit_of_work.dynamodb.session import DynamoDBSession
+from unit_of_work.dynamodb.client import DynamoDBClientFactory, DynamoDBClientProvider
+from unit_of_work.dynamodb.session import DynamoDBSession, PartialCommitError
 
 __all__ = [
     "DynamoDBClientFactory",
+    "DynamoDBClientProvider",
     "DynamoDBSession",
+    "PartialCommitError",
 ]
@@ -1,5 +1,71 @@
-from typing import Callable
+import asyncio
+import contextlib
+from typing import Any, AsyncContextManager, AsyncIterator, Callable
 
+from aiobotocore.config import AioConfig
+from aiobotocore.session import get_session
 from types_aiobotocore_dynamodb import DynamoDBClient
 
-DynamoDBClientFactory = Callable[[], DynamoDBClient]
+DynamoDBClientFactory = Callable[[], AsyncContextManager[DynamoDBClient]]
+
+
+class DynamoDBClientProvider:
+    """Shared DynamoDB client with a single connection pool, opened on the service start and closed on the shutdown.
+
+    `get_client` is a `DynamoDBClientFactory` that lends the shared client,
+    instead of creating a new client and a connection pool every time the session needs one.
+    The client is bound to the event loop it was opened in, so it's reopened when used in another event loop.
+    """
+
+    def __init__(
+        self,
+        max_pool_connections: int = 10,
+        keepalive_timeout: float = 15.0,
+        connect_timeout: float = 60.0,
+        read_timeout: float = 60.0,
+        **client_kwargs: Any,
+    ) -> None:
+        self._config = AioConfig(
+            max_pool_connections=max_pool_connections,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            connector_args={"keepalive_timeout": keepalive_timeout},
+        )
+        self._client_kwargs = client_kwargs
+        self._client: DynamoDBClient | None = None
+        self._exit_stack: contextlib.AsyncExitStack | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock: asyncio.Lock | None = None
+
+    async def start(self) -> None:
+        await self._get_or_open_client()
+
+    async def close(self) -> None:
+        exit_stack = self._exit_stack
+        loop = self._loop
+        self._client = None
+        self._exit_stack = None
+        if exit_stack and loop is asyncio.get_running_loop():
+            await exit_stack.aclose()
+
+    @contextlib.asynccontextmanager
+    async def get_client(self) -> AsyncIterator[DynamoDBClient]:
+        yield await self._get_or_open_client()
+
+    async def _get_or_open_client(self) -> DynamoDBClient:
+        loop = asyncio.get_running_loop()
+        lock = self._lock
+        if self._loop is not loop or lock is None:
+            # The client of a previous event loop can't be used or closed in this one
+            lock = asyncio.Lock()
+            self._loop = loop
+            self._lock = lock
+            self._client = None
+            self._exit_stack = None
+        async with lock:
+            if self._client is None:
+                exit_stack = contextlib.AsyncExitStack()
+                client_creator = get_session().create_client("dynamodb", config=self._config, **self._client_kwargs)
+                self._client = await exit_stack.enter_async_context(client_creator)
+                self._exit_stack = exit_stack
+            return self._client
@@ -1,52 +1,190 @@
-from contextvars import ContextVar
-from typing import TypedDict
+import asyncio
+import json
+from contextvars import ContextVar, Token
+from typing import Callable, TypedDict
 
+from types_aiobotocore_dynamodb import DynamoDBClient
 from types_aiobotocore_dynamodb.type_defs import TransactWriteItemTypeDef
 
 from unit_of_work.dynamodb.client import DynamoDBClientFactory
 
+TRANSACT_WRITE_ITEMS_MAX_ITEMS = 100
+TRANSACT_WRITE_ITEMS_MAX_BYTES = 4 * 1024 * 1024
+CHUNKED_COMMIT_MAX_CONCURRENCY = 4
+
+
+class PartialCommitError(Exception):
+    """Some chunks of a chunked commit failed; `errors` maps the index of every not written item to its error."""
+
+    def __init__(self, errors: dict[int, Exception]) -> None:
+        super().__init__(f"{len(errors)} item(s) not committed; first failed item index: {min(errors)}")
+        self.errors = errors
+
 
 class DynamoDBSessionItems(TypedDict):
     transact_item: TransactWriteItemTypeDef
     raise_on_condition_check_failure: Exception | None
+    on_commit: Callable[[], None] | None
+
+
+class DynamoDBSessionBuffer:
+    """Items of a unit of work; the list is reused after commit and rollback.
+
+    Child tasks started within the unit of work inherit the buffer and add their items to it,
+    and the lock serializes commits of the buffer.
+    """
+
+    __slots__ = ("items", "lock", "__weakref__")
+
+    def __init__(self) -> None:
+        self.items: list[DynamoDBSessionItems] = []
+        self.lock = asyncio.Lock()
 
 
 class DynamoDBSession:
-    _session: ContextVar[list[DynamoDBSessionItems]]
+    _session: ContextVar[DynamoDBSessionBuffer]
 
     def __init__(self, client_factory: DynamoDBClientFactory) -> None:
         self.get_client = client_factory
-        self._session = ContextVar("__unit_of_work.dynamodb.session", default=[])
+        self._session = ContextVar("__unit_of_work.dynamodb.session")
+
+    def begin(self) -> Token[DynamoDBSessionBuffer]:
+        """Start a unit of work with a new buffer in the current context; `end` it with the returned token.
+
+        Child tasks started within the unit of work share the buffer, even before the unit of work adds any items.
+        """
+        return self._session.set(DynamoDBSessionBuffer())
+
+    def end(self, token: Token[DynamoDBSessionBuffer]) -> None:
+        try:
+            self._session.reset(token)
+        except ValueError:
+            # Ended in another context than it began, e.g. in the teardown of an async generator fixture;
+            # the buffer is released with the context in which the unit of work began
+            pass
 
     def add(
-        self, transact_item: TransactWriteItemTypeDef, raise_on_condition_check_failure: Exception | None = None
+        self,
+        transact_item: TransactWriteItemTypeDef,
+        raise_on_condition_check_failure: Exception | None = None,
+        on_commit: Callable[[], None] | None = None,
     ) -> None:
+        """Add an item to the session; `on_commit` callback is called only after the item is written."""
         item = DynamoDBSessionItems(
             transact_item=transact_item,
             raise_on_condition_check_failure=raise_on_condition_check_failure,
+            on_commit=on_commit,
         )
-        self._session.get().append(item)
+        self._get_buffer().items.append(item)
 
     async def commit(self) -> None:
-        items = self._session.get()
-        if not items:
-            return
-        async with self.get_client() as client:
-            try:
-                transact_items = [item["transact_item"] for item in items]
-                await client.transact_write_items(TransactItems=transact_items)
-            except client.exceptions.TransactionCanceledException as e:
-                cancellation_codes = [reason["Code"] for reason in e.response["CancellationReasons"]]
-                raise_on_condition_failures = [item["raise_on_condition_check_failure"] for item in items]
-                zipped = zip(cancellation_codes, raise_on_condition_failures)
-                for cancellation_code, raise_on_condition_failure in zipped:
-                    if cancellation_code == "None":
-                        continue
-                    if cancellation_code == "ConditionalCheckFailed" and raise_on_condition_failure is not None:
-                        raise raise_on_condition_failure from e
-                raise
-            finally:
-                self.rollback()
+        buffer = self._get_buffer()
+        async with buffer.lock:
+            # Items that child tasks add while the transaction is written are left for the next commit
+            items = buffer.items[:]
+            if not items:
+                return
+            async with self.get_client() as client:
+                try:
+                    transact_items = [item["transact_item"] for item in items]
+                    await client.transact_write_items(TransactItems=transact_items)
+                    _call_on_commit_callbacks(items)
+                except client.exceptions.TransactionCanceledException as e:
+                    cancellation_codes = [reason["Code"] for reason in e.response["CancellationReasons"]]
+                    raise_on_condition_failures = [item["raise_on_condition_check_failure"] for item in items]
+                    zipped = zip(cancellation_codes, raise_on_condition_failures)
+                    for cancellation_code, raise_on_condition_failure in zipped:
+                        if cancellation_code == "None":
+                            continue
+                        if cancellation_code == "ConditionalCheckFailed" and raise_on_condition_failure is not None:
+                            raise raise_on_condition_failure from e
+                    raise
+                finally:
+                    del buffer.items[: len(items)]
+
+    async def commit_in_chunks(
+        self,
+        chunk_size: int = TRANSACT_WRITE_ITEMS_MAX_ITEMS,
+        chunk_max_bytes: int = TRANSACT_WRITE_ITEMS_MAX_BYTES,
+        max_concurrency: int = CHUNKED_COMMIT_MAX_CONCURRENCY,
+    ) -> None:
+        """Commit items in concurrent transactions of up to `chunk_size` items and `chunk_max_bytes` each.
+
+        Not atomic - for idempotent bulk writes, e.g. outbox backfills or inbox seeding, that exceed
+        the TransactWriteItems limits. When any chunk fails, the other chunks are still committed and
+        `PartialCommitError` is raised with an error for every item of the failed chunks, by the item's index.
+        """
+        buffer = self._get_buffer()
+        async with buffer.lock:
+            items = buffer.items[:]
+            buffer.items.clear()
+            if not items:
+                return
+            semaphore = asyncio.Semaphore(max_concurrency)
+            async with self.get_client() as client:
+                results = await asyncio.gather(
+                    *[
+                        self._commit_chunk(client, items, chunk, semaphore)
+                        for chunk in _chunk_item_indexes(items, chunk_size, chunk_max_bytes)
+                    ]
+                )
+        errors = {index: error for result in results for index, error in result.items()}
+        if errors:
+            raise PartialCommitError(dict(sorted(errors.items())))
+
+    async def _commit_chunk(
+        self,
+        client: DynamoDBClient,
+        items: list[DynamoDBSessionItems],
+        chunk: list[int],
+        semaphore: asyncio.Semaphore,
+    ) -> dict[int, Exception]:
+        try:
+            async with semaphore:
+                await client.transact_write_items(TransactItems=[items[index]["transact_item"] for index in chunk])
+        except client.exceptions.TransactionCanceledException as e:
+            cancellation_codes = [reason["Code"] for reason in e.response["CancellationReasons"]]
+            errors: dict[int, Exception] = {}
+            for index, cancellation_code in zip(chunk, cancellation_codes):
+                raise_on_condition_failure = items[index]["raise_on_condition_check_failure"]
+                if cancellation_code == "ConditionalCheckFailed" and raise_on_condition_failure is not None:
+                    errors[index] = raise_on_condition_failure
+                else:
+                    errors[index] = e  # The whole chunk is cancelled, including items that didn't fail
+            return errors
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            return {index: e for index in chunk}
+        _call_on_commit_callbacks([items[index] for index in chunk])
+        return {}
 
     def rollback(self) -> None:
-        self._session.get().clear()
+        self._get_buffer().items.clear()
+
+    def _get_buffer(self) -> DynamoDBSessionBuffer:
+        # Without `begin`, the buffer is set in the context of the task that uses the session first,
+        # so only the tasks that it starts afterwards inherit the buffer
+        buffer = self._session.get(None)
+        if buffer is None:
+            buffer = DynamoDBSessionBuffer()
+            self._session.set(buffer)
+        return buffer
+
+
+def _call_on_commit_callbacks(items: list[DynamoDBSessionItems]) -> None:
+    for item in items:
+        if on_commit := item["on_commit"]:
+            on_commit()
+
+
+def _chunk_item_indexes(items: list[DynamoDBSessionItems], chunk_size: int, chunk_max_bytes: int) -> list[list[int]]:
+    chunks: list[list[int]] = [[]]
+    chunk_bytes = 0
+    for index, item in enumerate(items):
+        # JSON size overestimates DynamoDB item size, so the chunk stays under the request size limit
+        item_bytes = len(json.dumps(item["transact_item"], default=str))
+        if chunks[-1] and (len(chunks[-1]) >= chunk_size or chunk_bytes + item_bytes > chunk_max_bytes):
+            chunks.append([])
+            chunk_bytes = 0
+        chunks[-1].append(index)
+        chunk_bytes += item_bytes
+    return chunks
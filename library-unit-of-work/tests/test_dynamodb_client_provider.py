@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+from tomodachi_testcontainers.containers import MotoContainer
+from types_aiobotocore_dynamodb import DynamoDBClient
+
+from unit_of_work.dynamodb import DynamoDBClientProvider, DynamoDBSession
+
+pytestmark = pytest.mark.usefixtures("_create_dynamodb_table", "_reset_moto_container_on_teardown")
+
+
+@pytest.fixture()
+def client_provider(moto_container: MotoContainer) -> DynamoDBClientProvider:
+    return DynamoDBClientProvider(max_pool_connections=20, **moto_container.get_aws_client_config())
+
+
+@pytest.mark.asyncio()
+async def test_shared_client_lent_to_every_caller(client_provider: DynamoDBClientProvider) -> None:
+    await client_provider.start()
+
+    async def _get_client() -> DynamoDBClient:
+        async with client_provider.get_client() as client:
+            await client.describe_table(TableName="test-table")
+            return client
+
+    clients = await asyncio.gather(*[_get_client() for _ in range(10)])
+
+    assert len({id(client) for client in clients}) == 1
+    assert clients[0].meta.config.max_pool_connections == 20
+    await client_provider.close()
+
+
+@pytest.mark.asyncio()
+async def test_client_opened_on_first_use_and_reopened_after_close(client_provider: DynamoDBClientProvider) -> None:
+    async with client_provider.get_client() as client_1:
+        pass
+    await client_provider.close()
+    async with client_provider.get_client() as client_2:
+        await client_2.describe_table(TableName="test-table")
+
+    assert client_1 is not client_2
+    await client_provider.close()
+
+
+@pytest.mark.asyncio()
+async def test_session_commits_with_provided_client(client_provider: DynamoDBClientProvider) -> None:
+    session = DynamoDBSession(client_provider.get_client)
+    session.add({"Put": {"TableName": "test-table", "Item": {"PK": {"S": "product-1111"}}}})
+
+    await session.commit()
+
+    async with client_provider.get_client() as client:
+        get_item_response = await client.get_item(TableName="test-table", Key={"PK": {"S": "product-1111"}})
+        assert "Item" in get_item_response
+    await client_provider.close()
+
+
+def test_client_reopened_in_new_event_loop(moto_container: MotoContainer) -> None:
+    client_provider = DynamoDBClientProvider(**moto_container.get_aws_client_config())
+
+    async def _get_client() -> DynamoDBClient:
+        async with client_provider.get_client() as client:
+            await client.list_tables()
+            return client
+
+    client_1 = asyncio.run(_get_client())
+    client_2 = asyncio.run(_get_client())
+
+    assert client_1 is not client_2
@@ -3,7 +3,7 @@ import pytest_asyncio
 from botocore.exceptions import ClientError
 from types_aiobotocore_dynamodb.type_defs import TransactWriteItemTypeDef
 
-from unit_of_work.dynamodb import DynamoDBClientFactory, DynamoDBSession
+from unit_of_work.dynamodb import DynamoDBClientFactory, DynamoDBSession, PartialCommitError
 
 pytestmark = pytest.mark.usefixtures("_create_dynamodb_table", "_reset_moto_container_on_teardown")
 
@@ -125,6 +125,32 @@ async def test_raise_domain_exception(session: DynamoDBSession) -> None:
         assert "Item" in get_item_response
 
 
+@pytest.mark.asyncio()
+async def test_on_commit_callback_called_only_after_commit(session: DynamoDBSession) -> None:
+    committed: list[str] = []
+    transact_item: TransactWriteItemTypeDef = {
+        "Put": {
+            "TableName": "test-table",
+            "Item": {"PK": {"S": "product-1111"}},
+            "ConditionExpression": "attribute_not_exists(PK)",
+        },
+    }
+
+    session.add(transact_item, on_commit=lambda: committed.append("first"))
+    assert not committed
+    await session.commit()
+    assert committed == ["first"]
+
+    session.add(transact_item, on_commit=lambda: committed.append("second"))
+    with pytest.raises(ClientError):
+        await session.commit()
+    session.add(transact_item, on_commit=lambda: committed.append("rolled-back"))
+    session.rollback()
+    await session.commit()
+
+    assert committed == ["first"]
+
+
 @pytest.mark.asyncio()
 async def test_dynamodb_exception_raised_for_first_failing_item(session: DynamoDBSession) -> None:
     session.add({"Put": {"TableName": "test-table", "Item": {"PK": {"S": "product-2222"}}}})
@@ -190,3 +216,44 @@ async def test_domain_error_raised_for_first_failing_item(session: DynamoDBSessi
 
     with pytest.raises(RuntimeError, match="Item already exists"):
         await session.commit()
+
+
+@pytest.mark.asyncio()
+async def test_commit_in_chunks__more_items_than_transaction_limit(session: DynamoDBSession) -> None:
+    for i in range(250):
+        session.add({"Put": {"TableName": "test-table", "Item": {"PK": {"S": f"product-{i}"}}}})
+
+    await session.commit_in_chunks(chunk_size=100)
+
+    async with session.get_client() as client:
+        scan_table_response = await client.scan(TableName="test-table", Select="COUNT")
+        assert scan_table_response["Count"] == 250
+
+
+@pytest.mark.asyncio()
+async def test_commit_in_chunks__errors_mapped_to_original_item_index(session: DynamoDBSession) -> None:
+    session.add({"Put": {"TableName": "test-table", "Item": {"PK": {"S": "product-5"}}}})
+    await session.commit()
+    for i in range(10):
+        session.add(
+            {
+                "Put": {
+                    "TableName": "test-table",
+                    "Item": {"PK": {"S": f"product-{i}"}},
+                    "ConditionExpression": "attribute_not_exists(PK)",
+                }
+            },
+            raise_on_condition_check_failure=RuntimeError(f"product-{i} already exists"),
+        )
+
+    with pytest.raises(PartialCommitError) as exc_info:
+        await session.commit_in_chunks(chunk_size=3)
+
+    errors = exc_info.value.errors
+    assert list(errors) == [3, 4, 5]  # The chunk of the failed item is cancelled as a whole
+    assert str(errors[5]) == "product-5 already exists"
+    assert isinstance(errors[3], ClientError)
+    assert isinstance(errors[4], ClientError)
+    async with session.get_client() as client:
+        scan_table_response = await client.scan(TableName="test-table", Select="COUNT")
+        assert scan_table_response["Count"] == 8  # 7 committed items + the existing item
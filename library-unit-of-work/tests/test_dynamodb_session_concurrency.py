@@ -0,0 +1,178 @@
+import asyncio
+import contextlib
+import gc
+import weakref
+from typing import AsyncIterator
+
+import pytest
+from types_aiobotocore_dynamodb.type_defs import TransactWriteItemTypeDef
+
+from unit_of_work.dynamodb import DynamoDBClientFactory, DynamoDBSession
+
+
+class FakeDynamoDBClient:
+    def __init__(self) -> None:
+        self.committed_transactions: list[list[TransactWriteItemTypeDef]] = []
+
+    async def transact_write_items(self, TransactItems: list[TransactWriteItemTypeDef]) -> None:  # noqa: N803
+        await asyncio.sleep(0)
+        self.committed_transactions.append(TransactItems)
+
+
+def fake_client_factory(client: FakeDynamoDBClient) -> DynamoDBClientFactory:
+    @contextlib.asynccontextmanager
+    async def _client_factory() -> AsyncIterator[FakeDynamoDBClient]:
+        yield client
+
+    return _client_factory  # type: ignore[return-value]
+
+
+def _get_pk(transact_item: TransactWriteItemTypeDef) -> str:
+    pk: dict[str, str] = transact_item["Put"]["Item"]["PK"]  # type: ignore[assignment]
+    return pk["S"]
+
+
+@pytest.mark.asyncio()
+async def test_concurrent_tasks_have_isolated_sessions() -> None:
+    client = FakeDynamoDBClient()
+    session = DynamoDBSession(fake_client_factory(client))
+    buffers: list[weakref.ref] = []
+
+    async def _unit_of_work(task_number: int) -> None:
+        for item_number in range(3):
+            session.add({"Put": {"TableName": "test-table", "Item": {"PK": {"S": f"{task_number}-{item_number}"}}}})
+            await asyncio.sleep(0)  # Interleave with other tasks
+        buffers.append(weakref.ref(session._get_buffer()))  # pylint: disable=protected-access
+        await session.commit()
+
+    await asyncio.gather(*[_unit_of_work(task_number) for task_number in range(5000)])
+
+    assert len(client.committed_transactions) == 5000
+    for transact_items in client.committed_transactions:
+        task_numbers = {_get_pk(item).split("-")[0] for item in transact_items}
+        assert len(transact_items) == 3
+        assert len(task_numbers) == 1
+    # Buffers of finished tasks are not retained; the loop releases the last callback of gather on its next iteration
+    await asyncio.sleep(0)
+    gc.collect()
+    assert all(buffer() is None for buffer in buffers)
+
+
+@pytest.mark.asyncio()
+async def test_items_added_by_child_tasks_committed_with_unit_of_work() -> None:
+    client = FakeDynamoDBClient()
+    session = DynamoDBSession(fake_client_factory(client))
+    session.add({"Put": {"TableName": "test-table", "Item": {"PK": {"S": "parent-task"}}}})
+
+    async def _add_item(task_number: int) -> None:
+        await asyncio.sleep(0)
+        session.add({"Put": {"TableName": "test-table", "Item": {"PK": {"S": f"child-task-{task_number}"}}}})
+
+    await asyncio.gather(*[_add_item(task_number) for task_number in range(3)])
+    await asyncio.create_task(_add_item(3))
+    await session.commit()
+
+    assert len(client.committed_transactions) == 1
+    assert [_get_pk(item) for item in client.committed_transactions[0]] == [
+        "parent-task",
+        "child-task-0",
+        "child-task-1",
+        "child-task-2",
+        "child-task-3",
+    ]
+
+
+@pytest.mark.asyncio()
+async def test_items_added_by_child_tasks_before_parent_uses_session_committed_after_begin() -> None:
+    client = FakeDynamoDBClient()
+    session = DynamoDBSession(fake_client_factory(client))
+
+    async def _add_item(task_number: int) -> None:
+        session.add({"Put": {"TableName": "test-table", "Item": {"PK": {"S": f"child-task-{task_number}"}}}})
+
+    token = session.begin()
+    await asyncio.gather(*[_add_item(task_number) for task_number in range(3)])
+    await session.commit()
+    session.end(token)
+
+    assert len(client.committed_transactions) == 1
+    assert [_get_pk(item) for item in client.committed_transactions[0]] == [
+        "child-task-0",
+        "child-task-1",
+        "child-task-2",
+    ]
+
+
+@pytest.mark.asyncio()
+async def test_session_buffer_reset_after_end() -> None:
+    session = DynamoDBSession(fake_client_factory(FakeDynamoDBClient()))
+    buffer = session._get_buffer()  # pylint: disable=protected-access
+
+    token = session.begin()
+    session.add({"Put": {"TableName": "test-table", "Item": {"PK": {"S": "product-1111"}}}})
+    session.end(token)
+
+    assert session._get_buffer() is buffer  # pylint: disable=protected-access
+    assert buffer.items == []
+
+
+@pytest.mark.asyncio()
+async def test_session_ended_in_another_context() -> None:
+    session = DynamoDBSession(fake_client_factory(FakeDynamoDBClient()))
+    token = session.begin()
+
+    async def _end() -> None:
+        session.end(token)
+
+    await asyncio.create_task(_end())
+
+
+@pytest.mark.asyncio()
+async def test_concurrent_commits_of_child_tasks_write_every_item_once() -> None:
+    client = FakeDynamoDBClient()
+    session = DynamoDBSession(fake_client_factory(client))
+    session.add({"Put": {"TableName": "test-table", "Item": {"PK": {"S": "parent-task"}}}})
+
+    async def _add_item_and_commit(task_number: int) -> None:
+        session.add({"Put": {"TableName": "test-table", "Item": {"PK": {"S": f"child-task-{task_number}"}}}})
+        await session.commit()
+
+    await asyncio.gather(*[_add_item_and_commit(task_number) for task_number in range(3)])
+
+    committed_items = [_get_pk(item) for transact_items in client.committed_transactions for item in transact_items]
+    assert sorted(committed_items) == ["child-task-0", "child-task-1", "child-task-2", "parent-task"]
+
+
+@pytest.mark.asyncio()
+async def test_session_buffer_reused_after_commit_and_rollback() -> None:
+    session = DynamoDBSession(fake_client_factory(FakeDynamoDBClient()))
+    session.add({"Put": {"TableName": "test-table", "Item": {"PK": {"S": "product-1111"}}}})
+    buffer = session._get_buffer()  # pylint: disable=protected-access
+
+    await session.commit()
+    session.add({"Put": {"TableName": "test-table", "Item": {"PK": {"S": "product-2222"}}}})
+    session.rollback()
+
+    assert session._get_buffer() is buffer  # pylint: disable=protected-access
+    assert buffer.items == []
+
+
+@pytest.mark.asyncio()
+async def test_commit_in_chunks__chunked_by_item_count_and_size() -> None:
+    client = FakeDynamoDBClient()
+    session = DynamoDBSession(fake_client_factory(client))
+    for i in range(5):
+        session.add({"Put": {"TableName": "test-table", "Item": {"PK": {"S": f"small-{i}"}}}})
+    for i in range(3):
+        session.add(
+            {"Put": {"TableName": "test-table", "Item": {"PK": {"S": f"large-{i}"}, "Data": {"S": "x" * 1000}}}}
+        )
+
+    await session.commit_in_chunks(chunk_size=4, chunk_max_bytes=2500)
+
+    chunks = sorted([_get_pk(item) for item in transact_items] for transact_items in client.committed_transactions)
+    assert chunks == [
+        ["large-2"],
+        ["small-0", "small-1", "small-2", "small-3"],  # Chunked by the item count
+        ["small-4", "large-0", "large-1"],  # Chunked by the size
+    ]
@@ -1,11 +1,14 @@
+import asyncio
+from contextvars import Token
 from dataclasses import dataclass
-from typing import Protocol
+from typing import Any, Protocol
 
 import pytest
 import structlog
 
 from unit_of_work import AbstractUnitOfWork
 from unit_of_work.dynamodb import DynamoDBClientFactory, DynamoDBSession
+from unit_of_work.dynamodb.session import DynamoDBSessionBuffer
 
 logger: structlog.stdlib.BoundLogger = structlog.get_logger()
 
@@ -72,10 +75,22 @@ class DynamoDBUnitOfWork(UnitOfWork):
     session: DynamoDBSession
     products: ProductDynamoDBRepository
 
+    _session_token: Token[DynamoDBSessionBuffer]
+
     def __init__(self, client_factory: DynamoDBClientFactory) -> None:
         self.session = DynamoDBSession(client_factory)
         self.products = ProductDynamoDBRepository(table_name="test-table", session=self.session)
 
+    async def __aenter__(self) -> "DynamoDBUnitOfWork":
+        self._session_token = self.session.begin()
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        try:
+            await super().__aexit__(exc_type, exc, tb)
+        finally:
+            self.session.end(self._session_token)
+
     async def commit(self) -> None:
         await self.session.commit()
         logger.info("dynamodb_unit_of_work__committed")
@@ -154,3 +169,17 @@ async def test_commit_uow_in_context_manager(client_factory: DynamoDBClientFacto
     assert product_from_db
     assert product_from_db.id == "product-1111"
     assert product_from_db.name == "MINIMALIST-SPOON"
+
+
+@pytest.mark.asyncio()
+async def test_items_added_by_child_tasks_before_uow_uses_session_committed(
+    client_factory: DynamoDBClientFactory,
+) -> None:
+    products = [Product(id=f"product-{i}", name="MINIMALIST-SPOON") for i in range(3)]
+
+    async with DynamoDBUnitOfWork(client_factory) as uow:
+        await asyncio.gather(*[uow.products.create(product) for product in products])
+        await uow.commit()
+
+    for product in products:
+        assert await uow.products.get(product_id=product.id) == product
@@ -0,0 +1,34 @@
+from functools import lru_cache
+from typing import Any
+
+from transactional_messaging import ClaimCheck, resolve_claim_check
+from transactional_messaging.s3 import S3PayloadStore
+
+from adapters import clients
+from adapters.settings import get_settings
+
+
+@lru_cache
+def get_payload_store() -> S3PayloadStore | None:
+    bucket = get_settings().aws_claim_check_s3_bucket
+    return S3PayloadStore(bucket, clients.get_s3_client) if bucket else None
+
+
+def get_outbox_claim_check() -> ClaimCheck | None:
+    store = get_payload_store()
+    if store is None:
+        return None
+    return ClaimCheck(store, threshold_bytes=get_settings().dynamodb_outbox_claim_check_threshold_bytes)
+
+
+async def resolve_message_claim_check(data: Any) -> Any:
+    store = get_payload_store()
+    return await resolve_claim_check(data, store) if store else data
+
+
+async def create_claim_check_bucket() -> None:
+    bucket = get_settings().aws_claim_check_s3_bucket
+    if not bucket:
+        return
+    async with clients.get_s3_client() as client:
+        await client.create_bucket(Bucket=bucket)
@@ -1,3 +1,7 @@
+import datetime
+from functools import lru_cache
+
+from transactional_messaging import ProcessedMessagesCache
 from transactional_messaging.dynamodb import create_inbox_table as transactional_messaging_create_inbox_table
 
 from adapters import clients
@@ -8,6 +12,23 @@ def get_inbox_table_name() -> str:
     return get_settings().dynamodb_inbox_table_name
 
 
+def get_inbox_retention() -> datetime.timedelta | None:
+    retention_days = get_settings().dynamodb_inbox_retention_days
+    return datetime.timedelta(days=retention_days) if retention_days is not None else None
+
+
+def get_inbox_compact_items() -> bool:
+    return get_settings().dynamodb_inbox_compact_items
+
+
+@lru_cache
+def get_processed_messages_cache() -> ProcessedMessagesCache:
+    settings = get_settings()
+    return ProcessedMessagesCache(
+        max_size=settings.dynamodb_inbox_cache_max_size, ttl=settings.dynamodb_inbox_cache_ttl
+    )
+
+
 async def create_inbox_table() -> None:
     async with clients.get_dynamodb_client() as client:
         await transactional_messaging_create_inbox_table(table_name=get_inbox_table_name(), client=client)
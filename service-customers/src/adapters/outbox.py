@@ -1,4 +1,5 @@
 from lambda_outbox_dynamodb_streams import outbox
+from transactional_messaging.dynamodb import MessageCompression
 from transactional_messaging.dynamodb import create_outbox_table as transactional_messaging_create_outbox_table
 
 from adapters import clients
@@ -9,6 +10,16 @@ def get_outbox_table_name() -> str:
     return get_settings().dynamodb_outbox_table_name
 
 
+def get_outbox_compression() -> MessageCompression | None:
+    settings = get_settings()
+    if settings.dynamodb_outbox_compression_codec is None:
+        return None
+    return MessageCompression(
+        codec=settings.dynamodb_outbox_compression_codec,
+        threshold_bytes=settings.dynamodb_outbox_compression_threshold_bytes,
+    )
+
+
 async def create_outbox_table() -> None:
     async with clients.get_dynamodb_client() as client:
         await transactional_messaging_create_outbox_table(table_name=get_outbox_table_name(), client=client)
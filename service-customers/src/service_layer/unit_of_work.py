@@ -1,13 +1,17 @@
 import uuid
+from contextvars import Token
+from typing import Any
 
 import structlog
 from transactional_messaging import InboxRepository, OutboxRepository, ensure_idempotence
 from transactional_messaging.dynamodb import DynamoDBInboxRepository, DynamoDBOutboxRepository
 from unit_of_work import AbstractUnitOfWork
-from unit_of_work.dynamodb import DynamoDBSession
+from unit_of_work.dynamodb import DynamoDBClientFactory, DynamoDBSession
+from unit_of_work.dynamodb.session import DynamoDBSessionBuffer
 
-from adapters import clients, dynamodb, inbox, outbox
+from adapters import claim_check, clients, dynamodb, inbox, outbox
 from adapters.customer_repository import CustomerRepository, DynamoDBCustomerRepository
+from adapters.settings import get_settings
 from service_layer.topics import TOPICS_MAP
 
 logger: structlog.stdlib.BoundLogger = structlog.get_logger()
@@ -18,26 +22,70 @@ class UnitOfWork(AbstractUnitOfWork):
     inbox: InboxRepository
     events: OutboxRepository
 
-    def __init__(self, message_id: uuid.UUID | None = None) -> None:
+    def __init__(self, message_id: uuid.UUID | None = None, optimistic_idempotence: bool = False) -> None:
         self.message_id = message_id
+        self.optimistic_idempotence = optimistic_idempotence
 
     async def __aenter__(self) -> "UnitOfWork":
         if self.message_id:
-            await ensure_idempotence(message_id=self.message_id, repository=self.inbox)
+            await ensure_idempotence(
+                message_id=self.message_id, repository=self.inbox, optimistic=self.optimistic_idempotence
+            )
         return self
 
 
 class DynamoDBUnitOfWork(UnitOfWork):
+    _session_tokens: list[Token[DynamoDBSessionBuffer] | None]
     customers: DynamoDBCustomerRepository
     inbox: DynamoDBInboxRepository
     events: DynamoDBOutboxRepository
 
-    def __init__(self, message_id: uuid.UUID | None = None) -> None:
-        super().__init__(message_id=message_id)
-        self.session = DynamoDBSession(clients.get_dynamodb_client)
+    def __init__(
+        self,
+        message_id: uuid.UUID | None = None,
+        client_factory: DynamoDBClientFactory | None = None,
+        optimistic_idempotence: bool | None = None,
+    ) -> None:
+        if optimistic_idempotence is None:
+            optimistic_idempotence = get_settings().dynamodb_inbox_optimistic_idempotence
+        super().__init__(message_id=message_id, optimistic_idempotence=optimistic_idempotence)
+        self.session = DynamoDBSession(client_factory or clients.get_dynamodb_client_provider().get_client)
+        self._session_tokens = []
         self.customers = DynamoDBCustomerRepository(dynamodb.get_customers_table_name(), self.session)
-        self.inbox = DynamoDBInboxRepository(inbox.get_inbox_table_name(), self.session)
-        self.events = DynamoDBOutboxRepository(outbox.get_outbox_table_name(), self.session, TOPICS_MAP)
+        self.inbox = DynamoDBInboxRepository(
+            inbox.get_inbox_table_name(),
+            self.session,
+            cache=inbox.get_processed_messages_cache(),
+            retention=inbox.get_inbox_retention(),
+            compact_items=inbox.get_inbox_compact_items(),
+        )
+        self.events = DynamoDBOutboxRepository(
+            outbox.get_outbox_table_name(),
+            self.session,
+            TOPICS_MAP,
+            compression=outbox.get_outbox_compression(),
+            claim_check=claim_check.get_outbox_claim_check(),
+        )
+
+    async def __aenter__(self) -> "DynamoDBUnitOfWork":
+        # The outermost entry scopes the session items to the unit of work, including the tasks that it starts
+        self._session_tokens.append(None if self._session_tokens else self.session.begin())
+        try:
+            await super().__aenter__()
+        except BaseException:
+            self._end_session()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        try:
+            await super().__aexit__(exc_type, exc, tb)
+        finally:
+            self._end_session()
+
+    def _end_session(self) -> None:
+        if token := self._session_tokens.pop():
+            self.session.end(token)
 
     async def commit(self) -> None:
         await self.session.commit()
@@ -5,6 +5,7 @@ import pytest
 import structlog
 from transactional_messaging.idempotent_consumer import MessageAlreadyProcessedError
 
+from adapters import clients, inbox
 from customers.customer import Customer
 from service_layer.unit_of_work import DynamoDBUnitOfWork
 
@@ -30,6 +31,35 @@ async def test_uow_is_idempotent__when_message_id_is_given() -> None:
     assert await uow.customers.get(customer_id=customer.id) is None
 
 
+@pytest.mark.asyncio()
+async def test_uow_is_idempotent__optimistic_mode__duplicate_rejected_on_commit() -> None:
+    message_id = uuid.uuid4()
+    async with DynamoDBUnitOfWork(message_id=message_id, optimistic_idempotence=True) as uow:
+        await uow.customers.create(Customer.create(name="John Doe", credit_limit=Decimal("200.00")))
+        await uow.commit()
+    inbox.get_processed_messages_cache.cache_clear()
+
+    customer = Customer.create(name="John Doe", credit_limit=Decimal("200.00"))
+    async with DynamoDBUnitOfWork(message_id=message_id, optimistic_idempotence=True) as uow:
+        await uow.customers.create(customer)
+        with pytest.raises(MessageAlreadyProcessedError, match=str(message_id)):
+            await uow.commit()
+
+    assert await uow.customers.get(customer_id=customer.id) is None
+
+
+@pytest.mark.asyncio()
+async def test_uow_is_idempotent__optimistic_mode__cached_duplicate_rejected_on_enter() -> None:
+    message_id = uuid.uuid4()
+    async with DynamoDBUnitOfWork(message_id=message_id, optimistic_idempotence=True) as uow:
+        await uow.customers.create(Customer.create(name="John Doe", credit_limit=Decimal("200.00")))
+        await uow.commit()
+
+    with pytest.raises(MessageAlreadyProcessedError, match=str(message_id)):
+        async with DynamoDBUnitOfWork(message_id=message_id, optimistic_idempotence=True):
+            pass
+
+
 @pytest.mark.asyncio()
 async def test_uow_skips_idempotence_check__when_message_id_not_given() -> None:
     async with DynamoDBUnitOfWork() as uow:
@@ -45,3 +75,17 @@ async def test_uow_skips_idempotence_check__when_message_id_not_given() -> None:
         await uow.commit()
 
     assert await uow.customers.get(customer_id=customer.id)
+
+
+@pytest.mark.asyncio()
+async def test_uow_sessions_share_dynamodb_client() -> None:
+    async with DynamoDBUnitOfWork() as uow_1, DynamoDBUnitOfWork() as uow_2:
+        async with uow_1.session.get_client() as client_1, uow_2.session.get_client() as client_2:
+            assert client_1 is client_2
+
+
+@pytest.mark.asyncio()
+async def test_uow_uses_injected_client_factory() -> None:
+    uow = DynamoDBUnitOfWork(client_factory=clients.get_dynamodb_client)
+
+    assert uow.session.get_client is clients.get_dynamodb_client
@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from aiobotocore.session import AioSession, get_session
 from pydantic import BaseModel
 from types_aiobotocore_dynamodb import DynamoDBClient
@@ -5,6 +7,7 @@ from types_aiobotocore_iam import IAMClient
 from types_aiobotocore_lambda import LambdaClient
 from types_aiobotocore_s3 import S3Client
 from types_aiobotocore_sns import SNSClient
+from unit_of_work.dynamodb import DynamoDBClientProvider
 
 from adapters.settings import get_settings
 
@@ -32,6 +35,18 @@ def get_dynamodb_client() -> DynamoDBClient:
     return session.create_client("dynamodb", **AWSClientConfig.from_settings().model_dump())
 
 
+@lru_cache
+def get_dynamodb_client_provider() -> DynamoDBClientProvider:
+    settings = get_settings()
+    return DynamoDBClientProvider(
+        max_pool_connections=settings.dynamodb_max_pool_connections,
+        keepalive_timeout=settings.dynamodb_keepalive_timeout,
+        connect_timeout=settings.dynamodb_connect_timeout,
+        read_timeout=settings.dynamodb_read_timeout,
+        **AWSClientConfig.from_settings().model_dump(),
+    )
+
+
 def get_iam_client() -> IAMClient:
     return session.create_client("iam", **AWSClientConfig.from_settings().model_dump())
 
@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Literal
 
 from tomodachi_bootstrap import TomodachiBaseSettings
 
@@ -7,6 +8,19 @@ class Settings(TomodachiBaseSettings):
     dynamodb_orders_table_name: str
     dynamodb_inbox_table_name: str
     dynamodb_outbox_table_name: str
+    dynamodb_max_pool_connections: int = 50
+    dynamodb_keepalive_timeout: float = 60.0
+    dynamodb_connect_timeout: float = 5.0
+    dynamodb_read_timeout: float = 10.0
+    dynamodb_inbox_optimistic_idempotence: bool = False
+    dynamodb_inbox_cache_max_size: int = 10_000
+    dynamodb_inbox_cache_ttl: float = 300.0
+    dynamodb_inbox_retention_days: int | None = None
+    dynamodb_inbox_compact_items: bool = False
+    dynamodb_outbox_compression_codec: Literal["zlib", "zstd"] | None = None
+    dynamodb_outbox_compression_threshold_bytes: int = 1024
+    dynamodb_outbox_claim_check_threshold_bytes: int = 200 * 1024
+    aws_claim_check_s3_bucket: str | None = None
 
 
 @lru_cache
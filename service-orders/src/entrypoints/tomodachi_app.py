@@ -6,9 +6,15 @@ from aiohttp import web
 from stockholm import Money
 from tomodachi.envelope.json_base import JsonBase
 from tomodachi_bootstrap import TomodachiServiceBase
+from tomodachi_bootstrap.middleware import (
+    create_claim_check_middleware,
+    message_correlation_id_middleware,
+    sns_sqs_message_retry_middleware,
+    structlog_middleware,
+)
 from transactional_messaging.idempotent_consumer import MessageAlreadyProcessedError
 
-from adapters import dynamodb, inbox, outbox, sns
+from adapters import claim_check, clients, dynamodb, inbox, outbox, sns
 from orders.commands import ApproveOrderCommand, CancelOrderCommand, CreateOrderCommand, RejectOrderCommand
 from service_layer import use_cases, views
 from service_layer.response import ResponseTypes
@@ -25,14 +31,25 @@ STATUS_CODES: dict[ResponseTypes, int] = {
 
 class TomodachiService(TomodachiServiceBase):
     name = "service-orders"
+    message_middleware = [
+        sns_sqs_message_retry_middleware,
+        create_claim_check_middleware(claim_check.resolve_message_claim_check),
+        message_correlation_id_middleware,
+        structlog_middleware,
+    ]
 
     async def _start_service(self) -> None:
         if self.is_dev_env:
             await sns.create_topics()
+            await claim_check.create_claim_check_bucket()
             await dynamodb.create_orders_table()
             await inbox.create_inbox_table()
             await outbox.create_outbox_table()
             await outbox.create_dynamodb_streams_outbox()
+        await clients.get_dynamodb_client_provider().start()
+
+    async def _stop_service(self) -> None:
+        await clients.get_dynamodb_client_provider().close()
 
     @tomodachi.http("GET", r"/orders/health/?", ignore_logging=[200])
     async def healthcheck(self, request: web.Request, correlation_id: uuid.UUID) -> web.Response:
@@ -4,7 +4,7 @@ import pytest
 import pytest_asyncio
 from tomodachi_testcontainers.containers import MotoContainer
 
-from adapters import dynamodb, inbox, outbox
+from adapters import clients, dynamodb, inbox, outbox
 from service_layer.unit_of_work import DynamoDBUnitOfWork, UnitOfWork
 
 
@@ -22,10 +22,12 @@ def _environment(monkeypatch: pytest.MonkeyPatch, moto_container: MotoContainer)
 
 
 @pytest_asyncio.fixture()
-async def _mock_dynamodb(_environment: None, _reset_moto_container_on_teardown: None) -> None:
+async def _mock_dynamodb(_environment: None, _reset_moto_container_on_teardown: None) -> AsyncGenerator[None, None]:
     await dynamodb.create_orders_table()
     await inbox.create_inbox_table()
     await outbox.create_outbox_table()
+    yield
+    await clients.get_dynamodb_client_provider().close()
 
 
 @pytest_asyncio.fixture()
@@ -1,3 +1,4 @@
+import asyncio
 import uuid
 from decimal import Decimal
 
@@ -5,6 +6,7 @@ import pytest
 import structlog
 from transactional_messaging.idempotent_consumer import MessageAlreadyProcessedError
 
+from adapters import clients, inbox
 from orders.order import Order
 from service_layer.unit_of_work import DynamoDBUnitOfWork
 
@@ -30,6 +32,35 @@ async def test_uow_is_idempotent__when_message_id_is_given() -> None:
     assert await uow.orders.get(order_id=order.id) is None
 
 
+@pytest.mark.asyncio()
+async def test_uow_is_idempotent__optimistic_mode__duplicate_rejected_on_commit() -> None:
+    message_id = uuid.uuid4()
+    async with DynamoDBUnitOfWork(message_id=message_id, optimistic_idempotence=True) as uow:
+        await uow.orders.create(Order.create(customer_id=uuid.uuid4(), order_total=Decimal("200.00")))
+        await uow.commit()
+    inbox.get_processed_messages_cache.cache_clear()
+
+    order = Order.create(customer_id=uuid.uuid4(), order_total=Decimal("200.00"))
+    async with DynamoDBUnitOfWork(message_id=message_id, optimistic_idempotence=True) as uow:
+        await uow.orders.create(order)
+        with pytest.raises(MessageAlreadyProcessedError, match=str(message_id)):
+            await uow.commit()
+
+    assert await uow.orders.get(order_id=order.id) is None
+
+
+@pytest.mark.asyncio()
+async def test_uow_is_idempotent__optimistic_mode__cached_duplicate_rejected_on_enter() -> None:
+    message_id = uuid.uuid4()
+    async with DynamoDBUnitOfWork(message_id=message_id, optimistic_idempotence=True) as uow:
+        await uow.orders.create(Order.create(customer_id=uuid.uuid4(), order_total=Decimal("200.00")))
+        await uow.commit()
+
+    with pytest.raises(MessageAlreadyProcessedError, match=str(message_id)):
+        async with DynamoDBUnitOfWork(message_id=message_id, optimistic_idempotence=True):
+            pass
+
+
 @pytest.mark.asyncio()
 async def test_uow_skips_idempotence_check__when_message_id_not_given() -> None:
     async with DynamoDBUnitOfWork() as uow:
@@ -45,3 +76,30 @@ async def test_uow_skips_idempotence_check__when_message_id_not_given() -> None:
         await uow.commit()
 
     assert await uow.orders.get(order_id=order.id)
+
+
+@pytest.mark.asyncio()
+async def test_uow_sessions_share_dynamodb_client() -> None:
+    async with DynamoDBUnitOfWork() as uow_1, DynamoDBUnitOfWork() as uow_2:
+        async with uow_1.session.get_client() as client_1, uow_2.session.get_client() as client_2:
+            assert client_1 is client_2
+
+
+@pytest.mark.asyncio()
+async def test_uow_uses_injected_client_factory() -> None:
+    uow = DynamoDBUnitOfWork(client_factory=clients.get_dynamodb_client)
+
+    assert uow.session.get_client is clients.get_dynamodb_client
+
+
+@pytest.mark.asyncio()
+async def test_orders_created_by_concurrent_tasks_committed_with_uow() -> None:
+    orders = [Order.create(customer_id=uuid.uuid4(), order_total=Decimal("200.00")) for _ in range(3)]
+
+    async with DynamoDBUnitOfWork() as uow:
+        async with uow:
+            await asyncio.gather(*[uow.orders.create(order) for order in orders])
+            await uow.commit()
+
+    for order in orders:
+        assert await uow.orders.get(order_id=order.id)
@@ -15,4 +15,9 @@ resource "aws_dynamodb_table" "default" {
     name = "PK"
     type = "S"
   }
+
+  ttl {
+    attribute_name = var.ttl_attribute_name
+    enabled        = var.ttl_enabled
+  }
 }
@@ -5,3 +5,13 @@ variable "environment" {
 variable "service_name" {
   type = string
 }
+
+variable "ttl_enabled" {
+  type    = bool
+  default = true
+}
+
+variable "ttl_attribute_name" {
+  type    = string
+  default = "ExpiresAt"
+}
@@ -1,5 +1,12 @@
+data "aws_caller_identity" "current" {}
+
+data "aws_region" "current" {}
+
+data "aws_partition" "current" {}
+
 locals {
-  function_name = "outbox-dynamodb-streams--${var.service_name}"
+  function_name        = "outbox-dynamodb-streams--${var.service_name}"
+  sns_topic_arn_prefix = "arn:${data.aws_partition.current.partition}:sns:${data.aws_region.current.name}:${data.aws_caller_identity.current.account_id}:"
 }
 
 # DynamoDB Outbox Table
@@ -8,6 +15,13 @@ module "dynamodb_outbox_table" {
 
   environment  = var.environment
   service_name = var.service_name
+
+  correlation_id_index_projection_type             = var.correlation_id_index_projection_type
+  correlation_id_index_non_key_attributes          = var.correlation_id_index_non_key_attributes
+  aggregate_id_index_projection_type               = var.aggregate_id_index_projection_type
+  aggregate_id_index_non_key_attributes            = var.aggregate_id_index_non_key_attributes
+  not_dispatched_messages_index_projection_type    = var.not_dispatched_messages_index_projection_type
+  not_dispatched_messages_index_non_key_attributes = var.not_dispatched_messages_index_non_key_attributes
 }
 
 # SNS topics to which the Lambda will publish messages
@@ -36,6 +50,8 @@ module "lambda_iam_role" {
   dynamodb_table_stream_arn = module.dynamodb_outbox_table.stream_arn
   sns_topic_arns            = [for sns_topic in module.sns_topics : sns_topic.arn]
   sqs_queue_arns            = [module.lambda_sqs_dlq.arn]
+  archive_s3_bucket_arn     = var.archive_s3_bucket_name != null ? "arn:${data.aws_partition.current.partition}:s3:::${var.archive_s3_bucket_name}" : null
+  claim_check_s3_bucket_arn = var.claim_check_s3_bucket_name != null ? "arn:${data.aws_partition.current.partition}:s3:::${var.claim_check_s3_bucket_name}" : null
 }
 
 # Lambda source code path
@@ -54,18 +70,32 @@ resource "aws_lambda_function" "default" {
   filename         = data.local_file.lambda_source_zip.filename
   source_code_hash = data.local_file.lambda_source_zip.content_base64sha256
 
-  runtime       = "python3.10"
+  runtime       = var.runtime
   handler       = "app.lambda_function.lambda_handler"
   architectures = [var.architecture]
 
-  memory_size = var.memory_size
-  timeout     = var.timeout
+  memory_size                    = var.memory_size
+  timeout                        = var.timeout
+  reserved_concurrent_executions = var.reserved_concurrent_executions
+
+  ephemeral_storage {
+    size = var.ephemeral_storage_size
+  }
 
   environment {
-    variables = {
-      AWS_SNS_TOPIC_PREFIX       = "${var.environment}-"
-      DYNAMODB_OUTBOX_TABLE_NAME = module.dynamodb_outbox_table.name
-    }
+    variables = merge(
+      {
+        AWS_SNS_TOPIC_PREFIX       = "${var.environment}-"
+        AWS_SNS_TOPIC_ARN_PREFIX   = local.sns_topic_arn_prefix
+        DYNAMODB_OUTBOX_TABLE_NAME = module.dynamodb_outbox_table.name
+      },
+      var.dispatched_retention_days != null ? { OUTBOX_DISPATCHED_RETENTION_DAYS = tostring(var.dispatched_retention_days) } : {},
+      var.archive_s3_bucket_name != null ? {
+        OUTBOX_ARCHIVE_S3_BUCKET     = var.archive_s3_bucket_name
+        OUTBOX_ARCHIVE_S3_KEY_PREFIX = var.archive_s3_key_prefix
+      } : {},
+      var.claim_check_s3_bucket_name != null ? { OUTBOX_CLAIM_CHECK_S3_BUCKET = var.claim_check_s3_bucket_name } : {},
+    )
   }
 
   dead_letter_config {
@@ -93,9 +123,32 @@ resource "aws_lambda_event_source_mapping" "default" {
 
   function_response_types = ["ReportBatchItemFailures"]
 
-  batch_size             = var.batch_size
-  maximum_retry_attempts = var.maximum_retry_attempts
-  parallelization_factor = var.parallelization_factor
+  # Only INSERT records of not dispatched messages, and messages expired by TTL when they're archived, invoke the Lambda;
+  # marking a message as dispatched modifies the item, which would otherwise invoke the Lambda for nothing
+  filter_criteria {
+    filter {
+      pattern = jsonencode({
+        eventName = ["INSERT"]
+        dynamodb  = { NewImage = { NotDispatched = { S = [{ exists = true }] } } }
+      })
+    }
+
+    dynamic "filter" {
+      for_each = var.archive_s3_bucket_name != null ? [1] : []
+      content {
+        pattern = jsonencode({
+          eventName    = ["REMOVE"]
+          userIdentity = { type = ["Service"], principalId = ["dynamodb.amazonaws.com"] }
+        })
+      }
+    }
+  }
+
+  batch_size                         = var.batch_size
+  maximum_batching_window_in_seconds = var.maximum_batching_window_in_seconds
+  maximum_retry_attempts             = var.maximum_retry_attempts
+  parallelization_factor             = var.parallelization_factor
+  bisect_batch_on_function_error     = var.bisect_batch_on_function_error
 
   destination_config {
     on_failure {
@@ -14,6 +14,11 @@ resource "aws_dynamodb_table" "default" {
     enabled = true
   }
 
+  ttl {
+    attribute_name = "ExpiresAt"
+    enabled        = true
+  }
+
   attribute {
     name = "PK"
     type = "S"
@@ -40,21 +45,24 @@ resource "aws_dynamodb_table" "default" {
   }
 
   global_secondary_index {
-    name            = "CorrelationIdIndex"
-    hash_key        = "CorrelationId"
-    projection_type = "ALL"
+    name               = "CorrelationIdIndex"
+    hash_key           = "CorrelationId"
+    projection_type    = var.correlation_id_index_projection_type
+    non_key_attributes = var.correlation_id_index_projection_type == "INCLUDE" ? var.correlation_id_index_non_key_attributes : null
   }
 
   global_secondary_index {
-    name            = "AggregateIdIndex"
-    hash_key        = "AggregateId"
-    projection_type = "ALL"
+    name               = "AggregateIdIndex"
+    hash_key           = "AggregateId"
+    projection_type    = var.aggregate_id_index_projection_type
+    non_key_attributes = var.aggregate_id_index_projection_type == "INCLUDE" ? var.aggregate_id_index_non_key_attributes : null
   }
 
   global_secondary_index {
-    name            = "NotDispatchedMessagesIndex"
-    hash_key        = "NotDispatched"
-    range_key       = "CreatedAt"
-    projection_type = "ALL"
+    name               = "NotDispatchedMessagesIndex"
+    hash_key           = "NotDispatched"
+    range_key          = "CreatedAt"
+    projection_type    = var.not_dispatched_messages_index_projection_type
+    non_key_attributes = var.not_dispatched_messages_index_projection_type == "INCLUDE" ? var.not_dispatched_messages_index_non_key_attributes : null
   }
 }
@@ -5,3 +5,33 @@ variable "environment" {
 variable "service_name" {
   type = string
 }
+
+variable "correlation_id_index_projection_type" {
+  type    = string
+  default = "ALL"
+}
+
+variable "correlation_id_index_non_key_attributes" {
+  type    = list(string)
+  default = []
+}
+
+variable "aggregate_id_index_projection_type" {
+  type    = string
+  default = "ALL"
+}
+
+variable "aggregate_id_index_non_key_attributes" {
+  type    = list(string)
+  default = []
+}
+
+variable "not_dispatched_messages_index_projection_type" {
+  type    = string
+  default = "ALL"
+}
+
+variable "not_dispatched_messages_index_non_key_attributes" {
+  type    = list(string)
+  default = ["MessageId"]
+}
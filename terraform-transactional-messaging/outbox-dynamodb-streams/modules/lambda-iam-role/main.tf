@@ -37,6 +37,26 @@ module "policy_sqs" {
   sqs_queue_arns = var.sqs_queue_arns
 }
 
+module "policy_s3" {
+  source = "../policy-s3"
+  count  = var.archive_s3_bucket_arn != null ? 1 : 0
+
+  role_name     = aws_iam_role.default.name
+  function_name = var.function_name
+  s3_bucket_arn = var.archive_s3_bucket_arn
+}
+
+module "policy_s3_claim_check" {
+  source = "../policy-s3"
+  count  = var.claim_check_s3_bucket_arn != null ? 1 : 0
+
+  role_name          = aws_iam_role.default.name
+  function_name      = var.function_name
+  s3_bucket_arn      = var.claim_check_s3_bucket_arn
+  actions            = ["s3:GetObject"]
+  policy_name_suffix = "s3-claim-check"
+}
+
 module "policy_xray" {
   source = "../policy-xray"
 
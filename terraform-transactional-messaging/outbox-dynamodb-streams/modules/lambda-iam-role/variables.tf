@@ -17,3 +17,13 @@ variable "sns_topic_arns" {
 variable "sqs_queue_arns" {
   type = list(string)
 }
+
+variable "archive_s3_bucket_arn" {
+  type    = string
+  default = null
+}
+
+variable "claim_check_s3_bucket_arn" {
+  type    = string
+  default = null
+}
@@ -0,0 +1,16 @@
+resource "aws_iam_role_policy" "default" {
+  name = "policy-${var.function_name}--${var.policy_name_suffix}"
+
+  role = var.role_name
+
+  policy = jsonencode({
+    "Version" : "2012-10-17",
+    "Statement" : [
+      {
+        "Effect" : "Allow",
+        "Action" : var.actions,
+        "Resource" : ["${var.s3_bucket_arn}/*"]
+      }
+    ]
+  })
+}
@@ -0,0 +1,10 @@
+terraform {
+  required_version = ">= 1.4.4"
+
+  required_providers {
+    aws = {
+      source  = "hashicorp/aws"
+      version = "~> 5.0"
+    }
+  }
+}
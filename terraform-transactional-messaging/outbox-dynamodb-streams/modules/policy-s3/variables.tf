@@ -0,0 +1,21 @@
+variable "function_name" {
+  type = string
+}
+
+variable "role_name" {
+  type = string
+}
+
+variable "s3_bucket_arn" {
+  type = string
+}
+
+variable "actions" {
+  type    = list(string)
+  default = ["s3:PutObject"]
+}
+
+variable "policy_name_suffix" {
+  type    = string
+  default = "s3"
+}
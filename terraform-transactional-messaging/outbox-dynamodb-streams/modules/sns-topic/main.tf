@@ -1,3 +1,7 @@
 resource "aws_sns_topic" "default" {
   name = "${var.environment}-${var.topic_name}"
+
+  # Messages of an aggregate are published with the aggregate ID as the message group ID
+  fifo_topic                  = endswith(var.topic_name, ".fifo")
+  content_based_deduplication = false
 }
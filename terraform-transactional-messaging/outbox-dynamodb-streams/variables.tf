@@ -15,6 +15,11 @@ variable "lambda_source_zip_path" {
   default = "../../lambda-outbox-dynamodb-streams/src/lambda_outbox_dynamodb_streams/lambda_outbox_dynamodb_streams_arm64.zip"
 }
 
+variable "runtime" {
+  type    = string
+  default = "python3.10"
+}
+
 variable "memory_size" {
   type    = number
   default = 256
@@ -25,6 +30,17 @@ variable "timeout" {
   default = 60
 }
 
+variable "ephemeral_storage_size" {
+  type    = number
+  default = 512
+}
+
+# -1 leaves the function without reserved concurrency
+variable "reserved_concurrent_executions" {
+  type    = number
+  default = -1
+}
+
 variable "architecture" {
   type    = string
   default = "arm64"
@@ -35,6 +51,11 @@ variable "batch_size" {
   default = 30
 }
 
+variable "maximum_batching_window_in_seconds" {
+  type    = number
+  default = 0
+}
+
 variable "maximum_retry_attempts" {
   type    = number
   default = 10
@@ -45,7 +66,62 @@ variable "parallelization_factor" {
   default = 1
 }
 
+variable "bisect_batch_on_function_error" {
+  type    = bool
+  default = true
+}
+
 variable "maximum_event_age_in_seconds" {
   type    = number
   default = 3600
 }
+
+variable "dispatched_retention_days" {
+  type    = number
+  default = null
+}
+
+variable "archive_s3_bucket_name" {
+  type    = string
+  default = null
+}
+
+variable "archive_s3_key_prefix" {
+  type    = string
+  default = "outbox-archive/"
+}
+
+variable "claim_check_s3_bucket_name" {
+  type    = string
+  default = null
+}
+
+variable "correlation_id_index_projection_type" {
+  type    = string
+  default = "ALL"
+}
+
+variable "correlation_id_index_non_key_attributes" {
+  type    = list(string)
+  default = []
+}
+
+variable "aggregate_id_index_projection_type" {
+  type    = string
+  default = "ALL"
+}
+
+variable "aggregate_id_index_non_key_attributes" {
+  type    = list(string)
+  default = []
+}
+
+variable "not_dispatched_messages_index_projection_type" {
+  type    = string
+  default = "ALL"
+}
+
+variable "not_dispatched_messages_index_non_key_attributes" {
+  type    = list(string)
+  default = ["MessageId"]
+}